@@ -10,17 +10,15 @@ from multiprocessing import Process, Manager
 
 import asyncio
 from signal import SIGINT, SIGTERM
-from pathlib import Path
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
 
 # --- Class imports
 from backend.CameraServer import CameraServer
+from backend.ScanEventChannel import ScanEventChannel
 from frontend.FrontendApplication import FrontendApplication
-from backend.DataBaseClient import DataBaseClient
+from backend.database_bootstrap import bootstrap_database
 
 # --- Config imports
-from backend.database_config import database_host, INVENTORY_DB_NAME
+from backend.database_config import database_host
 
 # Initialize logging
 logging.basicConfig(format='%(asctime)s [%(levelname)s] %(message)s',
@@ -46,11 +44,24 @@ def update_id(id: int):
   ui_server.populate_item_from_id(id, is_update_from_qr_scan=True)
 
 
+# -----------------------------------------------------------------------
+# -- DATABASE
+# -----------------------------------------------------------------------
+# Check the database server is running, create the inventory database if
+# needed and bring its schema up to date. This is the only place the schema
+# is touched, DataBaseClient instances assume a bootstrapped database. This
+# has to happen before the frontend is created as it loads inventory data.
+bootstrap_database(database_host)
 # -----------------------------------------------------------------------
 # -- CAMERA SERVER
 # -----------------------------------------------------------------------
+# --- Create the channels that pass scanned item IDs from the camera thread
+#     to the UI event loop, for single scans and batch scans
+scan_event_channel = ScanEventChannel()
+batch_scan_event_channel = ScanEventChannel()
 # --- Create camera server instance
-camera_server = CameraServer(update_id)
+camera_server = CameraServer(scan_event_channel.publish,
+                             batch_scan_event_channel.publish)
 # -----------------------------------------------------------------------
 # -- FRONTEND SERVER
 # -----------------------------------------------------------------------
@@ -91,41 +102,26 @@ def main():
   for signal in [SIGINT, SIGTERM]:
     loop.add_signal_handler(signal, do_cleanup_event_loop, loop)
 
-  # ---- CHECK DATABASE CONNECTION ----
-  # Check if database server is running by trying to locate the inventory
-  # database
-  if not DataBaseClient(database_host).is_database(INVENTORY_DB_NAME):
-    raise RuntimeError('DATABASE NOT FOUND. Could not find inventory database')
-
   try:
-    # ---- SET OBSERVER FOR QR MESSAGE ----
-    class UpdateUIOnChange(FileSystemEventHandler):
-      def on_modified(self, event):
-        # Read item ID from file
-        with open((Path(__file__).parent / 'temp' / 'qr').resolve(), "r") as qr_file:
-          message = qr_file.readline().strip()
-
-        # If file contains a message -> update the server state
-        if message:
-          item_id = int(message)
-          loop.call_soon_threadsafe(update_id, item_id)
-
-    # Create and start file watcher to monitor saved qr messages
-    observer = Observer()
-
-    observer.schedule(
-        UpdateUIOnChange(),
-        (Path(__file__).parent / 'temp' / 'qr').resolve(),
-        recursive=False
-    )
-    observer.start()
+    # ---- DELIVER QR SCANS TO THE UI ----
+    # Scans published by the camera thread are queued for this loop
+    scan_event_channel.bind(loop)
+    batch_scan_event_channel.bind(loop)
 
     # ---- START APPLICATION ----
 
     loop.run_until_complete(asyncio.gather(
-        camera_server.run(), ui_server.run()))
+        camera_server.run(), ui_server.run(),
+        scan_event_channel.consume(update_id),
+        batch_scan_event_channel.consume(ui_server.add_batch_scan_id)))
   finally:
     error('Error in process. Closing')
+    info(f'Database connection pool stats: {
+        ui_server.db_client.get_pool_stats()}')
+    info(f'Camera stream stats: {camera_server.get_stream_stats()}')
+    info(f'QR scan stats: {camera_server.get_scan_stats()}')
+    info(f'QR scan event stats: {scan_event_channel.get_stats()}')
+    info(f'Batch scan event stats: {batch_scan_event_channel.get_stats()}')
     loop.close()
 
 
@@ -5,18 +5,24 @@ from logging import warning, error, info, debug
 import numpy as np
 import os
 import sys
+import threading
 import asyncio
 
 from frontend import FrontendApplication
 from backend import (decode_id_from_qr_message,
                      camera_server_ip,
                      camera_server_port)
+from backend.camera_config import (camera_device_index,
+                                   camera_frame_timeout_s,
+                                   camera_stats_window_s)
 
 # Get the parent directory and add it to the sys.path
 parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.append(parent_dir)
 
-from backend.util import detect_and_decode_qr_marker
+from backend.util import draw_qr_markers, RateMeter
+from backend.ScanDebouncer import ScanDebouncer
+from backend.QrDecoder import QrDecoder
 
 
 class CameraServer():
@@ -26,9 +32,23 @@ class CameraServer():
      * Scan item QR codes
      * Take images of each inventory item to be stored in the database
 
+  A single capture thread owns the camera while there are viewers. It
+  captures and JPEG encodes each frame once and publishes it to all viewers
+  of the stream. QR markers are decoded by the QrDecoder worker threads next
+  to the stream, so decoding does not slow the stream down.
+
   """
 
-  def __init__(self, fnct_update_id: int = 1):
+  def __init__(self, fnct_update_id=None, fnct_add_batch_id=None):
+    """
+    Args:
+    fnct_update_id - Function that is called with the item ID of every
+                     scanned QR code, e.g. ScanEventChannel.publish. It is
+                     called from the QR decoder threads and must not block.
+    fnct_add_batch_id - Function that is called with every new item ID of a
+                        batch scan, see start_batch_scan(). Same constraints
+                        as fnct_update_id.
+    """
     # Enable/Disable displaying the QR message in the streamed image
     self.enableQrText = False
 
@@ -40,39 +60,182 @@ class CameraServer():
     self.captured_frame = np.zeros((512, 512), dtype=int)
 
     self.fnct_update_id = fnct_update_id
+    self.fnct_add_batch_id = fnct_add_batch_id
+
+    # Batch scan mode: All valid markers of a frame are accepted and the
+    # item IDs are collected across frames. Item ID -> None in the order of
+    # scanning, None if not in batch scan mode.
+    self._batch_scan_ids = None
+    self._batch_scan_lock = threading.Lock()
+
+    # Latest JPEG encoded frame shared by all viewers. The frame index is
+    # incremented with every frame, viewers wait on the condition for it to
+    # change.
+    self._frame_condition = threading.Condition()
+    self._jpeg_frame = None
+    self._frame_index = 0
+    self._num_viewers = 0
+    self._capture_thread = None
+    # Capture thread that left its loop but might still release the camera
+    # and stop the QR decoder. The next capture thread waits for it.
+    self._stopping_capture_thread = None
+
+    # Statistics
+    self.num_frames_captured = 0
+    self.num_frames_sent = 0
+    self.stream_rate = RateMeter(camera_stats_window_s)
+
+    # Report each scanned item ID once per hold-off window rather than on
+    # every frame the label is visible in
+    self.scan_debouncer = ScanDebouncer()
+
+    # Decode QR markers of the latest frames next to the stream
+    self.qr_decoder = QrDecoder(self.handle_decoded_markers)
 
     # Define routes inside the constructor
     self.app.add_url_rule('/', 'video_feed', self.video_feed)
 
   def generate_frame_by_frame(self):
-    # Create OpenCV VideoCapture instance for webcam at port 0
-    camera = cv.VideoCapture(0)
-    while True:
-      # Capture frame-by-frame
-      success, frame = camera.read()
-
-      if not success:
-        error('Failed to conntect to camera.')
-        break
-      else:
+    """
+    Stream the frames of the capture thread to one viewer. A viewer slower
+    than the camera skips frames, it always gets the latest one.
+    """
+    self._add_viewer()
+    try:
+      frame_index = None
+      while True:
+        with self._frame_condition:
+          # Wait for a new frame or the capture thread to stop
+          has_frame = self._frame_condition.wait_for(
+              lambda: ((self._jpeg_frame is not None and
+                        self._frame_index != frame_index) or
+                       self._capture_thread is None),
+              timeout=camera_frame_timeout_s)
+          if not has_frame:
+            warning(f'No frame from the camera in {camera_frame_timeout_s} s. '
+                    'Closing stream.')
+            break
+          if self._capture_thread is None:
+            # Capture thread stopped, e.g. the camera failed
+            break
+          frame_index = self._frame_index
+          jpeg_frame = self._jpeg_frame
+
+        self.num_frames_sent += 1
+        yield (b'--frame\r\n'
+               # concat frame one by one and show result
+               b'Content-Type: image/jpeg\r\n\r\n' + jpeg_frame + b'\r\n')
+    finally:
+      # Runs when the viewer disconnects and the generator is closed
+      self._remove_viewer()
+
+  def _add_viewer(self):
+    """
+    Register a viewer of the stream, starts the capture thread if it is not
+    running
+    """
+    with self._frame_condition:
+      self._num_viewers += 1
+      if self._capture_thread is None:
+        self._jpeg_frame = None
+        self._capture_thread = threading.Thread(
+            target=self._capture_frames,
+            args=(self._stopping_capture_thread,),
+            name='CameraCapture',
+            daemon=True)
+        self._capture_thread.start()
+
+  def _remove_viewer(self):
+    """
+    Unregister a viewer of the stream. The capture thread stops and releases
+    the camera after the last viewer left.
+    """
+    with self._frame_condition:
+      self._num_viewers -= 1
+
+  def _capture_frames(self, previous_thread: threading.Thread = None):
+    """
+    Capture thread: Read the camera, hand each frame to the QR decoder and
+    encode it once for all viewers. Runs while there are viewers.
+
+    Args:
+    previous_thread - Capture thread that is still stopping, it has to
+                      release the camera and stop the QR decoder first
+    """
+    if previous_thread is not None:
+      previous_thread.join()
+
+    info('[x] Start camera capture')
+    # Create OpenCV VideoCapture instance for the webcam
+    camera = cv.VideoCapture(camera_device_index)
+    self.qr_decoder.start()
+    try:
+      while True:
+        with self._frame_condition:
+          if self._num_viewers == 0:
+            # Leave in the same step as checking the viewers, a viewer that
+            # joins from now on starts a new capture thread
+            self._stop_capture_thread()
+            break
+
+        # Capture frame-by-frame
+        success, frame = camera.read()
+        if not success:
+          error('Failed to conntect to camera.')
+          with self._frame_condition:
+            self._stop_capture_thread()
+          break
+
         # Save the most recent valid frame without marker drawings
         self.captured_frame = frame
-        # Detect and mark QR markers in frame
-        (frame,
-         _,
-         num_markers,
-         decoded_list) = detect_and_decode_qr_marker(frame)
+        # Decode QR markers in the worker threads, does not wait for the
+        # result. The frame is not changed from here on.
+        self.qr_decoder.submit(frame)
 
-        # Process detected markers and notify UI
-        self.handle_marker_list(num_markers, decoded_list)
+        # Mark the QR markers of the latest decoded frame
+        markers = self.qr_decoder.get_markers()
+        if markers:
+          frame = draw_qr_markers(frame.copy(), markers)
 
         # Compile frame for output stream
         ret, buffer = cv.imencode('.jpg', frame)
-        frame = buffer.tobytes()
+        if not ret:
+          continue
 
-        yield (b'--frame\r\n'
-               # concat frame one by one and show result
-               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+        # Publish the frame to all viewers
+        with self._frame_condition:
+          self._jpeg_frame = buffer.tobytes()
+          self._frame_index += 1
+          self.num_frames_captured += 1
+          self._frame_condition.notify_all()
+        self.stream_rate.tick()
+    finally:
+      with self._frame_condition:
+        if self._capture_thread is threading.current_thread():
+          # Left by an exception
+          self._stop_capture_thread()
+      # A new capture thread waits for this one before it opens the camera
+      # and starts the QR decoder
+      self.qr_decoder.stop()
+      camera.release()
+      info('[x] Stopped camera capture')
+
+  def _stop_capture_thread(self):
+    """
+    Mark the current capture thread as stopping and wake up the viewers.
+    Must be called with _frame_condition held.
+    """
+    self._capture_thread = None
+    self._stopping_capture_thread = threading.current_thread()
+    self._frame_condition.notify_all()
+
+  def handle_decoded_markers(self, markers: list):
+    """
+    Callback of the QR decoder with the markers (decoded_text, polygon) of a
+    frame. Called from the decoder worker threads.
+    """
+    decoded_list = [decoded_text for (decoded_text, _) in markers]
+    self.handle_marker_list(len(decoded_list), decoded_list)
 
   def handle_marker_list(self, num_markers, decoded_list):
     """
@@ -80,9 +243,16 @@ class CameraServer():
     * Check if more than one marker is detected
     * Decode message from detected marker
     * Check message validity
-    * Update UI with detected marker
+    * Update UI with detected marker, once per hold-off window
 
+    In batch scan mode all markers are handled by handle_batch_marker_list()
     """
+    with self._batch_scan_lock:
+      is_batch_scan = self._batch_scan_ids is not None
+    if is_batch_scan:
+      self.handle_batch_marker_list(decoded_list)
+      return
+
     # Only use the decoded messages if one and only one marker is detected
     # within the image
     if num_markers == 1:
@@ -92,24 +262,83 @@ class CameraServer():
 
       # Check validity of the decoded item ID
       if is_valid:
+        if not self.scan_debouncer.accept(item_id):
+          # Same label as in the previous frames
+          return
         debug(f'[+--] Valid QR marker detected -> {item_id}')
 
-        # Way-around the not working direct communication between the
-        # camera server and UI server. -> Write message to file and
-        # detect/read the message using watchdog
-        with open("./temp/qr", "w") as text_file:
-          text_file.write(f'{item_id}')
+        # Notify the UI. This runs in a decoder thread, the scan is
+        # handed over to the UI event loop by the callback.
+        if self.fnct_update_id is not None:
+          self.fnct_update_id(item_id)
 
       else:
         info(f'Decoded message invalid {decoded_list[0]} -> {item_id}')
 
     elif num_markers > 1:
       warning(
-          f'Multiple ({num_markers}) QR marker detected within the image. Aborting compiling the decoded message.')
+          f'Multiple ({num_markers}) QR marker detected within the image. Aborting compiling the decoded message. Use the batch scan to scan several items at once.')
     else:
       # If list is empty -> do nothing
       pass
 
+  def handle_batch_marker_list(self, decoded_list):
+    """
+    Add the item IDs of all valid markers of a frame to the batch scan.
+    Every new item ID is passed to fnct_add_batch_id.
+    """
+    new_ids = []
+    for decoded_text in decoded_list:
+      is_valid, item_id = decode_id_from_qr_message(decoded_text)
+      if not is_valid:
+        debug(f'Decoded message invalid {decoded_text} -> {item_id}')
+        continue
+      with self._batch_scan_lock:
+        if self._batch_scan_ids is None or item_id in self._batch_scan_ids:
+          continue
+        self._batch_scan_ids[item_id] = None
+      new_ids.append(item_id)
+
+    for item_id in new_ids:
+      debug(f'[+--] Batch scan -> {item_id}')
+      if self.fnct_add_batch_id is not None:
+        self.fnct_add_batch_id(item_id)
+
+  def start_batch_scan(self):
+    """
+    Start a batch scan: Accept all valid QR markers of a frame, rather than
+    aborting on more than one, and collect the de-duplicated item IDs across
+    frames. Single scans are not reported while the batch scan runs.
+    """
+    with self._batch_scan_lock:
+      self._batch_scan_ids = {}
+    self._set_multi_marker_mode(True)
+    info('[x] Start batch scan')
+
+  def stop_batch_scan(self) -> list:
+    """
+    Stop the batch scan and return the scanned item IDs in the order of
+    scanning
+    """
+    with self._batch_scan_lock:
+      item_ids = list(self._batch_scan_ids or [])
+      self._batch_scan_ids = None
+    self._set_multi_marker_mode(False)
+    info(f'[x] Stopped batch scan, {len(item_ids)} items scanned')
+    return item_ids
+
+  def get_batch_scan_ids(self) -> list:
+    """
+    Return the item IDs scanned by the running batch scan, empty if no batch
+    scan runs
+    """
+    with self._batch_scan_lock:
+      return list(self._batch_scan_ids or [])
+
+  def _set_multi_marker_mode(self, enabled: bool):
+    if hasattr(self.qr_decoder.detector, 'set_multi_marker_mode'):
+      self.qr_decoder.detector.set_multi_marker_mode(enabled)
+
   def video_feed(self):
     """
     Video streaming route. Put this in the src attribute of an img tag
@@ -134,6 +363,26 @@ class CameraServer():
     # task
     return await asyncio.to_thread(start_flask)
 
+  def get_scan_stats(self) -> dict:
+    """
+    Return the statistics of the QR scans (scans, reported and suppressed
+    duplicates)
+    """
+    return self.scan_debouncer.get_stats()
+
+  def get_stream_stats(self) -> dict:
+    """
+    Return the statistics of the camera stream (viewers, captured frames,
+    frames sent to all viewers, frames per second) and of the QR decoding
+    """
+    with self._frame_condition:
+      stats = {"viewers": self._num_viewers,
+               "frames_captured": self.num_frames_captured,
+               "frames_sent": self.num_frames_sent}
+    stats["stream_fps"] = self.stream_rate.get_rate()
+    stats["qr_decoding"] = self.qr_decoder.get_stats()
+    return stats
+
   def get_last_frame(self):
     """
     Returns the last captured frame as a numpy array. 
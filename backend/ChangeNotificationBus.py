@@ -0,0 +1,167 @@
+"""
+
+Process wide notification of inventory changes
+
+One thread per process and database server polls the change feed of the
+inventory table (see DataBaseClient.get_changes_since()) and passes every
+change to all subscribers, e.g. the open frontend sessions. Each poll is a
+single primary key range read of the change feed. Subscribers learn which
+items changed, by this or any other process, and only refresh those items.
+
+"""
+import threading
+import time
+from logging import info, warning, debug
+
+from backend.DataBaseClient import DataBaseClient
+from backend.database_config import (database_port,
+                                     database_change_poll_interval_s,
+                                     database_change_prune_interval_s)
+
+
+class ChangeNotificationBus():
+  """
+  Poll the change feed of the inventory and notify the subscribers of the
+  changes. The polling thread runs while there are subscribers.
+  """
+
+  def __init__(self,
+               host: str,
+               port: int = database_port,
+               poll_interval_s: float = database_change_poll_interval_s,
+               prune_interval_s: float = database_change_prune_interval_s):
+    self.db_client = DataBaseClient(host=host, port=port)
+    self.poll_interval_s = poll_interval_s
+    self.prune_interval_s = prune_interval_s
+
+    # Subscription ID -> callback
+    self._subscribers = {}
+    self._next_subscription_id = 1
+    self._lock = threading.Lock()
+    self._stop_event = None
+    self._thread = None
+
+    # Version of the change feed the subscribers have been notified up to
+    self.version = None
+
+    # Statistics
+    self.num_polls = 0
+    self.num_notifications = 0
+    self.num_errors = 0
+
+  def subscribe(self, callback) -> int:
+    """
+    Register a callback for inventory changes. It is called from the polling
+    thread with the changes as returned by DataBaseClient.get_changes_since()
+    without rows: changed_ids, inserted_ids, deleted_ids and reload. If
+    reload is True changes have been missed and the subscriber has to
+    reload the inventory.
+
+    Returns the subscription ID to unsubscribe() with
+    """
+    with self._lock:
+      subscription_id = self._next_subscription_id
+      self._next_subscription_id += 1
+      self._subscribers[subscription_id] = callback
+
+      if self._thread is None:
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run,
+                                        args=(self._stop_event,),
+                                        name='ChangeNotificationBus',
+                                        daemon=True)
+        self._thread.start()
+    return subscription_id
+
+  def unsubscribe(self, subscription_id: int):
+    """
+    Remove a subscription. The polling thread stops with the last
+    subscription.
+    """
+    with self._lock:
+      self._subscribers.pop(subscription_id, None)
+      if not self._subscribers and self._thread is not None:
+        self._stop_event.set()
+        self._thread = None
+
+  def get_stats(self) -> dict:
+    """
+    Return the statistics of the bus (polls, notifications, errors)
+    """
+    with self._lock:
+      num_subscribers = len(self._subscribers)
+    return {"subscribers": num_subscribers,
+            "version": self.version,
+            "polls": self.num_polls,
+            "notifications": self.num_notifications,
+            "errors": self.num_errors}
+
+  def _run(self, stop_event: threading.Event):
+    info('[x] Start change notification bus')
+    time_last_prune = None
+    while not stop_event.is_set():
+      try:
+        if self.version is None:
+          # Only changes from now on are of interest
+          self.version = self.db_client.get_change_version()
+        self._poll()
+        if (time_last_prune is None or
+                time.monotonic() - time_last_prune > self.prune_interval_s):
+          num_pruned = self.db_client.prune_inventory_changes()
+          debug(f'Pruned {num_pruned} changes from the change feed')
+          time_last_prune = time.monotonic()
+      except Exception as e:
+        self.num_errors += 1
+        warning(f'[!] Polling the inventory change feed failed: {e}')
+      stop_event.wait(self.poll_interval_s)
+    info('[x] Stopped change notification bus')
+
+  def _poll(self):
+    """
+    Read all changes since the last poll and notify the subscribers
+    """
+    has_more = True
+    while has_more:
+      changes = self.db_client.get_changes_since(self.version,
+                                                 include_rows=False)
+      self.num_polls += 1
+      has_more = changes["has_more"]
+
+      if changes["reload"]:
+        warning('[!] Missed changes of the inventory, subscribers reload')
+        changes["version"] = self.db_client.get_change_version()
+        has_more = False
+      elif not changes["changed_ids"]:
+        return
+
+      self.version = changes["version"]
+      self._notify(changes)
+
+  def _notify(self, changes: dict):
+    with self._lock:
+      callbacks = list(self._subscribers.values())
+    self.num_notifications += 1
+    for callback in callbacks:
+      try:
+        callback(changes)
+      except Exception as e:
+        self.num_errors += 1
+        warning(f'[!] Change notification callback failed: {e}')
+
+
+_buses = {}
+_buses_lock = threading.Lock()
+
+
+def get_change_notification_bus(host: str,
+                                port: int = database_port) -> ChangeNotificationBus:
+  """
+  Return the process wide change notification bus for the given database
+  server. The bus is created on first use.
+  """
+  with _buses_lock:
+    bus = _buses.get((host, port))
+    if bus is None:
+      bus = ChangeNotificationBus(host, port)
+      _buses[(host, port)] = bus
+    return bus
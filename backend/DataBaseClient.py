@@ -1,129 +1,108 @@
-import mariadb
-from logging import info, warning, debug, error
+import csv
+import re
+import threading
+from contextlib import contextmanager
+from io import StringIO
+from logging import info, warning
 import pandas as pd
-import os
 from pathlib import Path
 import cv2 as cv
+from datetime import datetime
 
 from backend.database_config import (INVENTORY_TABLE_NAME,
-                                     INVENTORY_DB_NAME,
                                      INVENTORY_USER_TABLE_NAME,
-                                     media_directory)
-from backend.InventoryItem import InventoryItem
+                                     INVENTORY_FULLTEXT_COLUMNS,
+                                     ITEM_TAG_TABLE_NAME,
+                                     LOCATION_TABLE_NAME,
+                                     CHECKOUT_EVENT_TABLE_NAME,
+                                     CHECKOUT_EVENT_CHECK_OUT,
+                                     CHECKOUT_EVENT_CHECK_IN,
+                                     INVENTORY_CHANGE_TABLE_NAME,
+                                     database_port,
+                                     database_fetch_batch_size,
+                                     database_change_feed_batch_size,
+                                     database_change_feed_settle_s,
+                                     database_change_feed_retention_s)
+from backend.DataBaseConnectionPool import get_connection_pool
+from backend.InventoryItem import (InventoryItem,
+                                   parse_item_tags,
+                                   format_item_tags)
 from backend.InventoryUser import InventoryUser
 
+# Columns of the inventory table that can be used to sort and are exported
+_inventory_columns = ['id'] + InventoryItem('').get_item_property_classes()
 
-class DataBaseClient():
-
-  def __init__(self, host: str, port: int = 46123):
-    self.connection_config = {
-        'user': 'inventory_user',
-        'password': 'inventory24',
-        'host': host,  # or use the container name 'mariadb'
-        'port': port,
-        'database': 'inventory',
-        'connect_timeout': 0
-    }
-
-    try:
-      # Establishing the connection with the database server
-      self.connection = mariadb.connect(**self.connection_config)
-
-      # Perform database operations
-      self.cursor = self.connection.cursor()
-      self.cursor.execute("SELECT DATABASE()")
-
-      info("[x] Connected to the inventory database")
-    except mariadb.Error as e:
-      error('')
-      raise RuntimeError(f"Error connecting to MariaDB: {e}")
-
-    # -- Ensure that database exists --
-    if not self.is_database(INVENTORY_DB_NAME):
-      warning(
-          f' {INVENTORY_DB_NAME} database not found.')
-      self.create_database(INVENTORY_DB_NAME)
-      info(f'[x] Created database: {INVENTORY_DB_NAME}')
-    else:
-      info(f'[x] {INVENTORY_DB_NAME} database found.')
+# Text columns of the inventory table that are searched with a plain
+# substring match if the search query contains no searchable word
+_inventory_search_columns = ['item_name',
+                             'item_description',
+                             'manufacturer',
+                             'manufacturer_contact',
+                             'check_out_poc',
+                             'item_tags',
+                             'item_location']
 
-    # Use inventory database from here onwards
-    self.cursor.execute(f"USE {INVENTORY_DB_NAME}")
 
-    # -- Ensure that inventory table exists --
-    if not self.is_table(INVENTORY_TABLE_NAME):
-      warning(
-          f' {INVENTORY_TABLE_NAME} table not found.')
-      self.create_inventory_table()
-      info(f'|-> Created table: {INVENTORY_TABLE_NAME}')
-    else:
-      info(f'[x] {INVENTORY_TABLE_NAME} table found.')
-
-    # -- Ensure that inventory user table exists --
-    if not self.is_table(INVENTORY_USER_TABLE_NAME):
-      warning(
-          f' {INVENTORY_USER_TABLE_NAME} table not found.')
-      self.create_inventory_user_table()
-      info(f'|-> Created table: {INVENTORY_USER_TABLE_NAME}')
-    else:
-      info(f'[x] {INVENTORY_USER_TABLE_NAME} table found.')
+class DataBaseClient():
 
-    # Initialize media folder
-    self.init_media_dir()
+  def __init__(self, host: str, port: int = database_port):
+    # All clients of this process share one bounded pool of connections per
+    # database server. Creating a client is therefore cheap and does not open
+    # a new connection.
+    # [!] The database schema is not checked here. It is set up once at
+    #     start-up by backend.database_bootstrap.bootstrap_database()
+    self.pool = get_connection_pool(host, port)
+    # Connection of the transaction of the calling thread (see transaction())
+    self._local = threading.local()
 
   def close(self):
     """
+    Release this client. Connections are owned by the process wide pool and
+    stay open for reuse by other clients.
     """
-    self.cursor.close()
-    self.connection.close()
-
-  # -----------------------------------------------------------------------
-  #                        [LIST & SEARCH]
-  # -----------------------------------------------------------------------
+    pass
 
-  def list_tables(self):
+  def get_pool_stats(self) -> dict:
     """
-    Return a list of all tables
+    Return the statistics of the connection pool used by this client
+    (checkouts, wait times, open connections)
     """
-    self.cursor.execute("SHOW TABLES;")
-    db_list = []
-    for (databases) in self.cursor:
-      db_list.append(databases[0])
-    return db_list
+    return self.pool.get_stats()
 
-  def list_databases(self):
-    """
-    Return a list of all databases
+  @contextmanager
+  def transaction(self):
     """
-    self.cursor.execute("SHOW DATABASES")
-    db_list = []
-    for (databases) in self.cursor:
-      db_list.append(databases[0])
-    return db_list
+    Context manager to run several statements as one unit of work:
 
-  def is_database(self, database_name: str) -> bool:
-    """
-    Check if database of given name exists. If so return True, False 
-    otherwise
+      with db_client.transaction():
+        db_client.update_inventory_item(...)
+        db_client.update_inventory_item_image_path(...)
 
-    """
-    db_list = self.list_databases()
-    for element in db_list:
-      if element == str(database_name):
-        return True
-    return False
+    All statements this client executes in the calling thread within the
+    with-block run on the same connection and are committed once when the
+    block ends. If the block raises, all of them are rolled back.
+    Transactions do not nest, an inner transaction() joins the outer one.
 
-  def is_table(self, table_name: str) -> bool:
+    Outside of a transaction every statement is committed on its own
+    (autocommit) and reads do not commit at all.
     """
-    Check if table of given name exists. If so return True, False 
-    otherwise
+    pooled = getattr(self._local, 'pooled', None)
+    if pooled is not None:
+      yield pooled.connection
+      return
+
+    with self.pool.pooled_connection() as pooled:
+      pooled.connection.begin()
+      self._local.pooled = pooled
+      try:
+        yield pooled.connection
+        pooled.connection.commit()
+      finally:
+        self._local.pooled = None
 
-    """
-    table_list = self.list_tables()
-    for element in table_list:
-      if element == str(table_name):
-        return True
-    return False
+  # -----------------------------------------------------------------------
+  #                        [LIST & SEARCH]
+  # -----------------------------------------------------------------------
 
   def show_inventory_content(self):
     """
@@ -132,129 +111,240 @@ class DataBaseClient():
     df = self.get_inventory_as_df()
     info(df)
 
-  def get_inventory_as_df(self):
+  def get_inventory_as_df(self, query: str = '', tag: str = '',
+                          location_id: int = None):
     """
-    Return all content from a database in a pandas dataframe
+    Return all content from a database in a pandas dataframe. If query is
+    set, only items matching this search query are returned. If tag is set,
+    only items with this tag are returned. If location_id is set, only items
+    stored in this location or any location within it are returned.
     """
-    # Query to fetch all data from the specified table
-    query = f"SELECT * FROM {INVENTORY_TABLE_NAME}"
-
-    # Execute the query
-    self.cursor.execute(query)
-
-    self.connection.commit()
+    where_clause, where_values, _, _ = self._get_inventory_search(
+        query, tag, location_id)
 
-    # Fetch all rows from the executed query
-    rows = self.cursor.fetchall()
+    # Query to fetch all data from the specified table
+    sql = f"SELECT * FROM {INVENTORY_TABLE_NAME}{where_clause}"
 
-    # Get column names from the cursor
-    columns = [col[0] for col in self.cursor.description]
+    # Execute the query and fetch all rows and the column names
+    columns, rows = self._fetch_all(sql, where_values)
 
     # Create a DataFrame from the fetched data
     df = pd.DataFrame(rows, columns=columns)
 
     return df
 
-  def get_inventory_item_as_df(self, item_id):
+  def iter_inventory_csv(self,
+                         query: str = '',
+                         batch_size: int = database_fetch_batch_size,
+                         tag: str = '',
+                         location_id: int = None):
     """
-    Return a specific inventory item identified by its ID from a database 
-    in a pandas dataframe
+    Export the inventory in csv format without loading it into memory. The
+    rows are streamed from the database in batches of batch_size rows. If
+    query is set, only items matching this search query are exported. If tag
+    is set, only items with this tag are exported. If location_id is set,
+    only items stored in this location or any location within it are
+    exported.
+
+    Yields the csv content as strings, the header line first and then one
+    chunk per batch of rows.
     """
-    # Query to fetch all data from the specified table
-    query = f"SELECT * FROM {INVENTORY_TABLE_NAME} WHERE ID = %s"
+    where_clause, where_values, _, _ = self._get_inventory_search(
+        query, tag, location_id)
+
+    # The columns of the InventoryItem only, so the file can be imported
+    # again with import_from_csv.py
+    sql = (f"SELECT {', '.join(_inventory_columns)} FROM "
+           f"{INVENTORY_TABLE_NAME}{where_clause} ORDER BY id ASC")
+
+    for (columns, rows) in self.iter_sql_query(sql, where_values, batch_size):
+      csv_buffer = StringIO()
+      csv_writer = csv.writer(csv_buffer, lineterminator='\n')
+      if columns is not None:
+        csv_writer.writerow(columns)
+      csv_writer.writerows(rows)
+      yield csv_buffer.getvalue()
+
+  def get_inventory_page(self,
+                         page: int = 1,
+                         items_per_page: int = 25,
+                         sort_by: list = [],
+                         sort_desc: list = [],
+                         query: str = '',
+                         tag: str = '',
+                         location_id: int = None):
+    """
+    Return a single page of the inventory table. Filtering, sorting and
+    paging are done by the database, so only the requested rows are
+    transferred.
+
+    Args:
+    page - Page number, starting at 1
+    items_per_page - Number of items per page
+    sort_by - Column names to sort by, in order of precedence
+    sort_desc - Flags, True to sort the column at the same index descending
+    query - If set, only return items matching this search query. Without
+            explicit sorting matches are ranked by relevance.
+    tag - If set, only return items with this tag
+    location_id - If set, only return items stored in this location or any
+                  location within it
+
+    Returns
+    rows - List of dictionaries (column name -> value), one per item
+    total - Total number of items matching the query and the filters
+    """
+    (where_clause,
+     where_values,
+     rank_term,
+     rank_values) = self._get_inventory_search(query, tag, location_id)
+
+    # Compile ORDER BY clause. Only accept known column names as they are
+    # put into the query as-is
+    order_terms = []
+    for (index, column) in enumerate(sort_by):
+      if column not in _inventory_columns:
+        warning(f'Ignore sorting by unknown column {column}')
+        continue
+      is_desc = index < len(sort_desc) and bool(sort_desc[index])
+      order_terms.append(f'{column} {"DESC" if is_desc else "ASC"}')
+    # Without explicit sorting show the most relevant search results first
+    order_values = []
+    if not order_terms and rank_term is not None:
+      order_terms.append(f'{rank_term} DESC')
+      order_values = rank_values
+    # Sort by ID last so pages have a stable order
+    if 'id' not in sort_by:
+      order_terms.append('id ASC')
+
+    offset = (max(int(page), 1) - 1) * int(items_per_page)
+
+    sql = (f"SELECT * FROM {INVENTORY_TABLE_NAME}{where_clause} "
+           f"ORDER BY {', '.join(order_terms)} LIMIT ? OFFSET ?")
+    columns, rows = self._fetch_all(sql,
+                                    where_values + order_values +
+                                    [int(items_per_page), offset])
+
+    count_sql = f"SELECT COUNT(*) FROM {INVENTORY_TABLE_NAME}{where_clause}"
+    _, count_rows = self._fetch_all(count_sql, where_values)
+
+    return ([self._row_to_dict(columns, row) for row in rows],
+            int(count_rows[0][0]))
+
+  def search_inventory_ids(self, query: str, limit: int = 100) -> list:
+    """
+    Return the IDs of the items matching a search query, most relevant
+    first. The search uses the FULLTEXT index of the inventory table, every
+    word of the query matches words starting with it.
+    """
+    (where_clause,
+     where_values,
+     rank_term,
+     rank_values) = self._get_inventory_search(query)
+
+    if rank_term is None:
+      order_term = 'id ASC'
+      rank_values = []
+    else:
+      order_term = f'{rank_term} DESC'
 
-    # Execute the query
-    self.exec_sql_cmd(query, (item_id,))
+    sql = (f"SELECT id FROM {INVENTORY_TABLE_NAME}{where_clause} "
+           f"ORDER BY {order_term} LIMIT ?")
+    _, rows = self._fetch_all(sql,
+                              where_values + rank_values + [int(limit)])
 
-    # Fetch all rows from the executed query
-    rows = self.cursor.fetchall()
+    return [row[0] for row in rows]
 
-    # Get column names from the cursor
-    columns = [col[0] for col in self.cursor.description]
+  def get_checked_out_items_as_df(self, checked_out_before: datetime = None):
+    """
+    Return all checked out items in a pandas dataframe, the longest checked
+    out first. If checked_out_before is set, only return items that have been
+    checked out before this time (e.g. overdue items). The query is resolved
+    by the (is_checked_out, check_out_date) index.
+    """
+    sql = f"SELECT * FROM {INVENTORY_TABLE_NAME} WHERE is_checked_out = 1"
+    values = []
+    if checked_out_before is not None:
+      sql += " AND check_out_date < ?"
+      values.append(checked_out_before)
+    sql += " ORDER BY check_out_date ASC"
 
-    # Create a DataFrame from the fetched data
-    df = pd.DataFrame(rows, columns=columns)
+    columns, rows = self._fetch_all(sql, values)
+    return pd.DataFrame(rows, columns=columns)
 
-    info(f'Inventory data {df}')
+  def get_items_added_between_as_df(self, start: datetime, end: datetime):
+    """
+    Return all items added in the time range [start, end) in a pandas
+    dataframe, in the order they were added. The query is resolved by the
+    date_added index.
+    """
+    sql = (f"SELECT * FROM {INVENTORY_TABLE_NAME} "
+           "WHERE date_added >= ? AND date_added < ? ORDER BY date_added ASC")
 
-    return df
+    columns, rows = self._fetch_all(sql, [start, end])
+    return pd.DataFrame(rows, columns=columns)
 
-  def get_inventory_item_as_object(self, item_id):
+  def get_inventory_item_as_df(self, item_id):
     """
     Return a specific inventory item identified by its ID from a database 
-    as a InventoryItem instance
+    in a pandas dataframe
     """
     # Query to fetch all data from the specified table
     query = f"SELECT * FROM {INVENTORY_TABLE_NAME} WHERE ID = %s"
 
-    # Execute the query
-    self.exec_sql_cmd(query, (item_id,))
-
-    # Fetch all rows from the executed query
-    rows = self.cursor.fetchall()
+    # Execute the query and fetch all rows and the column names
+    columns, rows = self._fetch_all(query, (item_id,))
 
-    # Get column names from the cursor
-    columns = [col[0] for col in self.cursor.description]
-
-    # Create InventoryItem instance
-    inventoryItem = InventoryItem('')
-
-    # Populate all fields from the database export
-    inventoryItem.populate_from_df(
-        item_data_df=pd.DataFrame(rows, columns=columns))
-
-    return inventoryItem
+    # Create a DataFrame from the fetched data
+    df = pd.DataFrame(rows, columns=columns)
 
-  # ------------------------------------------------------------------------
-  #                        [MODIFY]
-  # ------------------------------------------------------------------------
+    info(f'Inventory data {df}')
 
-  def create_database(self, database_name: str):
-    """
-    Create database
-    """
-    query = f'CREATE DATABASE `{database_name}`;'
-    self.cursor.execute(query)
+    return df
 
-  def create_inventory_table(self):
+  def get_inventory_item(self, item_id):
     """
-    Create inventory table 
+    Return a specific inventory item identified by its ID as InventoryItem
+    instance, None if there is no item with this ID. The item is built
+    straight from the fetched row.
     """
-    # Create dummy InventoryItem and get query
-    item = InventoryItem('')
-    query = item.get_sql_query_table_for_item()
+    query = f"SELECT * FROM {INVENTORY_TABLE_NAME} WHERE id = ?"
 
-    # Execute query
-    self.cursor.execute(query)
+    # Execute the query and fetch the row and the column names
+    columns, rows = self._fetch_all(query, (item_id,), prepared=True)
 
-    # Commit the transaction
-    self.connection.commit()
+    if not rows:
+      return None
+    return InventoryItem.from_row(columns, rows[0])
 
-  def create_inventory_user_table(self):
+  def get_inventory_item_as_object(self, item_id):
     """
-    Create inventory user table 
+    Return a specific inventory item identified by its ID from a database 
+    as a InventoryItem instance. If there is no item with this ID an empty
+    InventoryItem is returned.
     """
-    # Create dummy InventoryItem and get query
-    user = InventoryUser('', '')
-    query = user.get_sql_query_table_for_user()
+    inventoryItem = self.get_inventory_item(item_id)
+    if inventoryItem is None:
+      warning(f'No inventory item with ID {item_id}')
+      inventoryItem = InventoryItem('')
 
-    # Execute query
-    self.cursor.execute(query)
+    return inventoryItem
 
-    # Commit the transaction
-    self.connection.commit()
+  # ------------------------------------------------------------------------
+  #                        [MODIFY]
+  # ------------------------------------------------------------------------
 
-  def _get_last_inserted_id(self) -> int:
+  def _get_last_inserted_id(self, cursor) -> int:
     """
-    Returns the ID of the most recent added item
+    Returns the ID of the most recent item added through the connection of
+    the given cursor
 
     """
     sql = 'SELECT LAST_INSERT_ID()'
     # Execute the query
-    self.exec_sql_cmd(sql, [])
+    cursor.execute(sql, [])
 
     # Fetch all rows from the executed query
-    id_list = self.cursor.fetchall()
+    id_list = cursor.fetchall()
     id_out = -1
     if len(id_list) == 1:
       id_out = id_list[0]
@@ -269,20 +359,115 @@ class DataBaseClient():
 
     returns ID of the created inventory item
     """
-    # SQL query to insert a new row into the table
+    # The item and its tags are added in one transaction
+    with self.transaction(), self._pooled_connection() as pooled:
+      id_out = self._insert_inventory_item(pooled, inventory_item)
+      self._write_item_tags(pooled, {id_out: inventory_item.get_tags()})
+
+    return id_out
+
+  def add_inventory_items(self, inventory_items: list) -> list:
+    """
+    Create one row per InventoryItem in INVENTORY_TABLE_NAME, along with
+    their tags in one transaction.
+
+    If the server assigns the IDs of a multi-row INSERT as one block
+    (innodb_autoinc_lock_mode 0 or 1, the MariaDB default), all items are
+    inserted with a single statement. Otherwise, e.g. on Galera clusters,
+    concurrent inserts may interleave, so the items are inserted one by one
+    to read the ID of each.
+
+    Returns the IDs of the created items, in the order of inventory_items
+    """
+    if not inventory_items:
+      return []
+
+    with self.transaction(), self._pooled_connection() as pooled:
+      cursor = pooled.connection.cursor()
+      cursor.execute('SELECT @@auto_increment_increment, '
+                     '@@innodb_autoinc_lock_mode')
+      (id_increment, autoinc_lock_mode) = cursor.fetchall()[0]
+
+      if int(autoinc_lock_mode) in [0, 1]:
+        sql_templates = InventoryItem.get_sql_templates()
+        # INSERT ... VALUES ( ?, ... ), ( ?, ... ), ...
+        sql = ', '.join([sql_templates["insert"]] +
+                        [sql_templates["insert_row"]] *
+                        (len(inventory_items) - 1))
+        values = []
+        for inventory_item in inventory_items:
+          values += inventory_item.get_item_values()
+        cursor.execute(sql, values)
+        # LAST_INSERT_ID() returns the ID of the first row of a multi-row
+        # INSERT, the following rows are auto_increment_increment apart
+        first_id = self._get_last_inserted_id(cursor)
+        ids = [first_id + index * int(id_increment)
+               for index in range(len(inventory_items))]
+      else:
+        ids = [self._insert_inventory_item(pooled, inventory_item)
+               for inventory_item in inventory_items]
+      cursor.close()
+
+      self._write_item_tags(pooled,
+                            {id: inventory_item.get_tags()
+                             for (id, inventory_item)
+                             in zip(ids, inventory_items)})
+
+    return ids
+
+  def _insert_inventory_item(self, pooled, inventory_item: InventoryItem) -> int:
+    """
+    Insert a single row into INVENTORY_TABLE_NAME through a checked out
+    connection and return its ID
+    """
     sql, values = inventory_item.get_sql_query_add_item()
+    cursor = self.pool.get_prepared_cursor(pooled, sql)
+    cursor.execute(sql, values)
+    # The ID is reported along with the result of the INSERT. Otherwise
+    # query it, LAST_INSERT_ID() is tracked per connection so it has to
+    # run on the same connection.
+    id_out = cursor.lastrowid
+    if not id_out:
+      id_cursor = pooled.connection.cursor()
+      id_out = self._get_last_inserted_id(id_cursor)
+      id_cursor.close()
+    return id_out
 
-    self.exec_sql_cmd(sql, values)
+  def upsert_inventory_items(self, inventory_items: list, ids: list):
+    """
+    Create or replace the inventory items with the given IDs, all in one
+    transaction. Items whose ID exists are updated, all others are created
+    with that ID.
+
+    Args:
+    inventory_items - List of InventoryItem instances
+    ids - ID of each item in inventory_items
+    """
+    if not inventory_items:
+      return
+
+    sql = InventoryItem.get_sql_templates()["upsert"]
+    values = [[id] + inventory_item.get_item_values()
+              for (inventory_item, id) in zip(inventory_items, ids)]
 
-    return self._get_last_inserted_id()
+    with self.transaction(), self._pooled_connection() as pooled:
+      self.pool.get_prepared_cursor(pooled, sql).executemany(sql, values)
+      self._write_item_tags(pooled,
+                            {id: inventory_item.get_tags()
+                             for (inventory_item, id)
+                             in zip(inventory_items, ids)},
+                            replace=True)
 
   def update_inventory_item(self, inventory_item: InventoryItem, id: int):
     """
     Modify and inventory item identified by ID with given values
     """
     sql, values = inventory_item.get_sql_query_update_item(id)
-    # Execute the UPDATE statement
-    self.exec_sql_cmd(sql, values)
+    # Update the item and replace its tags in one transaction
+    with self.transaction(), self._pooled_connection() as pooled:
+      self.pool.get_prepared_cursor(pooled, sql).execute(sql, values)
+      self._write_item_tags(pooled, {id: inventory_item.get_tags()},
+                            replace=True)
 
   def update_inventory_item_image_path(self, id: int, path: str):
     """
@@ -293,59 +478,848 @@ class DataBaseClient():
     values = [path] + [id]
 
     # Execute the UPDATE statement
-    self.exec_sql_cmd(sql, values)
+    self.exec_sql_cmd(sql, values, prepared=True)
 
   def update_inventory_item_checkout_status(self, id: int,
                                             inventory_item: InventoryItem):
     """
     Modify the  item checkout status of an inventory item identified by ID 
-    with the parameters of a provided InventoryItem
+    with the parameters of a provided InventoryItem. The change is recorded
+    as check-out or check-in event of check_out_poc in the checkout event
+    table, in the same transaction.
     """
     sql = f"UPDATE {
         INVENTORY_TABLE_NAME} SET is_checked_out = ?, check_out_date = ?, check_out_poc = ? WHERE id = ?"
-    values = [inventory_item.is_checked_out] + \
-        [inventory_item.check_out_date] + [inventory_item.check_out_poc] + [id]
+    item_dict = inventory_item.get_item_dict()
+    values = [item_dict['is_checked_out'],
+              item_dict['check_out_date'],
+              item_dict['check_out_poc'],
+              id]
+
+    if item_dict['is_checked_out']:
+      event_type = CHECKOUT_EVENT_CHECK_OUT
+      event_date = item_dict['check_out_date']
+    else:
+      event_type = CHECKOUT_EVENT_CHECK_IN
+      event_date = None
+    if event_date is None:
+      event_date = datetime.now().replace(microsecond=0)
 
-    # Execute the UPDATE statement
-    self.exec_sql_cmd(sql, values)
+    # Execute the UPDATE statement and record the event
+    with self.transaction():
+      self.exec_sql_cmd(sql, values, prepared=True)
+      self._add_checkout_event(id, event_type,
+                               item_dict['check_out_poc'], event_date)
 
   def delete_inventory_item(self, id: int):
     """
-    Delete Inventory item
+    Delete Inventory item. Its tags are deleted along with it (ON DELETE
+    CASCADE).
     """
     sql = f"DELETE FROM {INVENTORY_TABLE_NAME} WHERE id = ?"
     values = list([id])
 
     # Execute the DELETE statement
-    self.exec_sql_cmd(sql, values)
+    self.exec_sql_cmd(sql, values, prepared=True)
 
-  def exec_sql_cmd(self, sql, values: list):
+  def exec_sql_cmd(self, sql, values: list, prepared: bool = False):
     """
     Generic execute SQL command defined by sql qery and its accompanying 
-    values
+    values. The command is committed right away, or with the surrounding
+    transaction().
+
+    If prepared is True the command is run as server side prepared
+    statement that is kept on the pooled connection for reuse. Use this for
+    frequently executed commands with constant SQL text.
 
     """
-    # Execute the UPDATE statement
-    self.cursor.execute(sql, values)
+    with self._pooled_connection() as pooled:
+      if prepared:
+        self.pool.get_prepared_cursor(pooled, sql).execute(sql, values)
+      else:
+        cursor = pooled.connection.cursor()
+        cursor.execute(sql, values)
+        cursor.close()
+
+  def _get_inventory_search(self, query: str, tag: str = '',
+                            location_id: int = None):
+    """
+    Compile the search condition for a search query, a tag and a location
+    filter.
+
+    Each word of the query has to match the start of a word in any of the
+    INVENTORY_FULLTEXT_COLUMNS (prefix matching, so search-as-you-type finds
+    items from the first typed characters on). The FULLTEXT index resolves
+    this without scanning the table.
+
+    If tag is set only items with this tag match. The tag is looked up in
+    the (tag, item_id) index of the item tag table.
+
+    If location_id is set only items stored in this location or any location
+    within it match. The locations of the subtree are a prefix range of the
+    location path index.
+
+    Returns
+    where_clause - WHERE clause, empty if no filter applies
+    where_values - Values of the WHERE clause
+    rank_term - Expression to rank matches by relevance, None if the query
+                cannot be ranked
+    rank_values - Values of rank_term
+    """
+    conditions = []
+    where_values = []
+    rank_term = None
+    rank_values = []
+
+    # Only use word characters. Everything else is either a word delimiter
+    # for the full-text parser or a boolean mode operator.
+    words = re.findall(r'\w+', query) if query else []
+
+    if query and not words:
+      # No searchable word (e.g. only punctuation) -> plain substring match
+      pattern = (query.replace('\\', '\\\\')
+                 .replace('%', '\\%')
+                 .replace('_', '\\_'))
+      pattern = f'%{pattern}%'
+      conditions.append('(' + ' OR '.join(
+          [f'{column} LIKE ?' for column in _inventory_search_columns]) + ')')
+      where_values += [pattern for _ in _inventory_search_columns]
+    elif words:
+      # Boolean mode: '+' -> word is required, '*' -> prefix match
+      search_expression = ' '.join([f'+{word}*' for word in words])
+      rank_term = (f"MATCH ({', '.join(INVENTORY_FULLTEXT_COLUMNS)}) "
+                   "AGAINST (? IN BOOLEAN MODE)")
+      rank_values = [search_expression]
+      conditions.append(rank_term)
+      where_values.append(search_expression)
+
+    if tag:
+      conditions.append(f'id IN (SELECT item_id FROM {ITEM_TAG_TABLE_NAME} '
+                        'WHERE tag = ?)')
+      where_values.append(tag)
+
+    if location_id is not None:
+      conditions.append(f'location_id IN ({self._get_location_subtree_sql()})')
+      where_values.append(int(location_id))
+
+    if not conditions:
+      return '', [], None, []
+
+    return (f' WHERE {" AND ".join(conditions)}',
+            where_values,
+            rank_term,
+            rank_values)
+
+  def _row_to_dict(self, columns: list, row: tuple) -> dict:
+    """
+    Convert a result row to a dictionary that can be serialized to JSON
+    """
+    row_dict = {}
+    for (column, value) in zip(columns, row):
+      if not (value is None or isinstance(value, (str, int, float, bool))):
+        value = str(value)
+      row_dict[column] = value
+    return row_dict
+
+  @contextmanager
+  def _pooled_connection(self):
+    """
+    Context manager that provides the PooledConnection of the current
+    transaction() or, outside of a transaction, one from the pool
+    """
+    pooled = getattr(self._local, 'pooled', None)
+    if pooled is not None:
+      yield pooled
+    else:
+      with self.pool.pooled_connection() as pooled:
+        yield pooled
+
+  def _fetch_all(self, sql, values: list = (), prepared: bool = False):
+    """
+    Execute a query and return its column names and all resulting rows. If
+    prepared is True the query is run as prepared statement (see
+    exec_sql_cmd()).
+
+    """
+    with self._pooled_connection() as pooled:
+      if prepared:
+        cursor = self.pool.get_prepared_cursor(pooled, sql)
+      else:
+        cursor = pooled.connection.cursor()
+      cursor.execute(sql, values)
+      # Statements without a result set (e.g. DDL) have no description
+      if cursor.description is None:
+        columns, rows = [], []
+      else:
+        columns = [col[0] for col in cursor.description]
+        rows = cursor.fetchall()
+      if not prepared:
+        cursor.close()
+
+    return columns, rows
+
+  def iter_sql_query(self, sql, values: list = (),
+                     batch_size: int = database_fetch_batch_size):
+    """
+    Execute a query on a pooled connection and stream the resulting rows
+    with an unbuffered cursor, so the result set is never held in memory as
+    a whole. The connection stays checked out until the generator is
+    exhausted or closed.
+
+    Yields (columns, rows) tuples with up to batch_size rows each. columns
+    holds the column names for the first batch and is None afterwards.
+    """
+    with self.pool.connection() as connection:
+      cursor = connection.cursor(buffered=False)
+      try:
+        cursor.execute(sql, values)
+        columns = [col[0] for col in cursor.description]
+        while True:
+          rows = cursor.fetchmany(batch_size)
+          if columns is None and not rows:
+            break
+          yield columns, rows
+          if len(rows) < batch_size:
+            break
+          columns = None
+      finally:
+        cursor.close()
 
-    # Commit the transaction
-    self.connection.commit()
   # -----------------------------------------------------------------------
-  #                        [MISC]
+  #                        [TAGS]
+  # -----------------------------------------------------------------------
+  # The tags of each item are stored twice: As rows of ITEM_TAG_TABLE_NAME,
+  # which back the tag queries, and as denormalized item_tags text of the
+  # item for display and the full-text search. All writes keep both in sync
+  # within one transaction.
+
+  def get_item_tags(self, item_id: int) -> list:
+    """
+    Return the tags of an inventory item, sorted by name
+    """
+    sql = (f"SELECT tag FROM {ITEM_TAG_TABLE_NAME} WHERE item_id = ? "
+           "ORDER BY tag ASC")
+    _, rows = self._fetch_all(sql, (item_id,), prepared=True)
+    return [row[0] for row in rows]
+
+  def set_item_tags(self, item_id: int, tags: list):
+    """
+    Replace all tags of an inventory item
+    """
+    tags = parse_item_tags(';'.join(tags))
+    with self.transaction(), self._pooled_connection() as pooled:
+      self._write_item_tags(pooled, {item_id: tags}, replace=True)
+      sql = f"UPDATE {INVENTORY_TABLE_NAME} SET item_tags = ? WHERE id = ?"
+      self.pool.get_prepared_cursor(pooled, sql).execute(
+          sql, [format_item_tags(tags), item_id])
+
+  def add_item_tags(self, item_id: int, tags: list):
+    """
+    Add tags to an inventory item. Tags the item already has are skipped.
+    """
+    with self.transaction():
+      current_tags = self._lock_item_tags(item_id)
+      self.set_item_tags(item_id, current_tags + list(tags))
+
+  def remove_item_tags(self, item_id: int, tags: list):
+    """
+    Remove tags from an inventory item. Tags are matched ignoring case, tags
+    the item does not have are skipped.
+    """
+    removed_tags = [tag.strip().lower() for tag in tags]
+    with self.transaction():
+      current_tags = self._lock_item_tags(item_id)
+      self.set_item_tags(item_id, [tag for tag in current_tags
+                                   if tag.lower() not in removed_tags])
+
+  def get_tag_counts(self, limit: int = None) -> list:
+    """
+    Return the tag facets of the inventory: (tag, number of items) tuples,
+    the most used tag first. The counts are computed from the
+    (tag, item_id) index of the item tag table alone.
+
+    Args:
+    limit - Maximum number of tags to return, all tags if None
+    """
+    sql = (f"SELECT tag, COUNT(*) AS num_items FROM {ITEM_TAG_TABLE_NAME} "
+           "GROUP BY tag ORDER BY num_items DESC, tag ASC")
+    values = []
+    if limit is not None:
+      sql += " LIMIT ?"
+      values.append(int(limit))
+    _, rows = self._fetch_all(sql, values)
+    return [(tag, int(num_items)) for (tag, num_items) in rows]
+
+  def get_item_ids_by_tag(self, tag: str, limit: int = None) -> list:
+    """
+    Return the IDs of all items with a tag in ascending order. The tag is
+    matched ignoring case.
+    """
+    sql = (f"SELECT item_id FROM {ITEM_TAG_TABLE_NAME} WHERE tag = ? "
+           "ORDER BY item_id ASC")
+    values = [tag]
+    if limit is not None:
+      sql += " LIMIT ?"
+      values.append(int(limit))
+    _, rows = self._fetch_all(sql, values)
+    return [row[0] for row in rows]
+
+  def _lock_item_tags(self, item_id: int) -> list:
+    """
+    Return the tags of an inventory item and lock the item until the end of
+    the transaction, so concurrent tag changes of the item are not lost.
+    Must be called within transaction().
+    """
+    sql = f"SELECT item_tags FROM {INVENTORY_TABLE_NAME} WHERE id = ? FOR UPDATE"
+    _, rows = self._fetch_all(sql, (item_id,))
+    if not rows:
+      raise ValueError(f'No inventory item with ID {item_id}')
+    return parse_item_tags(rows[0][0])
+
+  def _write_item_tags(self, pooled, item_tags: dict, replace: bool = False):
+    """
+    Write rows of the item tag table. Must be called within transaction().
+
+    Args:
+    pooled - PooledConnection of the transaction
+    item_tags - Dictionary item ID -> list of tags (see parse_item_tags())
+    replace - If True the existing tags of the items are deleted first
+    """
+    if replace and item_tags:
+      item_ids = list(item_tags.keys())
+      cursor = pooled.connection.cursor()
+      cursor.execute(f"DELETE FROM {ITEM_TAG_TABLE_NAME} WHERE item_id IN "
+                     f"( {', '.join(['?' for _ in item_ids])} )", item_ids)
+      cursor.close()
+
+    values = [(item_id, tag)
+              for (item_id, tags) in item_tags.items() for tag in tags]
+    if values:
+      sql = f"INSERT INTO {ITEM_TAG_TABLE_NAME} ( item_id, tag ) VALUES ( ?, ? )"
+      self.pool.get_prepared_cursor(pooled, sql).executemany(sql, values)
+
+  # -----------------------------------------------------------------------
+  #                        [LOCATIONS]
   # -----------------------------------------------------------------------
+  # Storage locations form a tree (building, room, shelf, bin, ...). Each
+  # location stores the materialized path of the IDs from its root down to
+  # itself, e.g. '/1/5/12/'. The locations within a location are exactly the
+  # locations whose path starts with its path, which is a range of the path
+  # index. Moving a location only rewrites the path prefix of its subtree.
 
-  def init_media_dir(self):
+  def get_locations(self) -> list:
     """
-    Initialize subdirectory to store media data. Media data is data that will
-    not be stored in the database itself (images, video, audio). The inventory
-    database will hold a path to the respective file in the media folder instead.
+    Return all locations, sorted by their full name
 
+    Returns
+    locations - List of dictionaries with the keys id, parent_id, name, path
+                and full_name, the names from the root down to the location
+                joined by ' / '
     """
-    pwd_path = Path(os.path.realpath(__file__))
-    media_directory = pwd_path.parent / '..' / 'database' / 'media'
-    if not media_directory.exists():
-      info(f'[x] Create media directory at {media_directory}')
-      os.makedirs(media_directory.absolute().as_posix(), 0o775)
+    sql = f"SELECT id, parent_id, name, path FROM {LOCATION_TABLE_NAME}"
+    _, rows = self._fetch_all(sql)
+    return self._get_location_dicts(rows)
+
+  def get_location_item_counts(self, location_id: int = None) -> list:
+    """
+    Return the number of items per location, sorted by the full name of the
+    locations. The items of all locations are counted with one query.
+
+    Args:
+    location_id - If set, only count the locations within this location
+                  (including itself), otherwise all locations
+
+    Returns
+    locations - List of dictionaries as returned by get_locations() with the
+                additional keys num_items, the items stored in the location
+                itself, and num_items_subtree, the items stored in the
+                location or any location within it
+    """
+    if location_id is None:
+      sql = (f"SELECT location.id, location.parent_id, location.name, "
+             f"location.path, COUNT({INVENTORY_TABLE_NAME}.id) "
+             f"FROM {LOCATION_TABLE_NAME} AS location "
+             f"LEFT JOIN {INVENTORY_TABLE_NAME} "
+             f"ON {INVENTORY_TABLE_NAME}.location_id = location.id "
+             "GROUP BY location.id")
+      values = []
+    else:
+      sql = (f"SELECT location.id, location.parent_id, location.name, "
+             f"location.path, COUNT({INVENTORY_TABLE_NAME}.id) "
+             f"FROM {LOCATION_TABLE_NAME} AS root "
+             f"JOIN {LOCATION_TABLE_NAME} AS location "
+             "ON location.path LIKE CONCAT(root.path, '%') "
+             f"LEFT JOIN {INVENTORY_TABLE_NAME} "
+             f"ON {INVENTORY_TABLE_NAME}.location_id = location.id "
+             "WHERE root.id = ? GROUP BY location.id")
+      values = [int(location_id)]
+    _, rows = self._fetch_all(sql, values)
+
+    num_items = {row[0]: int(row[4]) for row in rows}
+    locations = self._get_location_dicts([row[:4] for row in rows])
+    # Add the items of each location to itself and all of its ancestors
+    num_items_subtree = dict.fromkeys(num_items, 0)
+    for location in locations:
+      for ancestor_id in self._get_location_path_ids(location["path"]):
+        if ancestor_id in num_items_subtree:
+          num_items_subtree[ancestor_id] += num_items[location["id"]]
+    for location in locations:
+      location["num_items"] = num_items[location["id"]]
+      location["num_items_subtree"] = num_items_subtree[location["id"]]
+    return locations
+
+  def add_location(self, name: str, parent_id: int = None) -> int:
+    """
+    Create a location
+
+    Args:
+    name - Name of the location, e.g. 'Shelf 3'
+    parent_id - ID of the location it is in, None for a top level location
+
+    Returns ID of the created location
+    """
+    with self.transaction(), self._pooled_connection() as pooled:
+      parent_path = '/'
+      if parent_id is not None:
+        parent_path = self._lock_location_path(parent_id)
+
+      cursor = pooled.connection.cursor()
+      cursor.execute(f"INSERT INTO {LOCATION_TABLE_NAME} "
+                     "( parent_id, name, path ) VALUES ( ?, ?, '' )",
+                     [parent_id, name])
+      location_id = cursor.lastrowid
+      if not location_id:
+        location_id = self._get_last_inserted_id(cursor)
+      cursor.execute(f"UPDATE {LOCATION_TABLE_NAME} SET path = ? WHERE id = ?",
+                     [f'{parent_path}{location_id}/', location_id])
+      cursor.close()
+
+    return location_id
+
+  def rename_location(self, location_id: int, name: str):
+    """
+    Rename a location
+    """
+    sql = f"UPDATE {LOCATION_TABLE_NAME} SET name = ? WHERE id = ?"
+    self.exec_sql_cmd(sql, [name, location_id])
+
+  def move_location(self, location_id: int, parent_id: int = None):
+    """
+    Move a location with all locations and items within it into another
+    location. The paths of the whole subtree are rewritten by one UPDATE.
+
+    Args:
+    location_id - ID of the location to move
+    parent_id - ID of the new parent location, None to make it a top level
+                location
+    """
+    with self.transaction():
+      path = self._lock_location_path(location_id)
+      parent_path = '/'
+      if parent_id is not None:
+        parent_path = self._lock_location_path(parent_id)
+        if parent_path.startswith(path):
+          raise ValueError(f'Cannot move location {location_id} into '
+                           f'location {parent_id} within itself')
+      new_path = f'{parent_path}{location_id}/'
+
+      # Replace the path prefix of all locations of the subtree. The path
+      # only holds digits and '/', so it needs no escaping for LIKE.
+      sql = (f"UPDATE {LOCATION_TABLE_NAME} "
+             "SET path = CONCAT(?, SUBSTRING(path, ?)), "
+             "parent_id = IF(id = ?, ?, parent_id) "
+             "WHERE path LIKE ?")
+      self.exec_sql_cmd(sql, [new_path, len(path) + 1,
+                              location_id, parent_id,
+                              f'{path}%'])
+
+  def delete_location(self, location_id: int):
+    """
+    Delete a location that has no locations within it. Items stored in it
+    are no longer linked to a location.
+    """
+    with self.transaction():
+      # Unlink the items explicitly rather than by ON DELETE SET NULL, so
+      # the change feed triggers record the change of the items
+      self.exec_sql_cmd(f"UPDATE {INVENTORY_TABLE_NAME} SET location_id = NULL "
+                        "WHERE location_id = ?", [location_id])
+      self.exec_sql_cmd(f"DELETE FROM {LOCATION_TABLE_NAME} WHERE id = ?",
+                        [location_id])
+
+  def _get_location_subtree_sql(self) -> str:
+    """
+    Return a subquery that selects the IDs of a location and all locations
+    within it. It has one ? for the ID of the location.
+    """
+    return (f"SELECT subtree.id FROM {LOCATION_TABLE_NAME} AS root "
+            f"JOIN {LOCATION_TABLE_NAME} AS subtree "
+            "ON subtree.path LIKE CONCAT(root.path, '%') "
+            "WHERE root.id = ?")
+
+  def _lock_location_path(self, location_id: int) -> str:
+    """
+    Return the path of a location and lock the location until the end of
+    the transaction. Must be called within transaction().
+    """
+    sql = f"SELECT path FROM {LOCATION_TABLE_NAME} WHERE id = ? FOR UPDATE"
+    _, rows = self._fetch_all(sql, (location_id,))
+    if not rows:
+      raise ValueError(f'No location with ID {location_id}')
+    return rows[0][0]
+
+  def _get_location_path_ids(self, path: str) -> list:
+    """
+    Return the location IDs of a path, from the root down
+    """
+    return [int(location_id) for location_id in path.strip('/').split('/')
+            if location_id]
+
+  def _get_location_dicts(self, rows: list) -> list:
+    """
+    Convert (id, parent_id, name, path) rows to location dictionaries with
+    their full names, sorted by the full name
+    """
+    names = {row[0]: row[2] for row in rows}
+    # Names of ancestors that are not part of rows (subtree queries)
+    missing_ids = {location_id for row in rows
+                   for location_id in self._get_location_path_ids(row[3])
+                   if location_id not in names}
+    if missing_ids:
+      sql = (f"SELECT id, name FROM {LOCATION_TABLE_NAME} WHERE id IN "
+             f"( {', '.join(['?' for _ in missing_ids])} )")
+      _, name_rows = self._fetch_all(sql, list(missing_ids))
+      names.update(dict(name_rows))
+
+    locations = []
+    for (location_id, parent_id, name, path) in rows:
+      full_name = ' / '.join([names.get(path_id, '?') for path_id
+                              in self._get_location_path_ids(path)])
+      locations.append({"id": location_id,
+                        "parent_id": parent_id,
+                        "name": name,
+                        "path": path,
+                        "full_name": full_name})
+    return sorted(locations, key=lambda location: location["full_name"])
+
+  # -----------------------------------------------------------------------
+  #                        [CHECKOUT HISTORY]
+  # -----------------------------------------------------------------------
+  # Every check-out and check-in is appended to CHECKOUT_EVENT_TABLE_NAME
+  # along with the status update of the item. Rows of this table are never
+  # updated or deleted, also not when the item is deleted.
+
+  def get_item_checkout_history_as_df(self, item_id: int, limit: int = None):
+    """
+    Return the checkout events of an inventory item in a pandas dataframe,
+    the latest event first. The events are read from the item index of the
+    checkout event table.
+
+    Args:
+    item_id - ID of the inventory item
+    limit - Maximum number of events to return, all events if None
+    """
+    sql = (f"SELECT * FROM {CHECKOUT_EVENT_TABLE_NAME} WHERE item_id = ? "
+           "ORDER BY id DESC")
+    return self._get_checkout_events_as_df(sql, [item_id], limit)
+
+  def get_user_checkout_history_as_df(self, user_name: str,
+                                      limit: int = None):
+    """
+    Return the checkout events of a user in a pandas dataframe, the latest
+    event first. The events are read from the user index of the checkout
+    event table.
+
+    Args:
+    user_name - Name of the user that checked the items out or in
+    limit - Maximum number of events to return, all events if None
+    """
+    sql = (f"SELECT * FROM {CHECKOUT_EVENT_TABLE_NAME} WHERE user_name = ? "
+           "ORDER BY id DESC")
+    return self._get_checkout_events_as_df(sql, [user_name], limit)
+
+  def get_items_checked_out_by_user_as_df(self, user_name: str):
+    """
+    Return all items a user has currently checked out in a pandas
+    dataframe, the longest checked out first. The items are read from the
+    check_out_poc index of the inventory table.
+    """
+    sql = (f"SELECT * FROM {INVENTORY_TABLE_NAME} "
+           "WHERE check_out_poc = ? AND is_checked_out = 1 "
+           "ORDER BY check_out_date ASC")
+    columns, rows = self._fetch_all(sql, [user_name])
+    return pd.DataFrame(rows, columns=columns)
+
+  def _add_checkout_event(self, item_id: int, event_type: str,
+                          user_name: str, event_date: datetime):
+    """
+    Append an event to the checkout event table
+    """
+    sql = (f"INSERT INTO {CHECKOUT_EVENT_TABLE_NAME} "
+           "( item_id, event_type, user_name, event_date ) "
+           "VALUES ( ?, ?, ?, ? )")
+    self.exec_sql_cmd(sql, [item_id, event_type, user_name, event_date],
+                      prepared=True)
+
+  def _get_checkout_events_as_df(self, sql: str, values: list,
+                                 limit: int = None):
+    """
+    Run a query of the checkout event table and return its rows in a pandas
+    dataframe
+    """
+    if limit is not None:
+      sql += " LIMIT ?"
+      values = values + [int(limit)]
+    columns, rows = self._fetch_all(sql, values)
+    return pd.DataFrame(rows, columns=columns)
+
+  # -----------------------------------------------------------------------
+  #                        [BATCH OPERATIONS]
+  # -----------------------------------------------------------------------
+  # Operations on a set of items, e.g. all items of a tray scanned at once
+  # in batch scan mode. Each operation is a single transaction.
+
+  def update_inventory_items_checkout_status(self, ids: list,
+                                             is_checked_out: bool,
+                                             user_name: str) -> list:
+    """
+    Check out or check in several inventory items in one transaction. Items
+    that already have the requested status or do not exist are skipped.
+    Every status change is recorded as check-out or check-in event of
+    user_name in the checkout event table.
+
+    Args:
+    ids - IDs of the inventory items
+    is_checked_out - True to check the items out, False to check them in
+    user_name - User that checks the items out or in
+
+    Returns
+    updated_ids - IDs of the items whose checkout status was changed
+    """
+    if is_checked_out and not user_name:
+      raise ValueError('No user set to check out the items')
+    # Lock the rows in ID order, so concurrent batches cannot deadlock
+    ids = sorted({int(id) for id in ids})
+    if not ids:
+      return []
+
+    event_type = (CHECKOUT_EVENT_CHECK_OUT if is_checked_out
+                  else CHECKOUT_EVENT_CHECK_IN)
+    event_date = datetime.now().replace(microsecond=0)
+    with self.transaction():
+      _, rows = self._fetch_all(
+          f"SELECT id, is_checked_out FROM {INVENTORY_TABLE_NAME} "
+          f"WHERE id IN ({', '.join(['?'] * len(ids))}) FOR UPDATE", ids)
+      updated_ids = [id for (id, status) in rows
+                     if bool(status) != is_checked_out]
+      if not updated_ids:
+        return []
+
+      placeholders = ', '.join(['?'] * len(updated_ids))
+      self.exec_sql_cmd(
+          f"UPDATE {INVENTORY_TABLE_NAME} "
+          "SET is_checked_out = ?, check_out_date = ?, check_out_poc = ? "
+          f"WHERE id IN ({placeholders})",
+          [int(is_checked_out),
+           event_date if is_checked_out else None,
+           user_name] + updated_ids)
+
+      # INSERT ... VALUES ( ?, ?, ?, ? ), ( ?, ?, ?, ? ), ...
+      values = []
+      for id in updated_ids:
+        values += [id, event_type, user_name, event_date]
+      self.exec_sql_cmd(
+          f"INSERT INTO {CHECKOUT_EVENT_TABLE_NAME} "
+          "( item_id, event_type, user_name, event_date ) VALUES " +
+          ', '.join(['( ?, ?, ?, ? )'] * len(updated_ids)), values)
+
+    info(f'[+] {"Checked out" if is_checked_out else "Checked in"} '
+         f'{len(updated_ids)} items by {user_name}')
+    return updated_ids
+
+  def audit_inventory_items(self, ids: list, location_id: int = None) -> dict:
+    """
+    Compare a set of scanned item IDs with the inventory, e.g. the labels
+    scanned on a shelf. All items are read in one transaction.
+
+    Args:
+    ids - IDs of the scanned inventory items
+    location_id - If set, the scanned items are expected to be all items
+                  stored in this location or any location within it
+
+    Returns
+    audit - Dictionary with the lists of IDs:
+            found - Scanned items that are in the inventory
+            unknown - Scanned IDs that are not in the inventory
+            checked_out - Scanned items that are marked as checked out
+            misplaced - Scanned items not stored in the location
+            missing - Items stored in the location that are neither
+                      scanned nor checked out
+            misplaced and missing are empty if location_id is None
+    """
+    ids = sorted({int(id) for id in ids})
+    audit = {"found": [],
+             "unknown": [],
+             "checked_out": [],
+             "misplaced": [],
+             "missing": []}
+
+    with self.transaction():
+      rows = []
+      if ids:
+        _, rows = self._fetch_all(
+            f"SELECT id, is_checked_out FROM {INVENTORY_TABLE_NAME} "
+            f"WHERE id IN ({', '.join(['?'] * len(ids))})", ids)
+      location_ids = set()
+      if location_id is not None:
+        _, location_rows = self._fetch_all(
+            f"SELECT id, is_checked_out FROM {INVENTORY_TABLE_NAME} "
+            f"WHERE location_id IN ({self._get_location_subtree_sql()})",
+            [int(location_id)])
+        location_ids = {id for (id, _) in location_rows}
+
+    scanned_ids = set(ids)
+    audit["found"] = sorted(id for (id, _) in rows)
+    audit["unknown"] = sorted(scanned_ids - set(audit["found"]))
+    audit["checked_out"] = sorted(id for (id, status) in rows if status)
+    if location_id is not None:
+      audit["misplaced"] = [id for id in audit["found"]
+                            if id not in location_ids]
+      audit["missing"] = sorted(id for (id, status) in location_rows
+                                if not status and id not in scanned_ids)
+    return audit
+
+  # -----------------------------------------------------------------------
+  #                        [CHANGE FEED]
+  # -----------------------------------------------------------------------
+  # Triggers on the inventory table append every inserted, updated and
+  # deleted item to INVENTORY_CHANGE_TABLE_NAME. Readers remember the
+  # version they are up to date with and only read the items changed since.
+
+  def get_change_version(self) -> int:
+    """
+    Return the version of the change feed a reader is up to date with if it
+    reads the inventory now. Changes of the last
+    database_change_feed_settle_s are excluded as they might not all be
+    committed yet, so they are delivered again by get_changes_since().
+    """
+    sql = (f"SELECT COALESCE("
+           f"(SELECT MIN(version) - 1 FROM {INVENTORY_CHANGE_TABLE_NAME} "
+           "WHERE changed_at >= NOW() - INTERVAL ? SECOND), "
+           f"(SELECT MAX(version) FROM {INVENTORY_CHANGE_TABLE_NAME}), 0)")
+    _, rows = self._fetch_all(sql, [database_change_feed_settle_s])
+    return int(rows[0][0])
+
+  def get_changes_since(self, version: int,
+                        limit: int = database_change_feed_batch_size,
+                        include_rows: bool = True) -> dict:
+    """
+    Return the inventory items changed since a version of the change feed.
+    Only the changed items are read, looked up by their ID. Without
+    include_rows only the change feed is read.
+
+    Versions are assigned in the order items are changed but become visible
+    in the order the changes are committed. The returned version therefore
+    only advances over a missing version once it is older than
+    database_change_feed_settle_s. Changes after it are delivered again by
+    the next call, so readers have to apply changes idempotently.
+
+    Args:
+    version - Version the reader is up to date with, see
+              get_change_version()
+    limit - Maximum number of changes to read
+    include_rows - If True read the current rows of the changed items
+
+    Returns
+    changes - Dictionary with the keys:
+      version - Version the reader is up to date with after applying the
+                changes
+      changed_ids - IDs of all items changed since version
+      rows - Current rows of the changed items that still exist, as
+             dictionaries (column name -> value). Empty without
+             include_rows.
+      inserted_ids - IDs of the items added since version
+      deleted_ids - IDs of the items deleted since version. Without
+                    include_rows the items with a delete change, they might
+                    have been added again by an upsert.
+      has_more - True if there are more changes than limit, call again
+      reload - True if the changes since version are no longer kept. The
+               reader has to reload the inventory.
+    """
+    sql = (f"SELECT version, item_id, change_type, "
+           "changed_at < NOW() - INTERVAL ? SECOND, "
+           f"(SELECT MIN(version) FROM {INVENTORY_CHANGE_TABLE_NAME}) "
+           f"FROM {INVENTORY_CHANGE_TABLE_NAME} WHERE version > ? "
+           "ORDER BY version ASC LIMIT ?")
+    _, change_rows = self._fetch_all(sql, [database_change_feed_settle_s,
+                                           int(version),
+                                           int(limit)],
+                                     prepared=True)
+
+    changes = {"version": int(version),
+               "changed_ids": [],
+               "rows": [],
+               "inserted_ids": [],
+               "deleted_ids": [],
+               "has_more": len(change_rows) >= int(limit),
+               "reload": False}
+    if not change_rows:
+      return changes
+    if int(version) < change_rows[0][4] - 1:
+      changes["reload"] = True
+      return changes
+
+    item_ids = changes["changed_ids"]
+    deleted_ids = []
+    is_contiguous = True
+    for (change_version, item_id, change_type, is_settled, _) in change_rows:
+      if is_contiguous and (change_version == changes["version"] + 1 or
+                            is_settled):
+        changes["version"] = change_version
+      else:
+        # A version is missing, this and the following changes are
+        # delivered again by the next call
+        is_contiguous = False
+      if item_id not in item_ids:
+        item_ids.append(item_id)
+      if change_type == 'insert' and item_id not in changes["inserted_ids"]:
+        changes["inserted_ids"].append(item_id)
+      if change_type == 'delete' and item_id not in deleted_ids:
+        deleted_ids.append(item_id)
+    if not is_contiguous:
+      changes["has_more"] = False
+
+    if not include_rows:
+      changes["deleted_ids"] = deleted_ids
+      return changes
+
+    sql = (f"SELECT * FROM {INVENTORY_TABLE_NAME} WHERE id IN "
+           f"( {', '.join(['?' for _ in item_ids])} )")
+    columns, rows = self._fetch_all(sql, item_ids)
+    changes["rows"] = [self._row_to_dict(columns, row) for row in rows]
+
+    existing_ids = {row["id"] for row in changes["rows"]}
+    changes["deleted_ids"] = [item_id for item_id in item_ids
+                              if item_id not in existing_ids]
+    return changes
+
+  def prune_inventory_changes(
+          self, retention_s: float = database_change_feed_retention_s) -> int:
+    """
+    Delete the changes older than retention_s from the change feed. Returns
+    the number of deleted changes.
+    """
+    sql = (f"DELETE FROM {INVENTORY_CHANGE_TABLE_NAME} "
+           "WHERE changed_at < NOW() - INTERVAL ? SECOND")
+    with self._pooled_connection() as pooled:
+      cursor = pooled.connection.cursor()
+      cursor.execute(sql, [retention_s])
+      num_deleted = cursor.rowcount
+      cursor.close()
+    return num_deleted
+
+  # -----------------------------------------------------------------------
+  #                        [MISC]
+  # -----------------------------------------------------------------------
 
   def load_media_image(self, image_path: Path):
     """
@@ -376,7 +1350,7 @@ class DataBaseClient():
     # SQL query to insert a new row into the table
     sql, values = user.get_sql_query_add_user()
 
-    self.exec_sql_cmd(sql, values)
+    self.exec_sql_cmd(sql, values, prepared=True)
 
   def update_inventory_user_password(self, user: InventoryUser):
     """
@@ -409,14 +1383,8 @@ class DataBaseClient():
     # Query to fetch all data from the specified table
     query = f"SELECT * FROM {INVENTORY_USER_TABLE_NAME} WHERE user_name = %s"
 
-    # Execute the query
-    self.exec_sql_cmd(query, (user_name,))
-
-    # Fetch all rows from the executed query
-    rows = self.cursor.fetchall()
-
-    # Get column names from the cursor
-    columns = [col[0] for col in self.cursor.description]
+    # Execute the query and fetch all rows and the column names
+    columns, rows = self._fetch_all(query, (user_name,))
 
     # Create a DataFrame from the fetched data
     df = pd.DataFrame(rows, columns=columns)
@@ -430,20 +1398,14 @@ class DataBaseClient():
     """
     valid = False
     # Query to fetch all data from the specified table
-    query = f"SELECT * FROM {INVENTORY_USER_TABLE_NAME} WHERE user_name = %s"
+    query = f"SELECT * FROM {INVENTORY_USER_TABLE_NAME} WHERE user_name = ?"
 
-    # Execute the query
-    self.exec_sql_cmd(query, (user_name,))
-
-    # Fetch all rows from the executed query
-    rows = self.cursor.fetchall()
+    # Execute the query and fetch all rows and the column names
+    columns, rows = self._fetch_all(query, (user_name,), prepared=True)
 
     if len(rows) == 1:
       valid = True
 
-    # Get column names from the cursor
-    columns = [col[0] for col in self.cursor.description]
-
     # Create InventoryItem instance
     inventoryUser = InventoryUser('', '')
 
@@ -460,16 +1422,8 @@ class DataBaseClient():
     # Query to fetch all data from the specified table
     query = f"SELECT * FROM {INVENTORY_USER_TABLE_NAME}"
 
-    # Execute the query
-    self.cursor.execute(query)
-
-    self.connection.commit()
-
-    # Fetch all rows from the executed query
-    rows = self.cursor.fetchall()
-
-    # Get column names from the cursor
-    columns = [col[0] for col in self.cursor.description]
+    # Execute the query and fetch all rows and the column names
+    columns, rows = self._fetch_all(query)
 
     # Create a DataFrame from the fetched data
     df = pd.DataFrame(rows, columns=columns)
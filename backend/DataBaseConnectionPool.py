@@ -0,0 +1,315 @@
+"""
+
+Process wide pool of MariaDB connections shared by all DataBaseClient
+instances
+
+"""
+import mariadb
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from logging import info, warning, debug
+
+from backend.database_config import (INVENTORY_DB_NAME,
+                                     database_user,
+                                     database_password,
+                                     database_pool_size,
+                                     database_pool_timeout_s,
+                                     database_pool_health_check_interval_s,
+                                     database_prepared_statement_cache_size)
+
+
+class PooledConnection():
+  """
+  Single MariaDB connection owned by a DataBaseConnectionPool
+  """
+
+  def __init__(self, connection):
+    self.connection = connection
+    # Time stamp of the last time this connection was returned to the pool
+    self.last_used = time.monotonic()
+    # Server side prepared statements of this connection: SQL -> prepared
+    # cursor, least recently used first
+    self.prepared_cursors = OrderedDict()
+
+  def close_prepared_cursors(self):
+    """
+    Close all prepared statements of this connection
+    """
+    for cursor in self.prepared_cursors.values():
+      try:
+        cursor.close()
+      except mariadb.Error:
+        pass
+    self.prepared_cursors.clear()
+
+
+class DataBaseConnectionPool():
+  """
+  Bounded pool of MariaDB connections:
+   * Connections are opened lazily up to pool_size and reused afterwards
+   * Connections that have been idle for too long are health checked
+     (ping/reconnect) before they are handed out again
+   * If all connections are in use, callers wait up to timeout_s for one to
+     be released
+   * Each connection keeps up to prepared_statement_cache_size server side
+     prepared statements for reuse (see get_prepared_cursor())
+
+  """
+
+  def __init__(self,
+               connection_config: dict,
+               pool_size: int = database_pool_size,
+               timeout_s: float = database_pool_timeout_s,
+               health_check_interval_s: float = database_pool_health_check_interval_s,
+               prepared_statement_cache_size: int = database_prepared_statement_cache_size):
+    self.connection_config = connection_config
+    self.pool_size = pool_size
+    self.timeout_s = timeout_s
+    self.health_check_interval_s = health_check_interval_s
+    self.prepared_statement_cache_size = prepared_statement_cache_size
+
+    # Idle connections, used as a stack so the most recently used (and
+    # therefore most likely alive) connection is handed out first
+    self._idle = []
+    # Number of connections currently open (idle + in use)
+    self._num_open = 0
+    self._condition = threading.Condition()
+
+    # Pool statistics
+    self._num_checkouts = 0
+    self._num_reconnects = 0
+    self._total_wait_s = 0.0
+    self._max_wait_s = 0.0
+    self._num_prepared_hits = 0
+    self._num_prepared_misses = 0
+
+  # ------------------------------------------------------------------------
+  #                       [PUBLIC]
+  # ------------------------------------------------------------------------
+
+  @contextmanager
+  def connection(self):
+    """
+    Context manager to check out a connection for the duration of the
+    with-block. The connection is returned to the pool afterwards. If the
+    block raises, any pending transaction is rolled back and the connection
+    is dropped from the pool if it turns out to be broken.
+    """
+    with self.pooled_connection() as pooled:
+      yield pooled.connection
+
+  @contextmanager
+  def pooled_connection(self):
+    """
+    Same as connection(), but provides the PooledConnection, e.g. to use its
+    prepared statements with get_prepared_cursor()
+    """
+    pooled = self.acquire()
+    discard = False
+    try:
+      yield pooled
+    except BaseException:
+      discard = not self._rollback(pooled)
+      raise
+    finally:
+      self.release(pooled, discard=discard)
+
+  def get_prepared_cursor(self, pooled: PooledConnection, sql: str):
+    """
+    Return a prepared cursor of a checked out connection for the given SQL
+    statement. The statement is prepared by the server on its first
+    execution and reused afterwards. A cursor must only ever execute the SQL
+    it was requested for.
+
+    The least recently used statement is closed when more than
+    prepared_statement_cache_size statements are cached on a connection.
+    """
+    cursor = pooled.prepared_cursors.get(sql)
+    if cursor is not None:
+      pooled.prepared_cursors.move_to_end(sql)
+      with self._condition:
+        self._num_prepared_hits += 1
+      return cursor
+
+    with self._condition:
+      self._num_prepared_misses += 1
+    cursor = pooled.connection.cursor(prepared=True)
+    pooled.prepared_cursors[sql] = cursor
+    if len(pooled.prepared_cursors) > self.prepared_statement_cache_size:
+      (_, lru_cursor) = pooled.prepared_cursors.popitem(last=False)
+      try:
+        lru_cursor.close()
+      except mariadb.Error:
+        pass
+    return cursor
+
+  def acquire(self) -> PooledConnection:
+    """
+    Check out a connection from the pool. Every acquired connection must be
+    handed back with release().
+    """
+    time_start = time.monotonic()
+    deadline = time_start + self.timeout_s
+    pooled = None
+
+    with self._condition:
+      while True:
+        if self._idle:
+          pooled = self._idle.pop()
+          break
+        if self._num_open < self.pool_size:
+          # Reserve a slot, the connection is opened outside of the lock
+          self._num_open += 1
+          break
+        remaining_s = deadline - time.monotonic()
+        if remaining_s <= 0:
+          raise RuntimeError(f'Timed out after {self.timeout_s} s waiting for '
+                             f'a free database connection (pool size '
+                             f'{self.pool_size})')
+        self._condition.wait(remaining_s)
+
+      wait_s = time.monotonic() - time_start
+      self._num_checkouts += 1
+      self._total_wait_s += wait_s
+      self._max_wait_s = max(self._max_wait_s, wait_s)
+
+    try:
+      if pooled is None:
+        pooled = PooledConnection(self._connect())
+      elif time.monotonic() - pooled.last_used > self.health_check_interval_s:
+        self._ensure_alive(pooled)
+    except Exception:
+      # Give the reserved slot back
+      with self._condition:
+        self._num_open -= 1
+        self._condition.notify()
+      raise
+
+    return pooled
+
+  def release(self, pooled: PooledConnection, discard: bool = False):
+    """
+    Return a connection to the pool. If discard is True the connection is
+    closed instead and its slot freed up.
+    """
+    if discard:
+      self._close(pooled)
+
+    with self._condition:
+      if discard:
+        self._num_open -= 1
+      else:
+        pooled.last_used = time.monotonic()
+        self._idle.append(pooled)
+      self._condition.notify()
+
+  def get_stats(self) -> dict:
+    """
+    Return a snapshot of the pool statistics
+    """
+    with self._condition:
+      num_idle = len(self._idle)
+      return {
+          "pool_size": self.pool_size,
+          "open_connections": self._num_open,
+          "idle_connections": num_idle,
+          "in_use_connections": self._num_open - num_idle,
+          "checkouts": self._num_checkouts,
+          "reconnects": self._num_reconnects,
+          "total_wait_s": self._total_wait_s,
+          "avg_wait_s": (self._total_wait_s / self._num_checkouts
+                         if self._num_checkouts else 0.0),
+          "max_wait_s": self._max_wait_s,
+          "prepared_statement_hits": self._num_prepared_hits,
+          "prepared_statement_misses": self._num_prepared_misses,
+      }
+
+  # ------------------------------------------------------------------------
+  #                       [PRIVATE]
+  # ------------------------------------------------------------------------
+
+  def _connect(self):
+    try:
+      connection = mariadb.connect(**self.connection_config)
+    except mariadb.Error as e:
+      raise RuntimeError(f"Error connecting to MariaDB: {e}")
+    debug(f'[+] Opened pooled database connection ({self._num_open}/'
+          f'{self.pool_size})')
+    return connection
+
+  def _ensure_alive(self, pooled: PooledConnection):
+    """
+    Ping an idle connection and re-establish it if the server dropped it
+    """
+    try:
+      pooled.connection.ping()
+      return
+    except mariadb.Error:
+      warning('Pooled database connection lost. Reconnecting.')
+
+    self._close(pooled)
+    pooled.connection = self._connect()
+    with self._condition:
+      self._num_reconnects += 1
+
+  def _rollback(self, pooled: PooledConnection) -> bool:
+    """
+    Roll back any pending transaction. Returns False if the connection is
+    no longer usable.
+    """
+    try:
+      pooled.connection.rollback()
+      return True
+    except mariadb.Error:
+      return False
+
+  def _close(self, pooled: PooledConnection):
+    pooled.close_prepared_cursors()
+    try:
+      pooled.connection.close()
+    except mariadb.Error:
+      pass
+
+
+def get_connection_config(host: str, port: int,
+                          database: str = INVENTORY_DB_NAME) -> dict:
+  """
+  Return the keyword arguments for mariadb.connect() for the given database
+  server. If database is None the connection is opened without selecting a
+  database.
+  """
+  connection_config = {
+      'user': database_user,
+      'password': database_password,
+      'host': host,  # or use the container name 'mariadb'
+      'port': port,
+      'connect_timeout': 0,
+      # Single statements commit on their own and reads never leave a
+      # transaction open. Units of work use explicit transactions.
+      'autocommit': True
+  }
+  if database is not None:
+    connection_config['database'] = database
+  return connection_config
+
+
+# Process wide pools, one per database server
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(host: str, port: int) -> DataBaseConnectionPool:
+  """
+  Return the process wide connection pool for the given database server.
+  The pool is created on first use.
+  """
+  with _pools_lock:
+    pool = _pools.get((host, port))
+    if pool is None:
+      pool = DataBaseConnectionPool(get_connection_config(host, port))
+      _pools[(host, port)] = pool
+      info(f'[x] Created database connection pool for {host}:{port} '
+           f'(size {pool.pool_size})')
+    return pool
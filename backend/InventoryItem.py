@@ -2,12 +2,123 @@ from datetime import datetime
 from pathlib import Path
 from pandas import DataFrame
 from logging import warning
-
-from backend.database_config import INVENTORY_TABLE_NAME, INVENTORY_DB_NAME
+import os
+
+from backend.database_config import (INVENTORY_TABLE_NAME,
+                                     INVENTORY_DB_NAME,
+                                     ITEM_TAG_MAX_LENGTH)
+from backend.sql_templates import build_sql_templates
+
+# Formats dates were stored in as text before they became DATETIME columns.
+# Still accepted when parsing dates, e.g. from older csv exports.
+_legacy_date_formats = ["%m/%d/%Y, %H:%M:%S", "%m/%d/%Y, %H:%M"]
+
+
+def parse_item_datetime(value):
+  """
+  Convert a date value of an inventory item to datetime. Accepts datetime
+  instances, ISO format strings ('2024-05-17 14:03:00') and the legacy text
+  formats. Empty values ('', None, 'None', NaN/NaT) are returned as None.
+  Raises ValueError if the value cannot be parsed.
+  """
+  # value != value detects NaN and NaT
+  if value is None or value != value:
+    return None
+  if isinstance(value, datetime):
+    # DATETIME columns have a resolution of one second
+    return value.replace(microsecond=0)
+
+  value = str(value).strip()
+  if value in ['', 'None']:
+    return None
+  try:
+    return datetime.fromisoformat(value).replace(microsecond=0)
+  except ValueError:
+    pass
+  for date_format in _legacy_date_formats:
+    try:
+      return datetime.strptime(value, date_format)
+    except ValueError:
+      pass
+  raise ValueError(f'{value} is not a valid date')
+
+
+def parse_item_tags(value) -> list:
+  """
+  Split the item_tags text of an inventory item into its tags. Tags are
+  separated by ';'. Surrounding whitespace and empty tags are dropped, tags
+  are cut to ITEM_TAG_MAX_LENGTH characters and tags that only differ in case
+  are kept once.
+  """
+  # value != value detects NaN
+  if value is None or value != value:
+    return []
+
+  tags = []
+  seen_tags = set()
+  for tag in str(value).split(';'):
+    tag = tag.strip()[:ITEM_TAG_MAX_LENGTH].strip()
+    if tag in ['', 'None'] or tag.lower() in seen_tags:
+      continue
+    seen_tags.add(tag.lower())
+    tags.append(tag)
+  return tags
+
+
+def format_item_tags(tags: list) -> str:
+  """
+  Join tags to the item_tags text of an inventory item
+  """
+  return '; '.join(tags)
+
+
+def parse_item_location_id(value):
+  """
+  Convert the location ID of an inventory item to int. Empty values ('',
+  None, 'None', NaN) are returned as None, the item is not linked to a
+  location. Raises ValueError if the value is not an integer.
+  """
+  # value != value detects NaN
+  if value is None or value != value:
+    return None
+  if isinstance(value, str):
+    value = value.strip()
+    if value in ['', 'None']:
+      return None
+  return int(value)
 
 
 class InventoryItem():
 
+  # Columns of the inventory table that hold the item properties (all but
+  # id), in SQL column order. This is computed once and shared by all
+  # instances. When updating item properties ensure a schema migration in
+  # backend.database_bootstrap updates the inventory table as well.
+  COLUMNS = ('item_name',
+             'item_image',
+             'item_description',
+             'manufacturer',
+             'manufacturer_contact',
+             'is_checked_out',
+             'check_out_date',
+             'check_out_poc',
+             'date_added',
+             'item_tags',
+             'item_location',
+             'location_id')
+
+  # Fixed set of attributes, one per column. _item_image holds the image
+  # path as string, _item_dict caches the dictionary view of the item.
+  __slots__ = tuple([column for column in COLUMNS if column != 'item_image'] +
+                    ['_item_image', '_item_dict'])
+
+  # Row layouts seen by from_row(): tuple of column names -> list of
+  # (attribute, row index)
+  _row_layouts = {}
+
+  # SQL statement templates, built on first use (see get_sql_templates())
+  _sql_templates = None
+
   def __init__(self,
                item_name: str,
                item_image_path: Path = None,
@@ -18,19 +129,14 @@ class InventoryItem():
                check_out_poc: str = None,
                check_out_date: datetime = None,
                item_tags: str = None,
-               item_location: str = None):
+               item_location: str = None,
+               location_id: int = None):
     """
     This function initializes the inventory item instance and makes sure that
     the dictorionary contains ALL properties of that item. When updating item
-    properties ensure the MySQL query to create a table for that item is updated 
-    as well
+    properties ensure a schema migration updates the inventory table as well
 
     """
-    if check_out_date is None:
-      check_out_date_str = ''
-    else:
-      check_out_date_str = check_out_date.strftime("%m/%d/%Y, %H:%M:%S")
-
     if item_image_path is None:
       item_image_path_str = ''
     else:
@@ -40,53 +146,102 @@ class InventoryItem():
 
     # Initialize class members
     self.item_name = item_name
-    # item_image is a Path. Ensure it's always a Path and never to be set
-    # as a string
-    self.item_image = Path(item_image_path_str)
+    self.item_image = item_image_path_str
     self.item_description = item_description
     self.manufacturer = manufacturer
     self.manufacturer_contact = manufacturer_contact
     self.is_checked_out = is_checked_out
     self.check_out_poc = check_out_poc
-    self.check_out_date = check_out_date_str
+    self.check_out_date = check_out_date
     self.item_tags = item_tags
     self.item_location = item_location
+    self.location_id = location_id
+
+    self.date_added = date_time_now.replace(microsecond=0)
 
-    self.date_added = date_time_now.strftime("%m/%d/%Y, %H:%M")
+  def __setattr__(self, name, value):
+    object.__setattr__(self, name, value)
+    # Any change of the item data invalidates the cached dictionary view
+    if name != '_item_dict':
+      object.__setattr__(self, '_item_dict', None)
 
-    self._update_dict()
+  @property
+  def item_image(self) -> Path:
+    """
+    Path of the item image. It is stored as string and only converted to a
+    Path when accessed.
+    """
+    return Path(self._item_image)
+
+  @item_image.setter
+  def item_image(self, item_image):
+    if isinstance(item_image, Path):
+      item_image = item_image.as_posix()
+    elif not isinstance(item_image, str):
+      # E.g. None or NaN of a missing value
+      item_image = ''
+    self._item_image = item_image
+
+  @property
+  def inventoryItemDict(self) -> dict:
+    return self.get_item_dict()
 
   def get_item_dict(self) -> dict:
-    self._update_dict()
-    return self.inventoryItemDict
+    """
+    Return the item data as dictionary (column name -> value) in the form it
+    is written to the database. The dictionary is built on first access and
+    reused until the item data changes.
+    """
+    if self._item_dict is None:
+      self._item_dict = self._build_dict()
+    return self._item_dict
 
-  def _update_dict(self):
+  def get_item_values(self) -> list:
+    """
+    Return the item data in the order of COLUMNS, as written to the database
+    """
+    return list(self.get_item_dict().values())
+
+  def _build_dict(self) -> dict:
     #  Create dictonary from item data
-    self.inventoryItemDict = {
+    item_image = self._item_image
+    if not os.path.isabs(item_image):
+      item_image = Path(item_image).absolute().as_posix()
+    return {
         "item_name": str(self.item_name),
-        "item_image": Path(self.item_image).absolute().as_posix(),
+        "item_image": item_image,
         "item_description": str(self.item_description),
         "manufacturer": str(self.manufacturer),
         "manufacturer_contact": str(self.manufacturer_contact),
         "is_checked_out": bool(self.is_checked_out),
-        "check_out_date": str(self.check_out_date),
+        "check_out_date": parse_item_datetime(self.check_out_date),
         "check_out_poc": str(self.check_out_poc),
-        "date_added": str(self.date_added),
-        "item_tags": str(self.item_tags),
+        "date_added": parse_item_datetime(self.date_added),
+        "item_tags": format_item_tags(parse_item_tags(self.item_tags)),
         "item_location": str(self.item_location),
+        "location_id": parse_item_location_id(self.location_id),
     }
 
+  def _update_dict(self):
+    # Kept for compatibility, the dictionary view is built on demand
+    self._item_dict = None
+
+  def get_tags(self) -> list:
+    """
+    Return the tags of the item as list, in the form they are written to the
+    item tag table
+    """
+    return parse_item_tags(self.item_tags)
+
   def set_img_path(self, img_path: Path):
     self.item_image = Path(img_path).absolute().as_posix()
-    self._update_dict
 
   def get_item_property_classes(self) -> list:
     """
     Returns effectively a list of column names of that item in the inventory
     database.
     """
-    self._update_dict()
-    return list(self.inventoryItemDict.keys())
+    return list(self.COLUMNS)
 
   def set_checked_out(self, poc: str) -> bool:
     """
@@ -104,7 +259,7 @@ class InventoryItem():
       warning('No point of contact provided. Check out is invalid!')
     else:
       date_time_now = datetime.now()
-      self.check_out_date = date_time_now.strftime("%m/%d/%Y, %H:%M:%S")
+      self.check_out_date = date_time_now.replace(microsecond=0)
       self.check_out_poc = poc
       self.is_checked_out = True
       valid = True
@@ -120,99 +275,65 @@ class InventoryItem():
     poc - Point of contact. Person who checked in this item
 
     """
-    self.check_out_date = ''
+    self.check_out_date = None
     self.check_out_poc = str(poc)
     self.is_checked_out = False
 
   def populate_from_df(self, item_data_df: DataFrame):
     """
-    Function to populate item data from a dataframe object
+    Function to populate item data from a dataframe object. Columns missing
+    in the dataframe are set to None.
     """
     if item_data_df.empty == False:
-      self.item_name = item_data_df.iloc[0]['item_name']
-      self.date_added = item_data_df.iloc[0]['date_added']
-      self.manufacturer = item_data_df.iloc[0]['manufacturer']
-      self.manufacturer_contact = item_data_df.iloc[0]['manufacturer_contact']
-      self.is_checked_out = item_data_df.iloc[0]['is_checked_out']
-      self.check_out_date = item_data_df.iloc[0]['check_out_date']
-      self.check_out_poc = item_data_df.iloc[0]['check_out_poc']
-      try:
-        self.item_image = Path(item_data_df.iloc[0]['item_image'])
-      except:
-        self.item_image = Path('')
-      self.item_description = item_data_df.iloc[0]['item_description']
-      self.item_tags = item_data_df.iloc[0]['item_tags']
-      self.item_location = item_data_df.iloc[0]['item_location']
+      item_data = item_data_df.iloc[0]
+      for column in self.COLUMNS:
+        setattr(self, column, item_data.get(column, None))
     else:
       warning('Attempted to populate InventoryItem from empty DataFrame')
 
-  def get_sql_query_table_for_item(self) -> str:
+  @classmethod
+  def from_row(cls, columns: list, row: tuple):
     """
-    Create a sql query to create a table for this InventoryItem
+    Create an InventoryItem from a row of the inventory table. The item is
+    filled straight from the row values, columns missing in the row are set
+    to None.
 
+    Args:
+    columns - Column names of the row, as given by the cursor description
+    row - Row values in the order of columns
     """
-
-    # Compile query
-    create_table_query = f'CREATE TABLE IF NOT EXISTS {
-        INVENTORY_TABLE_NAME} ( id INT PRIMARY KEY AUTO_INCREMENT,'
-    create_table_query += f'item_name VARCHAR(255) NOT NULL,'
-    create_table_query += f'item_image VARCHAR(1055),'
-    create_table_query += f'item_description VARCHAR(1055) ,'
-    create_table_query += f'manufacturer VARCHAR(255),'
-    create_table_query += f'manufacturer_contact VARCHAR(1055),'
-    create_table_query += f'is_checked_out BOOLEAN,'
-    create_table_query += f'check_out_date VARCHAR(255) ,'
-    create_table_query += f'check_out_poc VARCHAR(1055) ,'
-    create_table_query += f'date_added VARCHAR(255) )'
-    create_table_query += f'item_tags VARCHAR(1055) )'
-    create_table_query += f'item_location VARCHAR(1055) )'
-
-    return create_table_query
+    columns = tuple(columns)
+    layout = cls._row_layouts.get(columns)
+    if layout is None:
+      layout = [(column, columns.index(column) if column in columns else None)
+                for column in cls.COLUMNS]
+      cls._row_layouts[columns] = layout
+
+    inventoryItem = cls.__new__(cls)
+    for (column, index) in layout:
+      setattr(inventoryItem, column, None if index is None else row[index])
+    return inventoryItem
+
+  @classmethod
+  def get_sql_templates(cls) -> dict:
+    """
+    Return the SQL statement templates of the inventory table (see
+    backend.sql_templates). They are built once from COLUMNS.
+    """
+    if cls._sql_templates is None:
+      cls._sql_templates = build_sql_templates(INVENTORY_TABLE_NAME,
+                                               cls.COLUMNS,
+                                               key_column='id')
+    return cls._sql_templates
 
   def get_sql_query_add_item(self):
     """
-    Create a sql query to update an existing inventory item
+    Create a sql query to add this item to the inventory table
     """
-    # We use the InventoryItem class data in dictionary form here, so we
-    # have to make sure the dictionary is up to date
-    self._update_dict()
-
-    # --- Construct the SQL INSERT statement
-
-    # Pre-construct set each value statement
-    set_clause = ", ".join(
-        [f"{column}" for column in list(self.inventoryItemDict.keys())])
-
-    # Create series of ? that matches the number of values in
-    # list(self.inventoryItemDict.values())
-    value_clause = ", ".join(
-        [f"?" for column in list(self.inventoryItemDict.values())])
-
-    sql = f"INSERT INTO {INVENTORY_TABLE_NAME} ( {set_clause} ) VALUES ( {
-        value_clause} )"
-
-    # Prepare the data to update
-    values = list(self.inventoryItemDict.values())
-
-    return sql, values
+    return self.get_sql_templates()["insert"], self.get_item_values()
 
   def get_sql_query_update_item(self, id: int):
     """
     Create a sql query to update an existing inventory item
     """
-    # We use the InventoryItem class data in dictionary form here, so we
-    # have to make sure the dictionary is up to date
-    self._update_dict()
-
-    # --- Construct the SQL UPDATE statement
-
-    # Pre-construct set each value statement
-    set_clause = ", ".join(
-        [f"{column} = ?" for column in list(self.inventoryItemDict.keys())])
-
-    sql = f"UPDATE {INVENTORY_TABLE_NAME} SET {set_clause} WHERE id = ?"
-
-    # Prepare the data to update
-    values = list(self.inventoryItemDict.values()) + [id]
-
-    return sql, values
+    return self.get_sql_templates()["update"], self.get_item_values() + [id]
@@ -6,6 +6,7 @@ from enum import Enum
 
 from backend.database_config import (INVENTORY_USER_TABLE_NAME,
                                      INVENTORY_DB_NAME)
+from backend.sql_templates import build_sql_templates
 
 
 class UserPrivileges(Enum):
@@ -18,6 +19,13 @@ class UserPrivileges(Enum):
 
 class InventoryUser():
 
+  # Columns of the user table that hold the user data (all but id), in SQL
+  # column order
+  COLUMNS = ('user_name', 'user_password', 'user_privileges')
+
+  # SQL statement templates, built on first use (see get_sql_templates())
+  _sql_templates = None
+
   # Salt for password hashing
   # TDOO to be changed and moved out of here
   SALT = 'sda8DF7d13e3F2'
@@ -84,66 +92,34 @@ class InventoryUser():
   #                       [SQL QUERIES]
   # ------------------------------------------------------------------------
 
-  def get_sql_query_table_for_user(self) -> str:
+  @classmethod
+  def get_sql_templates(cls) -> dict:
     """
-    Create a sql query to create a table for this InventoryUser
-
+    Return the SQL statement templates of the user table (see
+    backend.sql_templates). They are built once from COLUMNS.
     """
-
-    # Compile query
-    create_table_query = f'CREATE TABLE IF NOT EXISTS {
-        INVENTORY_USER_TABLE_NAME} ( id INT PRIMARY KEY AUTO_INCREMENT,'
-    create_table_query += f'user_name VARCHAR(50) UNIQUE NOT NULL,'
-    create_table_query += f'user_password VARCHAR(50),'
-    create_table_query += f'user_privileges INT )'
-
-    return create_table_query
+    if cls._sql_templates is None:
+      cls._sql_templates = build_sql_templates(INVENTORY_USER_TABLE_NAME,
+                                               cls.COLUMNS,
+                                               key_column='user_name')
+    return cls._sql_templates
 
   def get_sql_query_add_user(self):
     """
     Create a sql query to add this self to the user table
     """
-    # We use the InventoryUser class data in dictionary form here, so we
-    # have to make sure the dictionary is up to date
-    self._update_dict()
-
-    # --- Construct the SQL INSERT statement
-
-    # Pre-construct set each value statement
-    set_clause = ", ".join(
-        [f"{column}" for column in list(self.inventoryUserDict.keys())])
-
-    # Create series of ? that matches the number of values in
-    # list(self.inventoryUserDict.values())
-    value_clause = ", ".join(
-        [f"?" for column in list(self.inventoryUserDict.values())])
-
-    sql = f"INSERT INTO {INVENTORY_USER_TABLE_NAME} ( {set_clause} ) VALUES ( {
-        value_clause} )"
-
-    # Prepare the data to update
-    values = list(self.inventoryUserDict.values())
-
-    return sql, values
+    return self.get_sql_templates()["insert"], self._get_values()
 
   def get_sql_query_update_user(self, user_name: str):
     """
     Create a sql query to update an existing inventory user
     """
-    # We use the InventoryUser class data in dictionary form here, so we
-    # have to make sure the dictionary is up to date
-    self._update_dict()
-
-    # --- Construct the SQL UPDATE statement
-
-    # Pre-construct set each value statement
-    set_clause = ", ".join(
-        [f"{column} = ?" for column in list(self.inventoryUserDict.keys())])
+    return (self.get_sql_templates()["update"],
+            self._get_values() + [user_name])
 
-    sql = f"UPDATE {INVENTORY_USER_TABLE_NAME} SET {
-        set_clause} WHERE user_name = ?"
-
-    # Prepare the data to update
-    values = list(self.inventoryUserDict.values()) + [user_name]
-
-    return sql, values
+  def _get_values(self) -> list:
+    """
+    Return the user data in the order of COLUMNS
+    """
+    self._update_dict()
+    return [self.inventoryUserDict[column] for column in self.COLUMNS]
@@ -0,0 +1,176 @@
+"""
+
+Decoding of QR markers next to the camera stream
+
+Decoding a full frame takes longer than capturing it. The capture thread
+hands every frame to the decoder without waiting, a bounded pool of worker
+threads decodes the latest frame whenever a worker is free. Frames that were
+replaced by a newer one before a worker took them are dropped. The stream
+runs at the rate of the camera, decoding at the rate the CPU allows.
+
+"""
+import threading
+import time
+from logging import info, warning, debug
+
+from backend.util import get_qr_detector_cascade, RateMeter
+from backend.camera_config import qr_decode_workers, camera_stats_window_s
+
+
+class QrDecoder():
+  """
+  Decode QR markers of the latest submitted frame on a pool of worker
+  threads:
+
+    decoder = QrDecoder(handle_markers)
+    decoder.start()
+    decoder.submit(frame)    # Does not block
+    ...
+    decoder.stop()
+
+  handle_markers(markers) is called from the worker threads with the list of
+  (decoded_text, polygon) of every decoded frame.
+  """
+
+  def __init__(self,
+               fnct_handle_markers=None,
+               num_workers: int = qr_decode_workers,
+               detector=None):
+    """
+    Args:
+    fnct_handle_markers - Called with the markers of every decoded frame
+    num_workers - Number of worker threads
+    detector - QR detector with a decode(frame) function, defaults to the
+               cascade of the configured detector backends
+    """
+    self.fnct_handle_markers = fnct_handle_markers
+    self.num_workers = num_workers
+    self.detector = (detector if detector is not None
+                     else get_qr_detector_cascade())
+
+    # Latest submitted frame, taken by the next free worker
+    self._condition = threading.Condition()
+    self._frame = None
+    self._frame_index = 0
+    self._is_running = False
+    self._workers = []
+
+    # Markers of the latest decoded frame and the index of that frame.
+    # Workers might finish out of order, older results are not kept.
+    self._markers = []
+    self._markers_frame_index = 0
+
+    # Statistics
+    self.num_submitted = 0
+    self.num_decoded = 0
+    self.num_dropped = 0
+    self.num_errors = 0
+    self.decode_rate = RateMeter(camera_stats_window_s)
+    # Sum of the decoding times [s] of all decoded frames
+    self._total_decode_s = 0.0
+
+  def start(self):
+    """
+    Start the worker threads
+    """
+    with self._condition:
+      if self._is_running:
+        return
+      self._is_running = True
+      self._frame = None
+      self._markers = []
+      self._workers = [threading.Thread(target=self._run,
+                                        name=f'QrDecoder-{i}',
+                                        daemon=True)
+                       for i in range(self.num_workers)]
+    for worker in self._workers:
+      worker.start()
+    info(f'[x] Started {self.num_workers} QR decoding workers')
+
+  def stop(self):
+    """
+    Stop the worker threads, frames not decoded yet are dropped
+    """
+    with self._condition:
+      self._is_running = False
+      self._frame = None
+      workers = self._workers
+      self._workers = []
+      self._condition.notify_all()
+    for worker in workers:
+      if worker is not threading.current_thread():
+        worker.join()
+
+  def submit(self, frame):
+    """
+    Submit a frame for decoding. Replaces a submitted frame no worker has
+    taken yet. The frame must not be changed afterwards.
+    """
+    with self._condition:
+      if not self._is_running:
+        return
+      if self._frame is not None:
+        self.num_dropped += 1
+      self._frame_index += 1
+      self._frame = frame
+      self.num_submitted += 1
+      self._condition.notify()
+
+  def get_markers(self) -> list:
+    """
+    Return the markers (decoded_text, polygon) of the latest decoded frame
+    """
+    with self._condition:
+      return list(self._markers)
+
+  def get_stats(self) -> dict:
+    """
+    Return the statistics of the decoder (submitted, decoded and dropped
+    frames, decoded frames per second, mean decoding time per frame)
+    """
+    with self._condition:
+      stats = {"workers": len(self._workers),
+               "submitted": self.num_submitted,
+               "decoded": self.num_decoded,
+               "dropped": self.num_dropped,
+               "errors": self.num_errors,
+               "decode_fps": self.decode_rate.get_rate(),
+               "mean_decode_s": (self._total_decode_s / self.num_decoded
+                                 if self.num_decoded else 0.0)}
+    if hasattr(self.detector, 'get_stats'):
+      stats["detectors"] = self.detector.get_stats()
+    return stats
+
+  def _run(self):
+    while True:
+      with self._condition:
+        self._condition.wait_for(
+            lambda: self._frame is not None or not self._is_running)
+        if not self._is_running:
+          return
+        (frame, frame_index) = (self._frame, self._frame_index)
+        self._frame = None
+
+      time_start = time.perf_counter()
+      try:
+        markers = self.detector.decode(frame)
+      except Exception as e:
+        self.num_errors += 1
+        warning(f'[!] Decoding QR markers failed: {e}')
+        continue
+
+      with self._condition:
+        self.num_decoded += 1
+        self._total_decode_s += time.perf_counter() - time_start
+        if frame_index > self._markers_frame_index:
+          self._markers = markers
+          self._markers_frame_index = frame_index
+      self.decode_rate.tick()
+
+      if markers and self.fnct_handle_markers is not None:
+        debug(f'Decoded {len(markers)} QR markers in frame {frame_index}')
+        try:
+          self.fnct_handle_markers(markers)
+        except Exception as e:
+          self.num_errors += 1
+          warning(f'[!] Handling decoded QR markers failed: {e}')
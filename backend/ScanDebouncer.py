@@ -0,0 +1,73 @@
+"""
+
+De-duplication of QR scans
+
+"""
+import threading
+import time
+
+from backend.camera_config import qr_scan_holdoff_s
+
+
+class ScanDebouncer():
+  """
+  Filter the item IDs decoded from camera frames, so that each distinct ID
+  is reported at most once per hold-off window. A label held in front of the
+  camera is decoded in every frame but only reported once per window.
+  Different IDs are not held off by each other.
+
+  Thread safe, frames might be processed by several threads.
+  """
+
+  def __init__(self, holdoff_s: float = qr_scan_holdoff_s):
+    self.holdoff_s = holdoff_s
+    # Item ID -> time [s] it was last reported
+    self._last_reported = {}
+    self._lock = threading.Lock()
+
+    # Statistics
+    self.num_scans = 0
+    self.num_reported = 0
+    self.num_suppressed = 0
+
+  def accept(self, item_id: int) -> bool:
+    """
+    Register a scan of an item ID. Returns True if the scan is to be
+    reported, False if it is a duplicate within the hold-off window.
+    """
+    time_now = time.monotonic()
+    with self._lock:
+      self.num_scans += 1
+      time_last_reported = self._last_reported.get(item_id)
+      if (time_last_reported is not None and
+              time_now - time_last_reported < self.holdoff_s):
+        self.num_suppressed += 1
+        return False
+
+      # Forget the IDs whose window has passed, so the memory does not grow
+      # with the number of scanned labels
+      self._last_reported = {
+          reported_id: time_reported
+          for (reported_id, time_reported) in self._last_reported.items()
+          if time_now - time_reported < self.holdoff_s}
+      self._last_reported[item_id] = time_now
+      self.num_reported += 1
+      return True
+
+  def reset(self):
+    """
+    Forget all reported IDs, the next scan of any ID is reported
+    """
+    with self._lock:
+      self._last_reported = {}
+
+  def get_stats(self) -> dict:
+    """
+    Return the statistics of the debouncer (scans, reported and suppressed
+    duplicates)
+    """
+    with self._lock:
+      return {"scans": self.num_scans,
+              "reported": self.num_reported,
+              "suppressed": self.num_suppressed,
+              "holdoff_s": self.holdoff_s}
@@ -0,0 +1,102 @@
+"""
+
+Event channel to pass scanned QR codes from the camera thread to the UI
+
+The camera server decodes QR codes in its own thread, while the UI state may
+only be changed from the asyncio event loop of the trame server. Scans are
+handed over in memory with call_soon_threadsafe and queued for the loop.
+
+"""
+import asyncio
+import threading
+import time
+from logging import info, warning, debug
+
+from backend.camera_config import qr_scan_queue_size
+
+
+class ScanEventChannel():
+  """
+  Deliver scanned item IDs from any thread to a consumer running in the
+  event loop:
+
+    channel = ScanEventChannel()
+    camera_server = CameraServer(channel.publish)
+    ...
+    await channel.consume(update_id)
+
+  If the consumer falls behind, the oldest queued scans are dropped.
+  """
+
+  def __init__(self, max_queue_size: int = qr_scan_queue_size):
+    self.max_queue_size = max_queue_size
+    self._loop = None
+    self._queue = None
+    self._lock = threading.Lock()
+
+    # Statistics
+    self.num_published = 0
+    self.num_delivered = 0
+    self.num_dropped = 0
+    # Sum of the times [s] between publishing and delivering the scans
+    self._total_latency_s = 0.0
+
+  def bind(self, loop: asyncio.AbstractEventLoop = None):
+    """
+    Bind the channel to the event loop the consumer runs in. Defaults to the
+    running event loop. Scans published before are dropped.
+    """
+    with self._lock:
+      self._loop = loop if loop is not None else asyncio.get_running_loop()
+      self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+
+  def publish(self, item_id: int):
+    """
+    Publish a scanned item ID. Can be called from any thread, it does not
+    block.
+    """
+    with self._lock:
+      loop = self._loop
+    if loop is None or loop.is_closed():
+      debug(f'Drop scan of item {item_id}, no consumer bound')
+      self.num_dropped += 1
+      return
+    self.num_published += 1
+    loop.call_soon_threadsafe(self._enqueue, (item_id, time.perf_counter()))
+
+  async def consume(self, callback):
+    """
+    Call callback(item_id) in the event loop for every published scan, in
+    the order of publishing. Binds the channel to the running loop if it is
+    not bound yet. Runs until cancelled.
+    """
+    if self._loop is None:
+      self.bind()
+    info('[x] Waiting for QR scan events')
+    while True:
+      (item_id, time_published) = await self._queue.get()
+      self.num_delivered += 1
+      self._total_latency_s += time.perf_counter() - time_published
+      try:
+        callback(item_id)
+      except Exception as e:
+        warning(f'[!] Handling scan of item {item_id} failed: {e}')
+
+  def get_stats(self) -> dict:
+    """
+    Return the statistics of the channel (published, delivered and dropped
+    scans, mean latency from publishing to delivery)
+    """
+    return {"published": self.num_published,
+            "delivered": self.num_delivered,
+            "dropped": self.num_dropped,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "mean_latency_s": (self._total_latency_s / self.num_delivered
+                               if self.num_delivered else 0.0)}
+
+  def _enqueue(self, event: tuple):
+    # Runs in the event loop
+    if self._queue.full():
+      self._queue.get_nowait()
+      self.num_dropped += 1
+    self._queue.put_nowait(event)
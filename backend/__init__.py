@@ -2,6 +2,7 @@
 # --- [Clients]
 from backend.DataBaseClient import DataBaseClient
 from backend.PrinterClient import PrinterClient
+from backend.ChangeNotificationBus import get_change_notification_bus
 
 # --- [Data Classes]
 from backend.InventoryItem import InventoryItem
@@ -12,6 +13,7 @@ from backend.InventoryUser import UserPrivileges
 
 # --- [Utility Functions]
 from backend.util import detect_and_decode_qr_marker
+from backend.database_bootstrap import bootstrap_database
 
 # --- [Config]
 from backend.database_config import *
@@ -10,3 +10,59 @@ camera_server_ip = "127.0.0.1"
 # CameraServer port
 # Default: 5000
 camera_server_port = 5050
+
+# Maximum number of QR scan events queued for the UI. If the UI falls
+# behind, the oldest scans are dropped in favour of the latest.
+qr_scan_queue_size = 16
+
+# Hold-off time [s] for QR scans: While a label is held in front of the
+# camera it is decoded in every frame. The same item ID is only reported
+# again once this time has passed since it was last reported.
+qr_scan_holdoff_s = 2.0
+
+# Index of the camera device opened by the CameraServer
+camera_device_index = 0
+
+# Time [s] a stream viewer waits for the next frame of the camera before the
+# stream is closed
+camera_frame_timeout_s = 5.0
+
+# Number of worker threads decoding QR markers. Decoding runs next to the
+# stream, workers always take the latest frame and skip older ones.
+qr_decode_workers = 2
+
+# Time window [s] the frame rates of the stream and QR decoding are
+# measured over
+camera_stats_window_s = 5.0
+
+# QR detector backends, tried in this order until one finds a marker. Put
+# the cheap ones first, the expensive ones only run if those fail:
+#   'pyzbar'      - pyzbar on the full resolution frame
+#   'pyzbar_fast' - pyzbar on a grayscale frame. Try a downscaled frame first
+#                   and the full resolution only if nothing was found. Once
+#                   a marker was found, search the region around it in the
+#                   following frames first.
+#   'opencv'      - OpenCV QRCodeDetector, copes better with angled labels
+#   'qrdet'       - qrdet (YOLO) localizes the markers, pyzbar and OpenCV
+#                   decode the found regions. Finds small and blurry labels,
+#                   but takes far longer per frame.
+qr_detector_cascade = ['pyzbar_fast', 'opencv', 'qrdet']
+
+# Minimum time [s] between two runs of a QR detector backend. Limits the CPU
+# load of the expensive backends while no label is in front of the camera.
+qr_detector_min_interval_s = {'qrdet': 0.5}
+
+# qrdet model size ('n', 's', 'm' or 'l') and confidence threshold
+qr_qrdet_model_size = 's'
+qr_qrdet_conf_th = 0.5
+
+# Scale factor of the downscaled pass of the pyzbar_fast detector
+qr_detection_downscale = 0.5
+
+# Margin of the tracked region of interest around the last found markers,
+# as a fraction of the marker size
+qr_detection_roi_margin = 0.5
+
+# Number of frames without a marker in the region of interest before it is
+# no longer tracked
+qr_detection_roi_max_misses = 3
@@ -0,0 +1,381 @@
+"""
+
+One-time database bootstrap and schema migrations
+
+bootstrap_database() is run once when the application starts. It makes sure
+the inventory database exists, applies all pending schema migrations and
+records the resulting schema version in SCHEMA_VERSION_TABLE_NAME.
+DataBaseClient instances assume a bootstrapped database and run no DDL or
+catalog queries themselves.
+
+To change the schema append a new migration to SCHEMA_MIGRATIONS. Never edit
+a migration that has already been released, databases that have applied it
+will not run it again.
+
+"""
+import mariadb
+import os
+from pathlib import Path
+from logging import info, warning
+
+from backend.database_config import (INVENTORY_DB_NAME,
+                                     INVENTORY_TABLE_NAME,
+                                     INVENTORY_USER_TABLE_NAME,
+                                     SCHEMA_VERSION_TABLE_NAME,
+                                     ITEM_TAG_TABLE_NAME,
+                                     LOCATION_TABLE_NAME,
+                                     CHECKOUT_EVENT_TABLE_NAME,
+                                     INVENTORY_CHANGE_TABLE_NAME,
+                                     ITEM_TAG_MAX_LENGTH,
+                                     database_port)
+from backend.DataBaseConnectionPool import get_connection_config
+
+# Name of the server side lock taken while migrating, so that several
+# processes starting at the same time do not migrate concurrently
+_migration_lock_name = f'{INVENTORY_DB_NAME}_schema_migration'
+
+# Time [s] to wait for another process to finish migrating
+_migration_lock_timeout_s = 60
+
+# -------------------------------------------------------------------------
+#                             [MIGRATIONS]
+# -------------------------------------------------------------------------
+
+
+def _migration_001_create_tables(cursor):
+  """
+  Create the inventory and the inventory user table. Both use IF NOT EXISTS
+  so that databases created before schema versioning are adopted as-is.
+  """
+  cursor.execute(f'CREATE TABLE IF NOT EXISTS {INVENTORY_TABLE_NAME} ('
+                 'id INT PRIMARY KEY AUTO_INCREMENT,'
+                 'item_name VARCHAR(255) NOT NULL,'
+                 'item_image VARCHAR(1055),'
+                 'item_description VARCHAR(1055),'
+                 'manufacturer VARCHAR(255),'
+                 'manufacturer_contact VARCHAR(1055),'
+                 'is_checked_out BOOLEAN,'
+                 'check_out_date VARCHAR(255),'
+                 'check_out_poc VARCHAR(1055),'
+                 'date_added VARCHAR(255),'
+                 'item_tags VARCHAR(1055),'
+                 'item_location VARCHAR(1055) )')
+
+  cursor.execute(f'CREATE TABLE IF NOT EXISTS {INVENTORY_USER_TABLE_NAME} ('
+                 'id INT PRIMARY KEY AUTO_INCREMENT,'
+                 'user_name VARCHAR(50) UNIQUE NOT NULL,'
+                 'user_password VARCHAR(50),'
+                 'user_privileges INT )')
+
+
+def _migration_002_add_fulltext_index(cursor):
+  """
+  Add a FULLTEXT index over the searchable text columns of the inventory
+  table. It backs the toolbar search of the frontend.
+  """
+  cursor.execute(f'ALTER TABLE {INVENTORY_TABLE_NAME} '
+                 'ADD FULLTEXT INDEX ft_inventory_search '
+                 '(item_name, item_description, manufacturer, item_tags, '
+                 'item_location)')
+
+
+def _migration_003_typed_dates_and_indexes(cursor):
+  """
+  Convert check_out_date and date_added from VARCHAR in the formats
+  '%m/%d/%Y, %H:%M:%S' (check_out_date) and '%m/%d/%Y, %H:%M' (date_added)
+  to DATETIME and add secondary indexes for the common lookups. Values that
+  match neither format (e.g. '' or 'None') become NULL.
+
+  Every DDL statement is committed on its own, so each step checks the
+  current columns and the migration can be re-run after a failure.
+  """
+  for column in ['check_out_date', 'date_added']:
+    column_type = _get_column_type(cursor, INVENTORY_TABLE_NAME, column)
+    typed_column_type = _get_column_type(cursor, INVENTORY_TABLE_NAME,
+                                         f'{column}_typed')
+    if column_type == 'datetime' and typed_column_type is None:
+      # Converted by an earlier run
+      continue
+
+    if column_type is not None:
+      cursor.execute(f'ALTER TABLE {INVENTORY_TABLE_NAME} '
+                     f'ADD COLUMN IF NOT EXISTS {column}_typed DATETIME '
+                     f'NULL AFTER {column}')
+      # Only convert values that match a format, STR_TO_DATE fails on others
+      # in strict SQL mode
+      cursor.execute(f"UPDATE {INVENTORY_TABLE_NAME} SET {column}_typed = CASE "
+                     f"WHEN {column} REGEXP "
+                     f"'^[0-9]{{1,2}}/[0-9]{{1,2}}/[0-9]{{4}}, [0-9]{{1,2}}:[0-9]{{2}}:[0-9]{{2}}$' "
+                     f"THEN STR_TO_DATE({column}, '%m/%d/%Y, %H:%i:%s') "
+                     f"WHEN {column} REGEXP "
+                     f"'^[0-9]{{1,2}}/[0-9]{{1,2}}/[0-9]{{4}}, [0-9]{{1,2}}:[0-9]{{2}}$' "
+                     f"THEN STR_TO_DATE({column}, '%m/%d/%Y, %H:%i') "
+                     f"ELSE NULL END")
+      cursor.execute(f'ALTER TABLE {INVENTORY_TABLE_NAME} '
+                     f'DROP COLUMN IF EXISTS {column}')
+    cursor.execute(f'ALTER TABLE {INVENTORY_TABLE_NAME} '
+                   f'CHANGE COLUMN {column}_typed {column} DATETIME NULL')
+
+  # Long text columns are indexed by prefix to stay within the maximum key
+  # length
+  cursor.execute(f'ALTER TABLE {INVENTORY_TABLE_NAME} '
+                 'ADD INDEX IF NOT EXISTS idx_inventory_item_name (item_name), '
+                 'ADD INDEX IF NOT EXISTS idx_inventory_checked_out '
+                 '(is_checked_out, check_out_date), '
+                 'ADD INDEX IF NOT EXISTS idx_inventory_check_out_poc '
+                 '(check_out_poc(191)), '
+                 'ADD INDEX IF NOT EXISTS idx_inventory_item_location '
+                 '(item_location(191)), '
+                 'ADD INDEX IF NOT EXISTS idx_inventory_date_added (date_added)')
+
+
+def _migration_004_item_tag_table(cursor):
+  """
+  Add the item_tag table with one row per tag of an inventory item and fill
+  it from the ';'-separated item_tags column. item_tags stays as
+  denormalized copy of the tags for display and the full-text search.
+  """
+  cursor.execute(f'CREATE TABLE IF NOT EXISTS {ITEM_TAG_TABLE_NAME} ('
+                 'item_id INT NOT NULL,'
+                 f'tag VARCHAR({ITEM_TAG_MAX_LENGTH}) NOT NULL,'
+                 'PRIMARY KEY (item_id, tag),'
+                 'INDEX idx_item_tag_tag (tag, item_id),'
+                 'CONSTRAINT fk_item_tag_item FOREIGN KEY (item_id) '
+                 f'REFERENCES {INVENTORY_TABLE_NAME} (id) ON DELETE CASCADE )')
+
+  cursor.execute(f"SELECT id, item_tags FROM {INVENTORY_TABLE_NAME} "
+                 "WHERE item_tags IS NOT NULL AND item_tags <> ''")
+  item_tags = []
+  for (item_id, tags) in cursor.fetchall():
+    for tag in tags.split(';'):
+      tag = tag.strip()[:ITEM_TAG_MAX_LENGTH].strip()
+      if tag not in ['', 'None']:
+        item_tags.append((item_id, tag))
+  # IGNORE drops tags listed twice for the same item
+  if item_tags:
+    cursor.executemany(f'INSERT IGNORE INTO {ITEM_TAG_TABLE_NAME} '
+                       '(item_id, tag) VALUES (?, ?)', item_tags)
+
+
+def _migration_005_location_table(cursor):
+  """
+  Add the location table and link the inventory items to it by location_id.
+  Each location stores the materialized path of the IDs from its root down
+  to itself ('/1/5/12/'), so subtrees are resolved by a prefix range of the
+  path index.
+
+  Every distinct item_location text becomes a top level location that its
+  items are linked to. The item_location text is kept as description of the
+  storage place.
+
+  The DDL statements can be re-run after a failure, the data is only
+  written after the last one and committed along with the schema version.
+  """
+  cursor.execute(f'CREATE TABLE IF NOT EXISTS {LOCATION_TABLE_NAME} ('
+                 'id INT PRIMARY KEY AUTO_INCREMENT,'
+                 'parent_id INT NULL,'
+                 'name VARCHAR(255) NOT NULL,'
+                 'path VARCHAR(255) CHARACTER SET ascii COLLATE ascii_bin '
+                 'NOT NULL,'
+                 'INDEX idx_location_path (path),'
+                 'INDEX idx_location_parent (parent_id),'
+                 'CONSTRAINT fk_location_parent FOREIGN KEY (parent_id) '
+                 f'REFERENCES {LOCATION_TABLE_NAME} (id) )')
+
+  cursor.execute(f'ALTER TABLE {INVENTORY_TABLE_NAME} '
+                 'ADD COLUMN IF NOT EXISTS location_id INT NULL '
+                 'AFTER item_location, '
+                 'ADD INDEX IF NOT EXISTS idx_inventory_location (location_id), '
+                 'ADD CONSTRAINT fk_inventory_location '
+                 'FOREIGN KEY IF NOT EXISTS (location_id) '
+                 f'REFERENCES {LOCATION_TABLE_NAME} (id) ON DELETE SET NULL')
+
+  cursor.execute(f"INSERT INTO {LOCATION_TABLE_NAME} (name, path) "
+                 "SELECT DISTINCT LEFT(TRIM(item_location), 255), '' "
+                 f"FROM {INVENTORY_TABLE_NAME} WHERE item_location IS NOT NULL "
+                 "AND TRIM(item_location) NOT IN ('', 'None')")
+  cursor.execute(f"UPDATE {LOCATION_TABLE_NAME} SET path = CONCAT('/', id, '/')")
+  cursor.execute(f'UPDATE {INVENTORY_TABLE_NAME} JOIN {LOCATION_TABLE_NAME} '
+                 f'ON {LOCATION_TABLE_NAME}.name = '
+                 f'LEFT(TRIM({INVENTORY_TABLE_NAME}.item_location), 255) '
+                 f'SET {INVENTORY_TABLE_NAME}.location_id = '
+                 f'{LOCATION_TABLE_NAME}.id')
+
+
+def _migration_006_checkout_event_table(cursor):
+  """
+  Add the append-only checkout_event table with one row per check-out and
+  check-in of an item. It is indexed by item and by user, both in event
+  order. Items that are checked out get their check-out event recorded.
+  """
+  cursor.execute(f'CREATE TABLE IF NOT EXISTS {CHECKOUT_EVENT_TABLE_NAME} ('
+                 'id BIGINT PRIMARY KEY AUTO_INCREMENT,'
+                 'item_id INT NOT NULL,'
+                 'event_type VARCHAR(16) NOT NULL,'
+                 'user_name VARCHAR(255),'
+                 'event_date DATETIME NOT NULL,'
+                 'INDEX idx_checkout_event_item (item_id, id),'
+                 'INDEX idx_checkout_event_user (user_name, id) )')
+
+  cursor.execute(f"INSERT INTO {CHECKOUT_EVENT_TABLE_NAME} "
+                 "(item_id, event_type, user_name, event_date) "
+                 "SELECT id, 'check_out', check_out_poc, "
+                 f"COALESCE(check_out_date, NOW()) FROM {INVENTORY_TABLE_NAME} "
+                 "WHERE is_checked_out = 1 ORDER BY id")
+
+
+def _migration_007_inventory_change_feed(cursor):
+  """
+  Add the updated_at column to the inventory table and the inventory_change
+  feed. Triggers on the inventory table append one row per inserted,
+  updated or deleted item to the feed. Its version increases with every
+  change. All statements can be re-run after a failure.
+  """
+  cursor.execute(f'ALTER TABLE {INVENTORY_TABLE_NAME} '
+                 'ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP NOT NULL '
+                 'DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP, '
+                 'ADD INDEX IF NOT EXISTS idx_inventory_updated_at (updated_at)')
+
+  cursor.execute(f'CREATE TABLE IF NOT EXISTS {INVENTORY_CHANGE_TABLE_NAME} ('
+                 'version BIGINT PRIMARY KEY AUTO_INCREMENT,'
+                 'item_id INT NOT NULL,'
+                 'change_type VARCHAR(8) NOT NULL,'
+                 'changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,'
+                 'INDEX idx_inventory_change_changed_at (changed_at) )')
+
+  for (event, change_type, row) in [('INSERT', 'insert', 'NEW'),
+                                    ('UPDATE', 'update', 'NEW'),
+                                    ('DELETE', 'delete', 'OLD')]:
+    cursor.execute(f'CREATE TRIGGER IF NOT EXISTS inventory_change_{change_type} '
+                   f'AFTER {event} ON {INVENTORY_TABLE_NAME} FOR EACH ROW '
+                   f'INSERT INTO {INVENTORY_CHANGE_TABLE_NAME} '
+                   '(item_id, change_type) '
+                   f"VALUES ({row}.id, '{change_type}')")
+
+
+def _get_column_type(cursor, table_name: str, column: str):
+  """
+  Return the data type (e.g. 'varchar', 'datetime') of a column of a table
+  in the current database, None if the column does not exist
+  """
+  cursor.execute('SELECT DATA_TYPE FROM information_schema.COLUMNS '
+                 'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = ? '
+                 'AND COLUMN_NAME = ?', (table_name, column))
+  row = cursor.fetchone()
+  return row[0].lower() if row else None
+
+
+# Ordered list of all schema migrations: (version, description, function)
+# Each function receives a cursor on the inventory database.
+SCHEMA_MIGRATIONS = [
+    (1, 'Create inventory and inventory user tables',
+     _migration_001_create_tables),
+    (2, 'Add full-text search index to inventory table',
+     _migration_002_add_fulltext_index),
+    (3, 'Store inventory dates as DATETIME and add secondary indexes',
+     _migration_003_typed_dates_and_indexes),
+    (4, 'Add item tag table',
+     _migration_004_item_tag_table),
+    (5, 'Add location table and link inventory items to it',
+     _migration_005_location_table),
+    (6, 'Add checkout event table',
+     _migration_006_checkout_event_table),
+    (7, 'Add updated_at column and change feed to inventory table',
+     _migration_007_inventory_change_feed),
+]
+
+# Schema version this code base expects
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+# -------------------------------------------------------------------------
+#                             [BOOTSTRAP]
+# -------------------------------------------------------------------------
+
+
+def bootstrap_database(host: str, port: int = database_port) -> int:
+  """
+  Bring the inventory database up to SCHEMA_VERSION:
+   * Create the inventory database if it does not exist
+   * Apply all pending schema migrations and record them
+   * Initialize the media directory
+
+  Returns the schema version of the database.
+  """
+  try:
+    # Connect without selecting a database, it might not exist yet
+    connection = mariadb.connect(**get_connection_config(host,
+                                                         port,
+                                                         database=None))
+  except mariadb.Error as e:
+    raise RuntimeError(f"Error connecting to MariaDB: {e}")
+
+  try:
+    cursor = connection.cursor()
+    cursor.execute(f'CREATE DATABASE IF NOT EXISTS `{INVENTORY_DB_NAME}`')
+    cursor.execute(f'USE `{INVENTORY_DB_NAME}`')
+
+    cursor.execute('SELECT GET_LOCK(?, ?)',
+                   (_migration_lock_name, _migration_lock_timeout_s))
+    if cursor.fetchone()[0] != 1:
+      raise RuntimeError('Timed out waiting for another process to migrate '
+                         'the inventory database')
+    try:
+      schema_version = _apply_migrations(connection, cursor)
+    finally:
+      cursor.execute('SELECT RELEASE_LOCK(?)', (_migration_lock_name,))
+      cursor.fetchall()
+    cursor.close()
+  finally:
+    connection.close()
+
+  # Initialize media folder
+  init_media_dir()
+
+  return schema_version
+
+
+def _apply_migrations(connection, cursor) -> int:
+  """
+  Apply all migrations newer than the recorded schema version. Returns the
+  resulting schema version.
+  """
+  cursor.execute(f'CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE_NAME} ('
+                 'version INT PRIMARY KEY,'
+                 'description VARCHAR(255),'
+                 'applied_at DATETIME DEFAULT CURRENT_TIMESTAMP )')
+
+  cursor.execute(f'SELECT MAX(version) FROM {SCHEMA_VERSION_TABLE_NAME}')
+  schema_version = cursor.fetchone()[0] or 0
+
+  if schema_version > SCHEMA_VERSION:
+    warning(f'Database schema version {schema_version} is newer than the '
+            f'version supported by this application ({SCHEMA_VERSION})')
+    return schema_version
+
+  for (version, description, migration) in SCHEMA_MIGRATIONS:
+    if version <= schema_version:
+      continue
+    info(f'[+] Apply schema migration {version}: {description}')
+    migration(cursor)
+    cursor.execute(f'INSERT INTO {SCHEMA_VERSION_TABLE_NAME} '
+                   '(version, description) VALUES (?, ?)',
+                   (version, description))
+    connection.commit()
+    schema_version = version
+
+  info(f'[x] {INVENTORY_DB_NAME} database at schema version {schema_version}')
+  return schema_version
+
+
+def init_media_dir():
+  """
+  Initialize subdirectory to store media data. Media data is data that will
+  not be stored in the database itself (images, video, audio). The inventory
+  database will hold a path to the respective file in the media folder instead.
+
+  """
+  pwd_path = Path(os.path.realpath(__file__))
+  media_directory = pwd_path.parent / '..' / 'database' / 'media'
+  if not media_directory.exists():
+    info(f'[x] Create media directory at {media_directory}')
+    os.makedirs(media_directory.absolute().as_posix(), 0o775)
@@ -14,6 +14,44 @@ INVENTORY_TABLE_NAME = 'inventory'
 #            Inventory users
 INVENTORY_USER_TABLE_NAME = 'inventory_user'
 
+# [CONSTANT] Name of the table in INVENTORY_DB_NAME database to record the
+#            applied schema migrations
+SCHEMA_VERSION_TABLE_NAME = 'schema_version'
+
+# [CONSTANT] Name of the table in INVENTORY_DB_NAME database that holds the
+#            tags of the inventory items, one row per item and tag
+ITEM_TAG_TABLE_NAME = 'item_tag'
+
+# [CONSTANT] Maximum length of a single item tag, longer tags are cut.
+#            Changing it requires a new schema migration.
+ITEM_TAG_MAX_LENGTH = 100
+
+# [CONSTANT] Name of the table in INVENTORY_DB_NAME database that holds the
+#            storage locations (building, room, shelf, ...) as a tree
+LOCATION_TABLE_NAME = 'location'
+
+# [CONSTANT] Name of the append-only table in INVENTORY_DB_NAME database that
+#            records every check-out and check-in of an inventory item
+CHECKOUT_EVENT_TABLE_NAME = 'checkout_event'
+
+# [CONSTANT] Event types recorded in CHECKOUT_EVENT_TABLE_NAME
+CHECKOUT_EVENT_CHECK_OUT = 'check_out'
+CHECKOUT_EVENT_CHECK_IN = 'check_in'
+
+# [CONSTANT] Name of the table in INVENTORY_DB_NAME database that records a
+#            change feed of the inventory table. It is filled by triggers on
+#            every insert, update and delete of an item.
+INVENTORY_CHANGE_TABLE_NAME = 'inventory_change'
+
+# [CONSTANT] Columns covered by the FULLTEXT index of the inventory table.
+#            MATCH() has to list exactly these columns. Changing them
+#            requires a new schema migration (see database_bootstrap.py)
+INVENTORY_FULLTEXT_COLUMNS = ['item_name',
+                              'item_description',
+                              'manufacturer',
+                              'item_tags',
+                              'item_location']
+
 # Default database host IP address
 database_host = '192.168.1.194'
 
@@ -24,3 +62,65 @@ database_host = '192.168.1.194'
 # Media directory folder. This will be set when creating the DataBaseClient
 # instance!
 media_directory = '../database/media'
+
+# -------------------------------------------------------------------------
+#                             [CONNECTION]
+# -------------------------------------------------------------------------
+
+# Default database port (see database/docker-compose.yml)
+database_port = 46123
+
+# Credentials of the inventory database user
+database_user = 'inventory_user'
+database_password = 'inventory24'
+
+# Maximum number of connections held open by the process wide connection
+# pool. All DataBaseClient instances of a process share this pool.
+database_pool_size = 5
+
+# Maximum time [s] to wait for a free pooled connection before raising an
+# error
+database_pool_timeout_s = 10.0
+
+# Pooled connections that have been idle for longer than this [s] are
+# pinged before being handed out again
+database_pool_health_check_interval_s = 30.0
+
+# Maximum number of server side prepared statements kept per pooled
+# connection. Frequently executed statements (item and user writes) are only
+# prepared once per connection.
+database_prepared_statement_cache_size = 32
+
+# Number of rows fetched per round trip when large results are streamed from
+# the database (e.g. CSV export)
+database_fetch_batch_size = 1000
+
+# Number of rows written per statement and transaction by bulk imports. Each
+# row binds one value per inventory column, keep the total well below the
+# server limit of 65535 placeholders per statement.
+database_import_batch_size = 500
+
+# -------------------------------------------------------------------------
+#                             [CHANGE FEED]
+# -------------------------------------------------------------------------
+
+# Maximum number of changes read from the change feed at once
+database_change_feed_batch_size = 1000
+
+# Time [s] after which a change is assumed to be committed. Versions of the
+# change feed are assigned when a change is made, not when it is committed,
+# so a reader might see a version before a lower one. Until this time has
+# passed, changes after a missing version are delivered again.
+database_change_feed_settle_s = 10.0
+
+# Time [s] the change feed is kept. Readers that are further behind reload
+# the inventory instead.
+database_change_feed_retention_s = 7 * 24 * 3600
+
+# Interval [s] in which the change notification bus of a process polls the
+# change feed for changes made by other sessions and processes
+database_change_poll_interval_s = 1.0
+
+# Interval [s] in which the change notification bus prunes the change feed
+# (see database_change_feed_retention_s)
+database_change_prune_interval_s = 3600.0
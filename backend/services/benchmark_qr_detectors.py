@@ -0,0 +1,105 @@
+"""
+
+Service function to benchmark the QR detector backends
+
+Runs every QR detector backend and the configured cascade on a set of
+images, e.g. camera frames saved at a scan station, and reports per
+detector the share of images a marker was found in and the mean decoding
+time:
+
+  python backend/services/benchmark_qr_detectors.py frames/*.png
+  python backend/services/benchmark_qr_detectors.py frames/*.png \\
+      --detectors pyzbar opencv --repeat 10
+
+Use it to choose qr_detector_cascade in camera_config for the hardware of a
+scan station.
+
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from logging import info, warning
+from pathlib import Path
+
+import cv2 as cv
+
+# Get the repository directory and add it to the sys.path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(parent_dir)
+
+from backend.util import QR_DETECTORS, QrDetectorCascade
+
+
+def benchmark_detector(detector, images: list, repeat: int = 1) -> dict:
+  """
+  Decode every image repeat times with the detector
+
+  Args:
+  detector - QR detector with a decode(frame) function
+  images - List of images (numpy arrays) to decode
+  repeat - Number of times every image is decoded
+
+  Returns
+  stats - Dictionary with the number of decoded images, the share of images
+          a marker was found in and the mean decoding time per image
+  """
+  num_hits = 0
+  duration_s = 0.0
+  for image in images:
+    for _ in range(repeat):
+      time_start = time.perf_counter()
+      markers = detector.decode(image)
+      duration_s += time.perf_counter() - time_start
+      num_hits += 1 if markers else 0
+
+  num_decoded = len(images) * repeat
+  return {"decoded": num_decoded,
+          "hit_rate": num_hits / num_decoded if num_decoded else 0.0,
+          "mean_decode_s": duration_s / num_decoded if num_decoded else 0.0}
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description='Benchmark the QR detector backends on a set of images')
+  parser.add_argument('images', type=Path, nargs='+',
+                      help='Images to decode')
+  parser.add_argument('--detectors', nargs='+', default=list(QR_DETECTORS),
+                      choices=list(QR_DETECTORS),
+                      help='Detector backends to benchmark')
+  parser.add_argument('--repeat', type=int, default=1,
+                      help='Number of times every image is decoded')
+  args = parser.parse_args()
+
+  images = []
+  for image_path in args.images:
+    image = cv.imread(str(image_path))
+    if image is None:
+      warning(f'Skipping {image_path}, it is not a readable image')
+      continue
+    images.append(image)
+  if not images:
+    warning('[!] No images to benchmark on')
+    return
+  info(f'[x] Benchmarking on {len(images)} images')
+
+  # The cascade is benchmarked without minimum intervals, every backend
+  # runs whenever the ones in front of it fail
+  detectors = ([QR_DETECTORS[name]() for name in args.detectors] +
+               [QrDetectorCascade(min_interval_s={})])
+  for detector in detectors:
+    name = getattr(detector, 'name', 'cascade')
+    if name == 'qrdet':
+      # Load the model before measuring
+      detector.decode(images[0])
+    stats = benchmark_detector(detector, images, args.repeat)
+    info(f'{name:>12}  {100 * stats["hit_rate"]:5.1f} % found  '
+         f'{1000 * stats["mean_decode_s"]:8.1f} ms/image')
+
+
+if __name__ == '__main__':
+  logging.basicConfig(format='%(asctime)s [%(levelname)s] %(message)s',
+                      datefmt='%H:%M:%S',
+                      level=logging.INFO)
+  main()
@@ -1 +1,401 @@
-# TODO
+"""
+
+Service function to export inventory database tables to file
+
+The rows are streamed from the database through an unbuffered cursor and
+written in batches, so memory use does not grow with the table size. This
+makes it suitable for nightly snapshots of large inventories:
+
+  python backend/services/export_db_to_csv.py inventory.csv
+  python backend/services/export_db_to_csv.py inventory.jsonl --format jsonl \\
+      --columns id item_name item_location --where "is_checked_out = 1"
+  python backend/services/export_db_to_csv.py changes.csv --incremental
+
+Supported formats are csv, jsonl (JSON Lines) and parquet. Parquet requires
+the optional pyarrow package.
+
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from logging import info, warning
+from pathlib import Path
+
+# Get the repository directory and add it to the sys.path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(parent_dir)
+
+from backend.DataBaseClient import DataBaseClient
+from backend.InventoryItem import InventoryItem
+
+# --- Config imports
+from backend.database_config import (INVENTORY_TABLE_NAME,
+                                     INVENTORY_USER_TABLE_NAME,
+                                     database_host,
+                                     database_port,
+                                     database_fetch_batch_size,
+                                     database_change_feed_settle_s)
+
+# Pyarrow is only needed for the parquet format
+try:
+  import pyarrow
+  import pyarrow.parquet
+except ImportError:
+  pyarrow = None
+
+# Columns that can be exported per table. Password hashes of the inventory
+# users are never exported.
+EXPORT_COLUMNS = {
+    INVENTORY_TABLE_NAME: ['id'] + InventoryItem('').get_item_property_classes(),
+    INVENTORY_USER_TABLE_NAME: ['id', 'user_name', 'user_privileges'],
+}
+
+EXPORT_FORMATS = ['csv', 'jsonl', 'parquet']
+
+# Tables that can be exported incrementally. They need an updated_at column
+# that is set on every change of a row.
+INCREMENTAL_EXPORT_TABLES = [INVENTORY_TABLE_NAME]
+
+# File that keeps the (updated_at, id) watermark of the last incremental
+# export per table
+default_state_path = (Path(os.path.realpath(__file__)).parent / '..' / '..' /
+                      'database' / 'export_state.json')
+
+# Log the progress every this many rows
+_progress_interval_rows = 100000
+
+# -------------------------------------------------------------------------
+#                             [WRITERS]
+# -------------------------------------------------------------------------
+
+
+class CsvExportWriter():
+  """
+  Write rows in csv format with a header line
+  """
+
+  def __init__(self, output_path: Path, columns: list):
+    self._file = open(output_path, 'w', newline='', encoding='utf-8')
+    self._writer = csv.writer(self._file, lineterminator='\n')
+    self._writer.writerow(columns)
+
+  def write_batch(self, rows: list):
+    self._writer.writerows(rows)
+
+  def close(self):
+    self._file.close()
+
+
+class JsonLinesExportWriter():
+  """
+  Write rows in JSON Lines format, one JSON object per row
+  """
+
+  def __init__(self, output_path: Path, columns: list):
+    self._file = open(output_path, 'w', encoding='utf-8')
+    self.columns = columns
+
+  def write_batch(self, rows: list):
+    self._file.writelines(
+        [json.dumps(dict(zip(self.columns, row)), default=str) + '\n'
+         for row in rows])
+
+  def close(self):
+    self._file.close()
+
+
+class ParquetExportWriter():
+  """
+  Write rows in parquet format, one row group per batch. The column types
+  are derived from the first batch. Columns without a value in the first
+  batch are written as strings.
+  """
+
+  def __init__(self, output_path: Path, columns: list):
+    if pyarrow is None:
+      raise RuntimeError('The parquet format requires the pyarrow package')
+    self.output_path = output_path
+    self.columns = columns
+    self._schema = None
+    self._writer = None
+
+  def write_batch(self, rows: list):
+    if not rows:
+      return
+    column_values = [list(values) for values in zip(*rows)]
+
+    if self._schema is None:
+      self._schema = pyarrow.schema(
+          [(column, self._get_arrow_type(values))
+           for (column, values) in zip(self.columns, column_values)])
+      self._writer = pyarrow.parquet.ParquetWriter(self.output_path,
+                                                   self._schema)
+
+    arrays = []
+    for (field, values) in zip(self._schema, column_values):
+      if pyarrow.types.is_string(field.type):
+        values = [None if value is None else str(value) for value in values]
+      arrays.append(pyarrow.array(values, type=field.type))
+    self._writer.write_table(pyarrow.Table.from_arrays(arrays,
+                                                       schema=self._schema))
+
+  def close(self):
+    if self._writer is None:
+      # No rows exported, still write a valid (empty) file
+      self._writer = pyarrow.parquet.ParquetWriter(
+          self.output_path,
+          pyarrow.schema([(column, pyarrow.string())
+                          for column in self.columns]))
+    self._writer.close()
+
+  def _get_arrow_type(self, values: list):
+    for value in values:
+      if value is None:
+        continue
+      if isinstance(value, bool):
+        return pyarrow.bool_()
+      if isinstance(value, int):
+        return pyarrow.int64()
+      if isinstance(value, float):
+        return pyarrow.float64()
+      if isinstance(value, datetime):
+        return pyarrow.timestamp('us')
+      break
+    return pyarrow.string()
+
+
+_export_writers = {'csv': CsvExportWriter,
+                   'jsonl': JsonLinesExportWriter,
+                   'parquet': ParquetExportWriter}
+
+# -------------------------------------------------------------------------
+#                             [EXPORT]
+# -------------------------------------------------------------------------
+
+
+def export_table(output_path: Path,
+                 table_name: str = INVENTORY_TABLE_NAME,
+                 export_format: str = 'csv',
+                 columns: list = None,
+                 where: str = '',
+                 incremental: bool = False,
+                 state_path: Path = default_state_path,
+                 host: str = database_host,
+                 port: int = database_port,
+                 batch_size: int = database_fetch_batch_size) -> dict:
+  """
+  Export a database table to file
+
+  Args:
+  output_path - File to write. An existing file is overwritten.
+  table_name - Table to export, one of EXPORT_COLUMNS
+  export_format - One of EXPORT_FORMATS
+  columns - Columns to export, all exportable columns of the table if None
+  where - SQL condition to filter the exported rows. It is put into the
+          query as-is, only pass trusted input.
+  incremental - If True only export rows added or changed since the last
+                incremental export of this table, one of
+                INCREMENTAL_EXPORT_TABLES. Deleted rows are not exported.
+                The (updated_at, id) watermark is kept in state_path.
+  state_path - State file of the incremental export
+  host, port - Database server
+  batch_size - Number of rows fetched and written at once
+
+  Returns
+  stats - Dictionary with the number of exported rows, the duration and
+          the throughput in rows/s
+  """
+  if table_name not in EXPORT_COLUMNS:
+    raise ValueError(f'Table {table_name} cannot be exported')
+  if export_format not in EXPORT_FORMATS:
+    raise ValueError(f'Unknown export format {export_format}')
+
+  if columns is None:
+    columns = list(EXPORT_COLUMNS[table_name])
+  unknown_columns = [column for column in columns
+                     if column not in EXPORT_COLUMNS[table_name]]
+  if unknown_columns:
+    raise ValueError(f'Columns {unknown_columns} cannot be exported from '
+                     f'table {table_name}')
+  if incremental and table_name not in INCREMENTAL_EXPORT_TABLES:
+    raise ValueError(f'Table {table_name} cannot be exported incrementally')
+
+  # The incremental export needs the update time and the ID of each row to
+  # track its progress. They are selected after the exported columns.
+  select_columns = list(columns)
+  if incremental:
+    select_columns += ['updated_at', 'id']
+
+  conditions = []
+  values = []
+  if where:
+    conditions.append(f'({where})')
+  watermark = None
+  if incremental:
+    watermark = _get_export_watermark(state_path, table_name)
+    if watermark is not None:
+      conditions.append('(updated_at > ? OR (updated_at = ? AND id > ?))')
+      values += [watermark[0], watermark[0], watermark[1]]
+      info(f'[x] Incremental export of {table_name} of the rows changed '
+           f'since {watermark[0].isoformat()}')
+    else:
+      info(f'[x] First incremental export of {table_name}, export all rows')
+    # Rows changed within the last seconds are left to the next export, as
+    # transactions committed later might still add rows with an older
+    # updated_at
+    conditions.append('updated_at < NOW() - INTERVAL ? SECOND')
+    values.append(database_change_feed_settle_s)
+
+  sql = f"SELECT {', '.join(select_columns)} FROM {table_name}"
+  if conditions:
+    sql += f" WHERE {' AND '.join(conditions)}"
+  sql += (" ORDER BY updated_at ASC, id ASC" if incremental
+          else " ORDER BY id ASC")
+
+  client = DataBaseClient(host=host, port=port)
+  writer = _export_writers[export_format](output_path, columns)
+
+  num_rows = 0
+  time_start = time.monotonic()
+  try:
+    for (_, rows) in client.iter_sql_query(sql, values, batch_size):
+      if not rows:
+        continue
+      if incremental:
+        watermark = tuple(rows[-1][len(columns):])
+        # Drop the columns that were only selected to track the progress
+        rows = [row[:len(columns)] for row in rows]
+      writer.write_batch(rows)
+
+      num_rows_before = num_rows
+      num_rows += len(rows)
+      if (num_rows // _progress_interval_rows >
+              num_rows_before // _progress_interval_rows):
+        info(f'[x] Exported {num_rows} rows '
+             f'({_get_rate(num_rows, time.monotonic() - time_start):.0f} '
+             f'rows/s)')
+  finally:
+    writer.close()
+
+  duration_s = time.monotonic() - time_start
+  stats = {"table": table_name,
+           "rows": num_rows,
+           "duration_s": duration_s,
+           "rows_per_s": _get_rate(num_rows, duration_s)}
+  info(f'[x] Exported {num_rows} rows of {table_name} to {output_path} in '
+       f'{duration_s:.2f} s ({stats["rows_per_s"]:.0f} rows/s)')
+
+  # Only advance the watermark once the file is completely written
+  if incremental and watermark is not None:
+    _save_export_state(state_path, table_name, watermark)
+
+  return stats
+
+
+def _get_rate(num_rows: int, duration_s: float) -> float:
+  return num_rows / duration_s if duration_s > 0 else 0.0
+
+
+def _load_export_state(state_path: Path) -> dict:
+  """
+  Load the state of the incremental exports, empty if there is none yet
+  """
+  state_path = Path(state_path)
+  if not state_path.exists():
+    return {}
+  with open(state_path, 'r', encoding='utf-8') as state_file:
+    return json.load(state_file)
+
+
+def _get_export_watermark(state_path: Path, table_name: str):
+  """
+  Return the (updated_at, id) watermark of the last incremental export of a
+  table, None if the table was not exported incrementally yet
+  """
+  table_state = _load_export_state(state_path).get(table_name, {})
+  if 'last_updated_at' not in table_state:
+    if 'last_id' in table_state:
+      warning(f'[!] State of {table_name} has no update time, the changed '
+              'rows are unknown')
+    return None
+  return (datetime.fromisoformat(table_state['last_updated_at']),
+          table_state['last_id'])
+
+
+def _save_export_state(state_path: Path, table_name: str, watermark: tuple):
+  """
+  Record the (updated_at, id) watermark of the last exported row of a
+  table. The state file is replaced atomically, so an interrupted write does
+  not lose the previous state.
+  """
+  state_path = Path(state_path)
+  state = _load_export_state(state_path)
+  state[table_name] = {"last_updated_at": watermark[0].isoformat(),
+                       "last_id": watermark[1],
+                       "exported_at": datetime.now().isoformat()}
+
+  tmp_path = state_path.with_suffix(state_path.suffix + '.tmp')
+  with open(tmp_path, 'w', encoding='utf-8') as state_file:
+    json.dump(state, state_file, indent=2)
+  os.replace(tmp_path, state_path)
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description='Export an inventory database table to file')
+  parser.add_argument('output', type=Path, help='Output file')
+  parser.add_argument('--table', default=INVENTORY_TABLE_NAME,
+                      choices=list(EXPORT_COLUMNS.keys()),
+                      help='Table to export')
+  parser.add_argument('--format', dest='export_format', default=None,
+                      choices=EXPORT_FORMATS,
+                      help='Output format, derived from the output file '
+                           'extension if not set')
+  parser.add_argument('--columns', nargs='+', default=None,
+                      help='Columns to export (default: all)')
+  parser.add_argument('--where', default='',
+                      help='SQL condition to filter the exported rows')
+  parser.add_argument('--incremental', action='store_true',
+                      help='Only export rows added or changed since the '
+                           'last incremental export (deleted rows are not '
+                           'exported)')
+  parser.add_argument('--state-file', type=Path, default=default_state_path,
+                      help='State file of the incremental export')
+  parser.add_argument('--host', default=database_host,
+                      help='Database host')
+  parser.add_argument('--port', type=int, default=database_port,
+                      help='Database port')
+  parser.add_argument('--batch-size', type=int,
+                      default=database_fetch_batch_size,
+                      help='Number of rows fetched and written at once')
+  args = parser.parse_args()
+
+  export_format = args.export_format
+  if export_format is None:
+    export_format = args.output.suffix.lstrip('.').lower()
+    if export_format not in EXPORT_FORMATS:
+      warning(f'Unknown file extension {args.output.suffix}, export as csv')
+      export_format = 'csv'
+
+  export_table(output_path=args.output,
+               table_name=args.table,
+               export_format=export_format,
+               columns=args.columns,
+               where=args.where,
+               incremental=args.incremental,
+               state_path=args.state_file,
+               host=args.host,
+               port=args.port,
+               batch_size=args.batch_size)
+
+
+if __name__ == '__main__':
+  logging.basicConfig(format='%(asctime)s [%(levelname)s] %(message)s',
+                      datefmt='%H:%M:%S',
+                      level=logging.INFO)
+  main()
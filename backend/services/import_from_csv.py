@@ -1 +1,278 @@
-# TODO
+"""
+
+Service function to import inventory items from a csv file
+
+The csv file is read row by row and written to the database in batches,
+one transaction per batch, so large files can be imported with constant
+memory:
+
+  python backend/services/import_from_csv.py items.csv
+  python backend/services/import_from_csv.py items.csv --dry-run
+  python backend/services/import_from_csv.py inventory.csv --upsert
+
+The first line of the file names the columns. item_name is required, all
+other inventory columns are optional and take the same defaults as items
+added in the UI. Dates are accepted in ISO format ('2024-05-17 14:03:00') or
+as '05/17/2024, 14:03:00'. Files written by the csv export can be imported
+as-is.
+
+Without --upsert every row creates a new item and an id column is ignored.
+With --upsert rows with an ID create or replace the item with that ID, rows
+without an ID create a new item.
+
+New items of a batch are created with a single multi-row INSERT if the
+server assigns its IDs as one block (innodb_autoinc_lock_mode 0 or 1, the
+MariaDB default), one by one otherwise. The IDs of the created items are
+reported as ranges of consecutive IDs.
+
+"""
+import argparse
+import csv
+import logging
+import os
+import sys
+import time
+from logging import info, warning, error
+from pathlib import Path
+
+# Get the repository directory and add it to the sys.path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(parent_dir)
+
+from backend.DataBaseClient import DataBaseClient
+from backend.InventoryItem import (InventoryItem,
+                                   parse_item_datetime,
+                                   parse_item_location_id)
+
+# --- Config imports
+from backend.database_config import (database_host,
+                                     database_port,
+                                     database_import_batch_size)
+
+# Inventory columns that can be imported
+IMPORT_COLUMNS = ['id'] + InventoryItem('').get_item_property_classes()
+
+# Accepted spellings of boolean values, e.g. for is_checked_out
+_true_values = ['1', 'true', 'yes', 'y', 'x']
+_false_values = ['', '0', 'false', 'no', 'n']
+
+# Maximum number of invalid rows that are logged individually
+_max_logged_invalid_rows = 20
+
+# -------------------------------------------------------------------------
+#                             [IMPORT]
+# -------------------------------------------------------------------------
+
+
+def import_items(csv_path: Path,
+                 upsert: bool = False,
+                 dry_run: bool = False,
+                 host: str = database_host,
+                 port: int = database_port,
+                 batch_size: int = database_import_batch_size) -> dict:
+  """
+  Import inventory items from a csv file. Invalid rows are skipped and
+  reported, all valid rows are imported.
+
+  Args:
+  csv_path - csv file to import
+  upsert - If True rows with an ID create or replace the item with that ID
+  dry_run - If True only read and validate the file, nothing is written to
+            the database
+  host, port - Database server
+  batch_size - Number of rows written per statement and transaction
+
+  Returns
+  stats - Dictionary with the number of read, imported and invalid rows, the
+          ID ranges [(first_id, last_id), ...] of the created items, the
+          duration and the throughput in rows/s
+  """
+  client = None if dry_run else DataBaseClient(host=host, port=port)
+
+  stats = {"rows_read": 0,
+           "rows_invalid": 0,
+           "inserted": 0,
+           "upserted": 0,
+           "id_ranges": [],
+           "dry_run": dry_run}
+
+  time_start = time.monotonic()
+  with open(csv_path, 'r', newline='', encoding='utf-8-sig') as csv_file:
+    reader = csv.DictReader(csv_file)
+    _validate_header(reader.fieldnames)
+    if 'id' in reader.fieldnames and not upsert:
+      warning('Ignoring the id column, every row is added as new item. Use '
+              'upsert to create or replace items by ID.')
+
+    new_items = []
+    upsert_items = []
+    upsert_ids = []
+    for row in reader:
+      stats["rows_read"] += 1
+      try:
+        inventory_item, id = _parse_row(row, use_id=upsert)
+      except ValueError as e:
+        stats["rows_invalid"] += 1
+        if stats["rows_invalid"] <= _max_logged_invalid_rows:
+          error(f'Skipping invalid row in line {reader.line_num}: {e}')
+        continue
+
+      if id is None:
+        new_items.append(inventory_item)
+      else:
+        upsert_items.append(inventory_item)
+        upsert_ids.append(id)
+
+      if len(new_items) >= batch_size:
+        _write_new_items(client, new_items, stats)
+        new_items = []
+      if len(upsert_items) >= batch_size:
+        _write_upsert_items(client, upsert_items, upsert_ids, stats)
+        upsert_items = []
+        upsert_ids = []
+
+    _write_new_items(client, new_items, stats)
+    _write_upsert_items(client, upsert_items, upsert_ids, stats)
+
+  duration_s = time.monotonic() - time_start
+  num_imported = stats["inserted"] + stats["upserted"]
+  stats["duration_s"] = duration_s
+  stats["rows_per_s"] = num_imported / duration_s if duration_s > 0 else 0.0
+
+  if stats["rows_invalid"] > 0:
+    warning(f'[!] Skipped {stats["rows_invalid"]} invalid rows')
+  info(f'[x] {"Validated" if dry_run else "Imported"} {num_imported} items '
+       f'({stats["inserted"]} new, {stats["upserted"]} by ID) from '
+       f'{csv_path} in {duration_s:.2f} s ({stats["rows_per_s"]:.0f} rows/s)')
+  for (first_id, last_id) in stats["id_ranges"]:
+    info(f'[x] Created items with IDs {first_id} - {last_id}')
+
+  return stats
+
+
+def _validate_header(fieldnames: list):
+  """
+  Check the column names of the csv file. Raises ValueError if the file
+  cannot be imported.
+  """
+  if not fieldnames:
+    raise ValueError('The csv file is empty')
+  if 'item_name' not in fieldnames:
+    raise ValueError('The csv file has no item_name column')
+  unknown_columns = [column for column in fieldnames
+                     if column not in IMPORT_COLUMNS]
+  if unknown_columns:
+    raise ValueError(f'Unknown columns {unknown_columns}. Columns must be '
+                     f'out of {IMPORT_COLUMNS}')
+
+
+def _parse_row(row: dict, use_id: bool):
+  """
+  Validate a csv row and convert it to an InventoryItem. Raises ValueError if
+  the row is invalid.
+
+  Returns
+  inventory_item - InventoryItem holding the row data
+  id - ID of the item if use_id is True and the row has one, None otherwise
+  """
+  if None in row or None in row.values():
+    raise ValueError('Wrong number of fields')
+
+  item_name = row['item_name'].strip()
+  if not item_name:
+    raise ValueError('item_name is empty')
+
+  id = None
+  if use_id and row.get('id', '').strip():
+    try:
+      id = int(row['id'])
+    except ValueError:
+      raise ValueError(f'id {row["id"]} is not an integer')
+    if id <= 0:
+      raise ValueError(f'id {id} is not positive')
+
+  inventory_item = InventoryItem(item_name=item_name)
+  for (column, value) in row.items():
+    if column in ['id', 'item_name']:
+      continue
+    if column == 'is_checked_out':
+      inventory_item.is_checked_out = _parse_bool(value)
+    elif column in ['check_out_date', 'date_added']:
+      setattr(inventory_item, column, parse_item_datetime(value))
+    elif column == 'location_id':
+      try:
+        inventory_item.location_id = parse_item_location_id(value)
+      except ValueError:
+        raise ValueError(f'location_id {value} is not an integer')
+    elif column == 'item_image':
+      if value:
+        inventory_item.set_img_path(Path(value))
+    else:
+      setattr(inventory_item, column, value)
+
+  return inventory_item, id
+
+
+def _parse_bool(value: str) -> bool:
+  if value.strip().lower() in _true_values:
+    return True
+  if value.strip().lower() in _false_values:
+    return False
+  raise ValueError(f'{value} is not a boolean value')
+
+
+def _write_new_items(client: DataBaseClient, new_items: list, stats: dict):
+  if not new_items:
+    return
+  if client is not None:
+    for id in client.add_inventory_items(new_items):
+      # Extend the last range if the ID follows it
+      if stats["id_ranges"] and stats["id_ranges"][-1][1] + 1 == id:
+        stats["id_ranges"][-1] = (stats["id_ranges"][-1][0], id)
+      else:
+        stats["id_ranges"].append((id, id))
+  stats["inserted"] += len(new_items)
+
+
+def _write_upsert_items(client: DataBaseClient,
+                        upsert_items: list,
+                        upsert_ids: list,
+                        stats: dict):
+  if not upsert_items:
+    return
+  if client is not None:
+    client.upsert_inventory_items(upsert_items, upsert_ids)
+  stats["upserted"] += len(upsert_items)
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description='Import inventory items from a csv file')
+  parser.add_argument('input', type=Path, help='csv file to import')
+  parser.add_argument('--upsert', action='store_true',
+                      help='Create or replace items by their ID')
+  parser.add_argument('--dry-run', action='store_true',
+                      help='Only validate the file, do not write to the '
+                           'database')
+  parser.add_argument('--host', default=database_host,
+                      help='Database host')
+  parser.add_argument('--port', type=int, default=database_port,
+                      help='Database port')
+  parser.add_argument('--batch-size', type=int,
+                      default=database_import_batch_size,
+                      help='Number of rows written per transaction')
+  args = parser.parse_args()
+
+  import_items(csv_path=args.input,
+               upsert=args.upsert,
+               dry_run=args.dry_run,
+               host=args.host,
+               port=args.port,
+               batch_size=args.batch_size)
+
+
+if __name__ == '__main__':
+  logging.basicConfig(format='%(asctime)s [%(levelname)s] %(message)s',
+                      datefmt='%H:%M:%S',
+                      level=logging.INFO)
+  main()
@@ -0,0 +1,103 @@
+"""
+
+Service function to manage the storage locations of the inventory
+
+Locations form a tree, e.g. building -> room -> shelf -> bin. Items are
+linked to the location they are stored in:
+
+  python backend/services/manage_locations.py list
+  python backend/services/manage_locations.py add "Building A"
+  python backend/services/manage_locations.py add "Room 3" --parent 1
+  python backend/services/manage_locations.py move 7 --parent 4
+  python backend/services/manage_locations.py rename 7 "Shelf 2"
+  python backend/services/manage_locations.py delete 7
+
+Moving a location moves all locations and items within it.
+
+"""
+import argparse
+import logging
+import os
+import sys
+from logging import info
+
+# Get the repository directory and add it to the sys.path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(parent_dir)
+
+from backend.DataBaseClient import DataBaseClient
+
+# --- Config imports
+from backend.database_config import database_host, database_port
+
+
+def list_locations(client: DataBaseClient, location_id: int = None):
+  """
+  Log the locations with their number of items
+  """
+  locations = client.get_location_item_counts(location_id)
+  for location in locations:
+    info(f'{location["id"]:>6}  {location["full_name"]}  '
+         f'({location["num_items"]} items, '
+         f'{location["num_items_subtree"]} including sub locations)')
+  info(f'[x] {len(locations)} locations')
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description='Manage the storage locations of the inventory')
+  parser.add_argument('--host', default=database_host,
+                      help='Database host')
+  parser.add_argument('--port', type=int, default=database_port,
+                      help='Database port')
+  commands = parser.add_subparsers(dest='command', required=True)
+
+  list_parser = commands.add_parser('list', help='List the locations')
+  list_parser.add_argument('--within', type=int, default=None,
+                           help='Only list the locations within this '
+                                'location')
+
+  add_parser = commands.add_parser('add', help='Add a location')
+  add_parser.add_argument('name', help='Name of the location')
+  add_parser.add_argument('--parent', type=int, default=None,
+                          help='ID of the location it is in')
+
+  move_parser = commands.add_parser('move', help='Move a location')
+  move_parser.add_argument('location_id', type=int,
+                           help='ID of the location to move')
+  move_parser.add_argument('--parent', type=int, default=None,
+                           help='ID of the new parent location, top level if '
+                                'not set')
+
+  rename_parser = commands.add_parser('rename', help='Rename a location')
+  rename_parser.add_argument('location_id', type=int,
+                             help='ID of the location to rename')
+  rename_parser.add_argument('name', help='New name of the location')
+
+  delete_parser = commands.add_parser('delete', help='Delete a location')
+  delete_parser.add_argument('location_id', type=int,
+                             help='ID of the location to delete')
+  args = parser.parse_args()
+
+  client = DataBaseClient(host=args.host, port=args.port)
+  if args.command == 'list':
+    list_locations(client, args.within)
+  elif args.command == 'add':
+    location_id = client.add_location(args.name, args.parent)
+    info(f'[x] Added location {args.name} with ID {location_id}')
+  elif args.command == 'move':
+    client.move_location(args.location_id, args.parent)
+    info(f'[x] Moved location {args.location_id}')
+  elif args.command == 'rename':
+    client.rename_location(args.location_id, args.name)
+    info(f'[x] Renamed location {args.location_id} to {args.name}')
+  elif args.command == 'delete':
+    client.delete_location(args.location_id)
+    info(f'[x] Deleted location {args.location_id}')
+
+
+if __name__ == '__main__':
+  logging.basicConfig(format='%(asctime)s [%(levelname)s] %(message)s',
+                      datefmt='%H:%M:%S',
+                      level=logging.INFO)
+  main()
@@ -0,0 +1,46 @@
+"""
+
+SQL statement templates for the model classes (InventoryItem, InventoryUser)
+
+The templates are built once per model class from its column schema and
+reused for every statement. As the SQL text of a template never changes,
+the database client can keep it as a server side prepared statement on each
+pooled connection.
+
+"""
+
+
+def build_sql_templates(table_name: str, columns: tuple,
+                        key_column: str) -> dict:
+  """
+  Build the statement templates for a table
+
+  Args:
+  table_name - Name of the table
+  columns - Columns written by the statements, in value order
+  key_column - Column that identifies a row in UPDATE statements
+
+  Returns
+  templates - Dictionary with the templates:
+    insert - INSERT of one row, one ? per column
+    insert_row - Value clause of one row to build multi-row INSERTs
+    update - UPDATE of all columns of the row identified by key_column, one
+             ? per column followed by one ? for the key
+    upsert - INSERT of one row including its id, one ? for the id followed
+             by one ? per column. Updates all columns if the id exists.
+  """
+  column_clause = ', '.join(columns)
+  value_clause = f"( {', '.join(['?' for _ in columns])} )"
+
+  return {
+      "insert": (f"INSERT INTO {table_name} ( {column_clause} ) "
+                 f"VALUES {value_clause}"),
+      "insert_row": value_clause,
+      "update": (f"UPDATE {table_name} SET "
+                 f"{', '.join([f'{column} = ?' for column in columns])} "
+                 f"WHERE {key_column} = ?"),
+      "upsert": (f"INSERT INTO {table_name} ( id, {column_clause} ) "
+                 f"VALUES ( {', '.join(['?' for _ in range(len(columns) + 1)])} ) "
+                 f"ON DUPLICATE KEY UPDATE "
+                 f"{', '.join([f'{column} = VALUES({column})' for column in columns])}"),
+  }
@@ -7,12 +7,22 @@ Utility functions used on the backend side
 from pyzbar.pyzbar import decode
 import cv2 as cv
 import numpy as np
+import threading
+import time
+from collections import deque
 
-from logging import warning
+from logging import warning, info
 from .qr_config import (qr_iden_str,
                         qr_id_iden_str,
                         qr_msg_delimiter,
                         decode_id_from_qr_message)
+from .camera_config import (qr_detector_cascade,
+                            qr_detector_min_interval_s,
+                            qr_qrdet_model_size,
+                            qr_qrdet_conf_th,
+                            qr_detection_downscale,
+                            qr_detection_roi_margin,
+                            qr_detection_roi_max_misses)
 
 # ------------------------------------------------------------------------
 #                 [IMAGE PROCESSING FUNCTIONS]
@@ -21,35 +31,469 @@ from .qr_config import (qr_iden_str,
 enableQrText = False
 
 
-def detect_and_decode_qr_marker(frame):
+def decode_qr_markers(frame) -> list:
   """
-  Detect and decode one or several QR code messages within a given image.
-
-  This functions uses pyzbar for detection and decoding
-
+  Detect and decode the QR markers within a given image without drawing on
+  it. This functions uses pyzbar for detection and decoding.
 
+  Returns
+  markers - List of (decoded_text, polygon) per marker, polygon is the list
+            of its corner points (x, y)
   """
-  # ---------------------------------------------------------------------
-  # ----- Decode QR message with Pyzbar
-  # ---------------------------------------------------------------------
-  # Initialize flag to track if a marker has been found
-  qr_marker_found = False
-  # Initialize counter to track the number of markers detected in the image
-  num_markers = 0
-  # Initialize a list to store all decoded messages
-  decoded_list = []
+  return [(str(d.data.decode()), [tuple(point) for point in d.polygon])
+          for d in decode(frame)]
 
-  for d in decode(frame):
-    qr_marker_found = True
-    num_markers += 1
-    decoded_text = str(d.data.decode())
-    decoded_list.append(decoded_text)
 
+def draw_qr_markers(frame, markers: list):
+  """
+  Draw the perimeter (and text) of the given markers as returned by
+  decode_qr_markers() into the image
+  """
+  for (decoded_text, polygon) in markers:
     # Draw perimeter of the marker
-    frame = cv.polylines(frame, [np.array(d.polygon)], True, (0, 255, 0), 2)
+    frame = cv.polylines(frame, [np.array(polygon)], True, (0, 255, 0), 2)
     # Draw marker text
     if enableQrText:
-      frame = cv.putText(frame, decoded_text, (d.rect.left, d.rect.top + d.rect.height),
+      points = np.array(polygon)
+      frame = cv.putText(frame, decoded_text,
+                         (int(points[:, 0].min()), int(points[:, 1].max())),
                          cv.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 1, cv.LINE_AA)
+  return frame
+
+
+def detect_and_decode_qr_marker(frame):
+  """
+  Detect and decode one or several QR code messages within a given image.
+
+  This functions uses the configured cascade of QR detector backends, see
+  qr_detector_cascade in camera_config
+
+
+  """
+  markers = get_qr_detector_cascade().decode(frame)
+  decoded_list = [decoded_text for (decoded_text, _) in markers]
+  frame = draw_qr_markers(frame, markers)
+
+  return frame, len(markers) > 0, len(markers), decoded_list
+
+
+class FastQrDetector():
+  """
+  Faster QR detection for a stream of frames, e.g. of the camera:
+    * The frame is converted to grayscale once
+    * A downscaled frame is decoded first, the full resolution only if no
+      marker was found
+    * Once markers were found, the region of interest around them is
+      decoded first in the following frames
+
+  Markers outside of a tracked region of interest are found once it is lost,
+  after qr_detection_roi_max_misses frames without a marker in it. In
+  multi-marker mode, e.g. to scan all labels of a tray, only the full
+  resolution frame is decoded, as the other passes stop at the first
+  markers found.
+
+  decode() returns the markers in the same format as decode_qr_markers().
+  Thread safe, frames might be decoded by several threads.
+  """
+  name = 'pyzbar_fast'
+
+  def __init__(self,
+               downscale: float = qr_detection_downscale,
+               roi_margin: float = qr_detection_roi_margin,
+               roi_max_misses: int = qr_detection_roi_max_misses):
+    self.downscale = downscale
+    self.roi_margin = roi_margin
+    self.roi_max_misses = roi_max_misses
+    self.is_multi_marker_mode = False
+
+    # Tracked region of interest (x0, y0, x1, y1) in full resolution
+    # coordinates, None if not tracking
+    self._roi = None
+    self._roi_misses = 0
+    self._lock = threading.Lock()
+
+    # Statistics, number of frames decoded by each pass
+    self.num_roi_hits = 0
+    self.num_downscaled_hits = 0
+    self.num_full_hits = 0
+    self.num_misses = 0
+
+  def decode(self, frame) -> list:
+    """
+    Detect and decode the QR markers within the frame without drawing on it
+
+    Returns
+    markers - List of (decoded_text, polygon) per marker, polygon is the list
+              of its corner points (x, y) in the frame
+    """
+    if frame.ndim == 3:
+      frame = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
+
+    if self.is_multi_marker_mode:
+      return decode_qr_markers(frame)
+
+    with self._lock:
+      roi = self._roi
+
+    # --- Region of interest around the last markers
+    if roi is not None:
+      (x0, y0, x1, y1) = roi
+      markers = _offset_markers(decode_qr_markers(frame[y0:y1, x0:x1]),
+                                x0, y0)
+      if markers:
+        with self._lock:
+          self.num_roi_hits += 1
+        self._track(markers, frame.shape)
+        return markers
+      with self._lock:
+        self._roi_misses += 1
+        if self._roi_misses >= self.roi_max_misses:
+          self._roi = None
+
+    # --- Downscaled frame
+    if 0 < self.downscale < 1:
+      small_frame = cv.resize(frame, None,
+                              fx=self.downscale, fy=self.downscale,
+                              interpolation=cv.INTER_AREA)
+      markers = _scale_markers(decode_qr_markers(small_frame),
+                               1 / self.downscale)
+      if markers:
+        with self._lock:
+          self.num_downscaled_hits += 1
+        self._track(markers, frame.shape)
+        return markers
+
+    # --- Full resolution
+    markers = decode_qr_markers(frame)
+    with self._lock:
+      if markers:
+        self.num_full_hits += 1
+      else:
+        self.num_misses += 1
+    if markers:
+      self._track(markers, frame.shape)
+    return markers
+
+  def set_multi_marker_mode(self, enabled: bool):
+    """
+    Enable/Disable the multi-marker mode, see class description
+    """
+    with self._lock:
+      self.is_multi_marker_mode = enabled
+      self._roi = None
+
+  def get_stats(self) -> dict:
+    """
+    Return the number of frames the markers were found in by each pass
+    """
+    with self._lock:
+      return {"roi_hits": self.num_roi_hits,
+              "downscaled_hits": self.num_downscaled_hits,
+              "full_hits": self.num_full_hits,
+              "misses": self.num_misses}
+
+  def _track(self, markers: list, frame_shape: tuple):
+    """
+    Track the region around the bounding box of the markers
+    """
+    points = np.array([point
+                       for (_, polygon) in markers
+                       for point in polygon])
+    (x0, y0) = points.min(axis=0)
+    (x1, y1) = points.max(axis=0)
+    margin_x = int((x1 - x0) * self.roi_margin)
+    margin_y = int((y1 - y0) * self.roi_margin)
+    (height, width) = frame_shape[:2]
+    with self._lock:
+      self._roi = (max(0, int(x0) - margin_x),
+                   max(0, int(y0) - margin_y),
+                   min(width, int(x1) + margin_x + 1),
+                   min(height, int(y1) + margin_y + 1))
+      self._roi_misses = 0
+
+
+def _offset_markers(markers: list, x0: int, y0: int) -> list:
+  return [(decoded_text, [(x + x0, y + y0) for (x, y) in polygon])
+          for (decoded_text, polygon) in markers]
+
+
+def _scale_markers(markers: list, scale: float) -> list:
+  return [(decoded_text, [(int(round(x * scale)), int(round(y * scale)))
+                          for (x, y) in polygon])
+          for (decoded_text, polygon) in markers]
+
+
+# ------------------------------------------------------------------------
+#                 [QR DETECTORS]
+# ------------------------------------------------------------------------
+# All QR detector backends have a name and a decode(frame) function that
+# returns the markers in the same format as decode_qr_markers(). They are
+# combined to a QrDetectorCascade.
+
+
+class PyzbarQrDetector():
+  """
+  pyzbar on the full resolution frame
+  """
+  name = 'pyzbar'
+
+  def decode(self, frame) -> list:
+    return decode_qr_markers(frame)
+
+
+class OpenCvQrDetector():
+  """
+  OpenCV QRCodeDetector. Copes better with angled labels than pyzbar.
+  """
+  name = 'opencv'
+
+  def __init__(self):
+    # QRCodeDetector instances must not be shared between threads
+    self._local = threading.local()
+
+  def decode(self, frame) -> list:
+    detector = getattr(self._local, 'detector', None)
+    if detector is None:
+      detector = cv.QRCodeDetector()
+      self._local.detector = detector
+
+    (is_found, decoded_texts, points, _) = detector.detectAndDecodeMulti(frame)
+    if not is_found:
+      return []
+    # Markers that were found but could not be decoded have an empty text
+    return [(decoded_text,
+             [(int(round(x)), int(round(y))) for (x, y) in polygon])
+            for (decoded_text, polygon) in zip(decoded_texts, points)
+            if decoded_text]
+
+
+class QrdetQrDetector():
+  """
+  qrdet (YOLO) localizes the QR markers, the regions around them are decoded
+  with pyzbar and OpenCV. Finds small and blurry labels the other backends
+  miss, but takes far longer per frame.
+
+  qrdet is imported and its model loaded on first use. If qrdet is not
+  installed the detector finds nothing.
+  """
+  name = 'qrdet'
+
+  # Margin around the localized markers, as a fraction of their size
+  crop_margin = 0.2
+
+  def __init__(self,
+               model_size: str = qr_qrdet_model_size,
+               conf_th: float = qr_qrdet_conf_th):
+    self.model_size = model_size
+    self.conf_th = conf_th
+    self._detector = None
+    self._is_available = True
+    self._lock = threading.Lock()
+    self._opencv_detector = OpenCvQrDetector()
+
+  def decode(self, frame) -> list:
+    detector = self._get_detector()
+    if detector is None:
+      return []
+
+    # The model is not thread safe
+    with self._lock:
+      detections = detector.detect(image=frame, is_bgr=True)
+
+    (height, width) = frame.shape[:2]
+    markers = []
+    for detection in detections:
+      (x0, y0, x1, y1) = detection['bbox_xyxy']
+      margin_x = (x1 - x0) * self.crop_margin
+      margin_y = (y1 - y0) * self.crop_margin
+      x0 = max(0, int(x0 - margin_x))
+      y0 = max(0, int(y0 - margin_y))
+      x1 = min(width, int(x1 + margin_x) + 1)
+      y1 = min(height, int(y1 + margin_y) + 1)
+      crop = frame[y0:y1, x0:x1]
+
+      crop_markers = decode_qr_markers(crop)
+      if not crop_markers:
+        crop_markers = self._opencv_detector.decode(crop)
+      markers += _offset_markers(crop_markers, x0, y0)
+    return markers
+
+  def _get_detector(self):
+    with self._lock:
+      if self._detector is None and self._is_available:
+        try:
+          from qrdet import QRDetector
+        except ImportError:
+          warning('[!] qrdet is not installed, the qrdet QR detector is '
+                  'disabled')
+          self._is_available = False
+          return None
+        info(f'[x] Loading qrdet model ({self.model_size})')
+        try:
+          self._detector = QRDetector(model_size=self.model_size,
+                                      conf_th=self.conf_th)
+        except Exception as e:
+          warning(f'[!] Loading the qrdet model failed, the qrdet QR detector '
+                  f'is disabled: {e}')
+          self._is_available = False
+      return self._detector
+
+
+# Name -> class of all QR detector backends
+QR_DETECTORS = {detector_class.name: detector_class
+                for detector_class in [PyzbarQrDetector,
+                                       FastQrDetector,
+                                       OpenCvQrDetector,
+                                       QrdetQrDetector]}
+
+
+class QrDetectorCascade():
+  """
+  Try the QR detector backends in the given order until one finds a marker.
+  The expensive backends only run if the cheap ones in front of them fail.
+  Backends with a minimum interval are skipped until it passed since their
+  last run.
+
+  Keeps statistics per backend: runs, frames with markers found, skipped
+  runs and the mean decoding time.
+  """
+
+  def __init__(self,
+               detector_names: list = qr_detector_cascade,
+               min_interval_s: dict = qr_detector_min_interval_s):
+    unknown_names = [name for name in detector_names
+                     if name not in QR_DETECTORS]
+    if unknown_names:
+      raise ValueError(f'Unknown QR detectors {unknown_names}. Detectors must '
+                       f'be out of {list(QR_DETECTORS)}')
+    self.detectors = [QR_DETECTORS[name]() for name in detector_names]
+    self.min_interval_s = min_interval_s
+
+    self._lock = threading.Lock()
+    # Name -> time of the last run
+    self._last_run = {}
+    # Name -> statistics
+    self._stats = {detector.name: {"runs": 0,
+                                   "hits": 0,
+                                   "skipped": 0,
+                                   "total_s": 0.0}
+                   for detector in self.detectors}
+
+  def decode(self, frame) -> list:
+    """
+    Detect and decode the QR markers within the frame without drawing on it
+    with the first backend that finds any
+    """
+    for detector in self.detectors:
+      if not self._start_run(detector.name):
+        continue
+      time_start = time.perf_counter()
+      markers = detector.decode(frame)
+      duration_s = time.perf_counter() - time_start
+
+      with self._lock:
+        stats = self._stats[detector.name]
+        stats["total_s"] += duration_s
+        if markers:
+          stats["hits"] += 1
+      if markers:
+        return markers
+    return []
+
+  def set_multi_marker_mode(self, enabled: bool):
+    """
+    Enable/Disable the multi-marker mode of the backends that support it,
+    so they find all markers of a frame rather than the first ones
+    """
+    for detector in self.detectors:
+      if hasattr(detector, 'set_multi_marker_mode'):
+        detector.set_multi_marker_mode(enabled)
+
+  def get_stats(self) -> dict:
+    """
+    Return the statistics per backend (runs, hits, skipped, hit rate and
+    mean decoding time per run)
+    """
+    with self._lock:
+      return {name: {"runs": stats["runs"],
+                     "hits": stats["hits"],
+                     "skipped": stats["skipped"],
+                     "hit_rate": (stats["hits"] / stats["runs"]
+                                  if stats["runs"] else 0.0),
+                     "mean_decode_s": (stats["total_s"] / stats["runs"]
+                                       if stats["runs"] else 0.0)}
+              for (name, stats) in self._stats.items()}
+
+  def _start_run(self, name: str) -> bool:
+    """
+    Check the minimum interval of the backend and register its run
+    """
+    time_now = time.monotonic()
+    with self._lock:
+      min_interval_s = self.min_interval_s.get(name, 0.0)
+      time_last_run = self._last_run.get(name)
+      if (time_last_run is not None and
+              time_now - time_last_run < min_interval_s):
+        self._stats[name]["skipped"] += 1
+        return False
+      self._last_run[name] = time_now
+      self._stats[name]["runs"] += 1
+      return True
+
+
+_qr_detector_cascade = None
+_qr_detector_cascade_lock = threading.Lock()
+
+
+def get_qr_detector_cascade() -> QrDetectorCascade:
+  """
+  Return the process wide cascade of the configured QR detector backends.
+  It is created on first use.
+  """
+  global _qr_detector_cascade
+  with _qr_detector_cascade_lock:
+    if _qr_detector_cascade is None:
+      _qr_detector_cascade = QrDetectorCascade()
+    return _qr_detector_cascade
+
+
+# ------------------------------------------------------------------------
+#                 [METRICS]
+# ------------------------------------------------------------------------
+class RateMeter():
+  """
+  Measure the rate of events, e.g. frames per second, over a sliding time
+  window. Thread safe.
+  """
+
+  def __init__(self, window_s: float = 5.0):
+    self.window_s = window_s
+    self._times = deque()
+    self._lock = threading.Lock()
+
+  def tick(self):
+    """
+    Register one event
+    """
+    time_now = time.monotonic()
+    with self._lock:
+      self._times.append(time_now)
+      self._drop_old(time_now)
+
+  def get_rate(self) -> float:
+    """
+    Return the rate of events [1/s] within the window
+    """
+    time_now = time.monotonic()
+    with self._lock:
+      self._drop_old(time_now)
+      if len(self._times) < 2:
+        return 0.0
+      # Measure over the time covered by the events, the window is not
+      # filled yet while starting
+      duration_s = time_now - self._times[0]
+      return (len(self._times) - 1) / duration_s if duration_s > 0 else 0.0
 
-  return frame, qr_marker_found, num_markers, decoded_list
+  def _drop_old(self, time_now: float):
+    while self._times and time_now - self._times[0] > self.window_s:
+      self._times.popleft()
@@ -0,0 +1,49 @@
+"""
+
+Helper to coalesce bursts of UI events into a single asynchronous action
+
+"""
+import asyncio
+from logging import debug
+
+
+class DebouncedTask():
+  """
+  Wrap a coroutine function so that calling it only schedules it:
+   * The coroutine is started once no further call arrived for delay_s
+   * A new call cancels the previous call, whether it is still waiting or
+     already running. Only the latest call can therefore apply its result.
+
+  Must be called from within the running event loop.
+  """
+
+  def __init__(self, coroutine_function, delay_s: float):
+    self.coroutine_function = coroutine_function
+    self.delay_s = delay_s
+    self._task = None
+
+    # Statistics
+    self.num_calls = 0
+    self.num_runs = 0
+    self.num_cancelled = 0
+
+  def __call__(self, *args, **kwargs):
+    self.num_calls += 1
+    self.cancel()
+    self._task = asyncio.ensure_future(self._run(*args, **kwargs))
+    return self._task
+
+  def cancel(self):
+    """
+    Cancel the pending or running call, if any
+    """
+    if self._task is not None and not self._task.done():
+      self._task.cancel()
+      self.num_cancelled += 1
+
+  async def _run(self, *args, **kwargs):
+    await asyncio.sleep(self.delay_s)
+    self.num_runs += 1
+    debug(f'Run {self.coroutine_function.__name__} (calls {self.num_calls}, '
+          f'runs {self.num_runs}, cancelled {self.num_cancelled})')
+    await self.coroutine_function(*args, **kwargs)
@@ -10,13 +10,14 @@ from trame.widgets.vuetify import (VListItemContent, VListItemIcon)
 from trame.widgets import vuetify2
 from trame.ui.vuetify import SinglePageWithDrawerLayout
 from trame.ui.router import RouterViewLayout
-from io import StringIO
+from aiohttp import web
 from multiprocessing import Process, Manager, Pipe, Value
 import time
 import asyncio
 import cv2 as cv
 import base64
 import hashlib
+import secrets
 from pathlib import Path
 from logging import info, error, warning, debug
 import logging
@@ -39,9 +40,11 @@ from backend import (CameraServer,
                      UserPrivileges,
                      database_host,
                      InventoryItem,
-                     DataBaseClient)
+                     DataBaseClient,
+                     get_change_notification_bus)
 
 # ---- Frontend imports
+from frontend.DebouncedTask import DebouncedTask
 from frontend.frontend_config import (inventory_page_title,
                                       inventory_main_window_title,
                                       main_table_header_options,
@@ -54,7 +57,13 @@ from frontend.frontend_config import (inventory_page_title,
                                       enable_login,
                                       enable_debug_run,
                                       disable_main_table_col_filter,
-                                      main_table_drop_cols)
+                                      main_table_drop_cols,
+                                      main_table_column_titles,
+                                      main_table_items_per_page,
+                                      main_table_items_per_page_options,
+                                      search_debounce_delay_s,
+                                      tag_filter_max_tags,
+                                      inventory_export_route)
 
 
 class FrontendApplication:
@@ -87,6 +96,7 @@ class FrontendApplication:
     self.state.item_manufacturer_details = ""
     self.state.is_checked_out = 0
     self.state.item_location = ""
+    self.state.item_location_id = None
     self.state.check_out_date = ""
     self.state.check_out_poc = ""
     self.state.date_added = ""
@@ -138,6 +148,15 @@ class FrontendApplication:
     # If true show the camera feed in the FIND_ITEM section
     self.state.show_find_item_camera_feed = True
     self.state.show_find_item_static_image = False
+    # If true a batch scan runs and the camera feed is shown in the
+    # BATCH_SCAN section
+    self.state.show_batch_scan_camera_feed = False
+
+    # Items collected by the batch scan and the operation applied to them
+    self.state.batch_scan_rows = []
+    self.state.batch_scan_action = 'check_out'
+    self.state.batch_scan_location_id = None
+    self.state.batch_scan_summary = ''
 
     # Flag, True if the user is logged-in, False otheriwse
     self.state.logged_in = False
@@ -172,91 +191,171 @@ class FrontendApplication:
 
     self.state.find_item_qr_tooltip_text = "Close Camera"
 
-    self.state.time_str = ''
-
-    # This is to save the inventory as complete set and as a filtered set
-    # in string format. This is used by export function allowing to download
-    # the inventory as a whole or as a filtered subset in csv format.
-    self.state.inventory_csv_string = ''
-    self.state.inventory_filtered_csv_string = ''
+    self.state.batch_scan_tooltip_text = "Start Batch Scan"
+
+    # The inventory is exported in csv format as a whole or as the subset
+    # matching the search query. The csv is only generated on download and
+    # streamed from the database by the export endpoint. Downloads require
+    # the export token that is issued to users with export privilege when
+    # they log in.
+    self.export_token = None
+    self.state.export_token = ''
+    self.state.inventory_export_route = inventory_export_route.lstrip('/')
+    self.ctrl.add("on_server_bind")(self.bind_export_route)
+
+    # Database client shared by all callbacks. Its connections are taken from
+    # the process wide connection pool on demand.
+    self.db_client = DataBaseClient(host=database_host)
     # -----------------------------------------------------------------------
     # -- TRAME WINDOW SETUP
     # -----------------------------------------------------------------------
     self.state.trame__title = inventory_main_window_title
     self.state.menu_items = ["add item", "checkout item", "return item"]
     # -----------------------------------------------------------------------
-    # -- PULL INVENTORY DATA
+    # -- CHANGE FEED
     # -----------------------------------------------------------------------
-    self.update_inventory_df()
+    # The table view is kept up to date with the change feed of the
+    # inventory. table_version is the version of the change feed the loaded
+    # table rows are up to date with.
+    self.table_version = 0
+    self.db_client.prune_inventory_changes()
 
     # -----------------------------------------------------------------------
     # -- TABLE FUNCTIONS
     # -----------------------------------------------------------------------
 
-    def filter_inventory_df(query, inventory_df):
+    def load_table_data(query: str, filters: dict, options: dict) -> dict:
       """
-      Filters a DataFrame to return rows that contain the given string in any
-      column.
-
-      Parameters:
-      query (str): The string to search for.
-      inventory_df (pd.DataFrame): The DataFrame to filter.
+      Load the table data for a search query, the table filters (tag,
+      location) and the table options (page, page size, sorting) from the
+      database. Paging, sorting and filtering are done by the database, so
+      only the visible rows are loaded.
 
-      Returns:
-      filtered_df (pd.DataFrame): A DataFrame with rows and columns removed.
-      filtered_full_df (pd.DataFrame): A DataFrame with rows removed, but
-                                       containing all columns of the DB.
+      This function does not access the state, so it can run in a worker
+      thread. Returns the table data to apply with apply_table_data().
       """
-      if not isinstance(inventory_df, pd.DataFrame):
-        raise ValueError("[!] inventory_df must be a pandas DataFrame.")
-
-      # Filter rows where any column contains the search string
-      filtered_full_df = inventory_df[inventory_df.apply(lambda row: row.astype(
-          str).str.contains(query, case=False, na=False).any(), axis=1)]
+      # Taken before the rows are read, so changes made while reading are
+      # applied by the next apply_table_changes()
+      table_version = self.db_client.get_change_version()
+
+      items_per_page = int(options.get('itemsPerPage',
+                                       main_table_items_per_page))
+      # Do not allow "All" (-1) as this would load the complete inventory
+      if items_per_page <= 0:
+        items_per_page = max(main_table_items_per_page_options)
+
+      rows, total_items = self.db_client.get_inventory_page(
+          page=options.get('page', 1),
+          items_per_page=items_per_page,
+          sort_by=options.get('sortBy', []),
+          sort_desc=options.get('sortDesc', []),
+          query=query,
+          tag=filters.get('tag') or '',
+          location_id=filters.get('location_id'))
+
+      return {"rows": rows,
+              "total_items": total_items,
+              "table_version": table_version}
+
+    def apply_table_data(table_data: dict):
+      """
+      Apply table data loaded by load_table_data() to the state
+      """
+      self.table_version = table_data["table_version"]
+      self.state.update({"rows": table_data["rows"],
+                         "total_items": table_data["total_items"]})
 
-      if not disable_main_table_col_filter:
-        # Filter columns to not show in this overview
-        filtered_df = filtered_full_df.drop(columns=main_table_drop_cols)
-        # Rename columns for a more user friendly table view
-        filtered_df = filtered_df.rename(columns={'item_name': 'Item',
-                                                  'manufacturer': 'Manufacturer',
-                                                  'is_checked_out': 'Checked-Out',
-                                                  'check_out_date': 'Checkout Date',
-                                                  'check_out_poc': 'Checked-Out By',
-                                                  'item_tags': 'Tags',
-                                                  'item_location': 'Location'})
-      return filtered_df, filtered_full_df
+    def get_table_filters() -> dict:
+      """
+      Return the filters of the main table set by the user
+      """
+      return {"tag": self.state.tag_filter,
+              "location_id": self.state.location_filter}
 
     def update_table():
       """
       Update the table view
       """
-      # Store a full copy of the inventory in the state
-      # TODO: Find a smarter way to do this
-      db_client = DataBaseClient(database_host)
-
-      # Convert DataFrame to CSV format as string
-      csv_buffer = StringIO()
-      self.inventory_df = db_client.get_inventory_as_df()
-      self.inventory_df.to_csv(csv_buffer, index=False)
-      self.state.inventory_csv_string = csv_buffer.getvalue()
-
-      time_now = datetime.now()
-      self.state.time_str = time_now.strftime("%d_%m_%Y__%H_%M_%S")
-
-      (filtered_df,
-       filtered_full_df) = filter_inventory_df(self.state.query,
-                                               db_client.get_inventory_as_df())
-      (self.state.headers,
-       self.state.rows) = vuetify.dataframe_to_grid(filtered_df,
-                                                    main_table_header_options)
-
-      # Convert DataFrame to CSV format as string
-      csv_buffer_filtered = StringIO()
-      filtered_full_df.to_csv(csv_buffer_filtered, index=False)
-      self.state.inventory_filtered_csv_string = csv_buffer_filtered.getvalue()
+      # A pending search update would apply older data on top of this one
+      update_table_debounced.cancel()
+      apply_table_data(load_table_data(self.state.query,
+                                       get_table_filters(),
+                                       self.state.table_options))
+
+    def apply_table_changes():
+      """
+      Bring the table view up to date with the changes of the inventory
+      since it was loaded. Only the changed items are read from the database.
+      Changed rows of the current page are replaced in place. If the changes
+      can change which items are on the page (items were added or deleted,
+      or changed items while the table is searched, filtered or sorted) the
+      page is reloaded instead.
+      """
+      changes = self.db_client.get_changes_since(self.table_version)
+      if (changes["reload"] or changes["has_more"] or
+              changes["inserted_ids"] or changes["deleted_ids"]):
+        update_table()
+        return
+      self.table_version = changes["version"]
+      if not changes["rows"]:
+        return
+
+      is_filtered = bool(self.state.query or
+                         any(get_table_filters().values()) or
+                         self.state.table_options.get('sortBy'))
+      if is_filtered:
+        update_table()
+        return
+
+      changed_rows = {row["id"]: row for row in changes["rows"]}
+      if any(row["id"] in changed_rows for row in self.state.rows):
+        self.state.rows = [changed_rows.get(row["id"], row)
+                           for row in self.state.rows]
+
+    self.update_table = update_table
+    self.apply_table_changes = apply_table_changes
+
+    async def update_table_async(query: str, filters: dict, options: dict):
+      """
+      Update the table view without blocking the event loop. The database
+      queries run in a worker thread. If a newer update cancels this one
+      while the queries are running, their result is dropped.
+      """
+      table_data = await asyncio.to_thread(load_table_data, query, filters,
+                                           options)
+      with self.state:
+        apply_table_data(table_data)
+
+    # Search-as-you-type: Coalesce bursts of query changes into one table
+    # update for the latest query
+    update_table_debounced = DebouncedTask(update_table_async,
+                                           search_debounce_delay_s)
+
+    def on_table_options_change(options):
+      """
+      Callback function that is called every time the user changes the page,
+      the page size or the sorting of the main table
+      """
+      # The table also reports options it got from the server -> skip those
+      if options == self.state.table_options:
+        return
+      self.state.table_options = options
+      update_table()
 
     self.state.query = ""
+    # Tag the main table is filtered by, None to show all items
+    self.state.tag_filter = None
+    self.state.tag_filter_items = []
+    self.update_tag_filter_items()
+    # Location the main table is filtered by, including all locations within
+    # it. None to show all items.
+    self.state.location_filter = None
+    self.state.location_items = []
+    self.update_location_items()
+    self.state.table_options = {"page": 1,
+                                "itemsPerPage": main_table_items_per_page,
+                                "sortBy": [],
+                                "sortDesc": []}
     update_table()
 
     def delete_inventory_item(*args):
@@ -265,16 +364,15 @@ class FrontendApplication:
       """
       # Only delete item if one is selected
       if self.state.item_id is not None:
-          # Create a DatabaseClient instance and connect to the inventory database
-        db_client = DataBaseClient(host=database_host)
         # Command: DELETE item from inventory
-        db_client.delete_inventory_item(int(self.state.item_id))
+        self.db_client.delete_inventory_item(int(self.state.item_id))
 
-        # Update the dataframe so the table reflects the updated DB state
-        self.update_inventory_df()
+        # Reset alert visibility
+        self.hide_all_alerts()
+        self.update_tag_filter_items()
 
-        # Update the table view
-        update_table()
+        # Update the changed rows of the table view
+        apply_table_changes()
         self.display_item_success('Item deleted successfully')
 
     def update_inventory_item(*args):
@@ -285,26 +383,27 @@ class FrontendApplication:
 
       if valid_data:
 
-        # Create a DatabaseClient instance and connect to the inventory database
-        db_client = DataBaseClient(host=database_host)
         info(f'[x] Update inventory item: {
              inventoryItem.item_name} - image path {inventoryItem.item_image}')
 
-        # Update the item in the database
-        db_client.update_inventory_item(inventory_item=inventoryItem,
-                                        id=self.state.item_id)
+        # Update the item and its image path in one transaction
+        with self.db_client.transaction():
+          # Update the item in the database
+          self.db_client.update_inventory_item(inventory_item=inventoryItem,
+                                               id=self.state.item_id)
 
-        # TODO: This currently needs to be called after
-        #       db_client.update_inventory_item because the image file path
-        #       is not properly set by read_item_user_input_to_object()
-        # Update item image
-        self.update_item_image_last_captured_image()
+          # TODO: This currently needs to be called after
+          #       db_client.update_inventory_item because the image file path
+          #       is not properly set by read_item_user_input_to_object()
+          # Update item image
+          self.update_item_image_last_captured_image()
 
-        # Update the dataframe so the table reflects the updated DB state
-        self.update_inventory_df()
+        # Reset alert visibility
+        self.hide_all_alerts()
+        self.update_tag_filter_items()
 
-        # Update the table view
-        update_table()
+        # Update the changed rows of the table view
+        apply_table_changes()
         self.display_item_success('Item updated successfully')
       else:
         error('Adding Inventory item failed. Invalid user inputs')
@@ -338,11 +437,8 @@ class FrontendApplication:
           # Update image path in InventoryItem instance
           inventoryItem.set_img_path(img_path)
 
-        # Create a temporary DatabaseClient instance and connect to the
-        # inventory database
-        db_client = DataBaseClient(host=database_host)
         # Add item to database
-        temp_id = db_client.add_inventory_item(inventoryItem)
+        temp_id = self.db_client.add_inventory_item(inventoryItem)
 
         if temp_id == -1:
           # Fetching ID failed -> don't update state variable
@@ -351,8 +447,9 @@ class FrontendApplication:
           # Update ID in state
           self.state.item_id = temp_id
 
-        # Update the dataframe so the table reflects the updated DB state
-        self.update_inventory_df()
+        # Reset alert visibility
+        self.hide_all_alerts()
+        self.update_tag_filter_items()
 
         # Print QR code label
         if not self.print_label_from_id():
@@ -361,7 +458,7 @@ class FrontendApplication:
         else:
           self.display_item_success('Item added successfully!')
 
-        update_table()
+        apply_table_changes()
       else:
         self.display_item_warning('Adding item failed! Invalid user inputs')
         error('Adding Inventory item failed. Invalid user inputs')
@@ -373,18 +470,19 @@ class FrontendApplication:
       ret = self.inventory_item.set_checked_out(self.state.username)
 
       if ret:
-          # Create a DatabaseClient instance and connect to the inventory database
-        db_client = DataBaseClient(host=database_host)
         # Update checkout status in database
-        db_client.update_inventory_item_checkout_status(id=self.state.item_id,
-                                                        inventory_item=self.inventory_item)
-        # Update the dataframe so the table reflects the updated DB state
-        self.update_inventory_df()
-
-        update_table()
+        self.db_client.update_inventory_item_checkout_status(
+            id=self.state.item_id,
+            inventory_item=self.inventory_item)
+        # Reset alert visibility
+        self.hide_all_alerts()
+
+        # Update the changed row of the table view
+        apply_table_changes()
         self.state.is_checked_out = 1
         self.state.check_out_poc = self.state.username
-        self.state.check_out_date = self.inventory_item.check_out_date
+        self.state.check_out_date = self._format_date(
+            self.inventory_item.check_out_date)
         self._update_checkout_status(self.state.is_checked_out)
 
         self.display_item_success('Item checked-out successful!')
@@ -397,15 +495,15 @@ class FrontendApplication:
     def checkin_item(*args):
 
       self.inventory_item.set_checked_in(self.state.username)
-      # Create a DatabaseClient instance and connect to the inventory database
-      db_client = DataBaseClient(host=database_host)
       # Update checkout status in database
-      db_client.update_inventory_item_checkout_status(id=self.state.item_id,
-                                                      inventory_item=self.inventory_item)
-      # Update the dataframe so the table reflects the updated DB state
-      self.update_inventory_df()
+      self.db_client.update_inventory_item_checkout_status(
+          id=self.state.item_id,
+          inventory_item=self.inventory_item)
+      # Reset alert visibility
+      self.hide_all_alerts()
 
-      update_table()
+      # Update the changed row of the table view
+      apply_table_changes()
       self.state.is_checked_out = 0
       self._update_checkout_status(self.state.is_checked_out)
       self.display_item_success('Item returned successfully!')
@@ -415,14 +513,27 @@ class FrontendApplication:
     # -----------------------------------------------------------------------
 
     # Prepare table elements and configuration
-    headers, rows = vuetify.dataframe_to_grid(self.inventory_df,
-                                              main_table_header_options)
+    headers = []
+    for column in ['id'] + InventoryItem('').get_item_property_classes():
+      if not disable_main_table_col_filter and column in main_table_drop_cols:
+        # Filter columns to not show in this overview
+        continue
+      headers.append({"text": main_table_column_titles.get(column, column),
+                      "value": column,
+                      **main_table_header_options.get(column, {})})
+
     main_table_config = {
         "headers": ("headers", headers),
-        "items": ("rows", rows),
+        "items": ("rows", self.state.rows),
         # Link selection callback function
         "v_model": ("selection", []),
-        "search": ("query", ""),
+        # Paging, sorting and filtering are done by the database
+        "options": ("table_options", self.state.table_options),
+        "update_options": (on_table_options_change, "[$event]"),
+        "server_items_length": ("total_items", self.state.total_items),
+        "footer_props": ("table_footer_props",
+                         {"items-per-page-options":
+                          main_table_items_per_page_options}),
         "classes": "elevation-1 ma-4",
         "multi_sort": True,
         "dense": True,
@@ -432,7 +543,7 @@ class FrontendApplication:
     }
 
     # --- INVENTORY [HOME] ---
-    with RouterViewLayout(self.server, "/", clicked=self.update_inventory_df, v_if="logged_in"):
+    with RouterViewLayout(self.server, "/", clicked=self.refresh_inventory_view, v_if="logged_in"):
       with vuetify.VContainer(fluid=True):
         # --- main row to contain all elements of this page
         with VRow(v_if="show_home_inventory_table", style="margin-bottom: 16px;"):
@@ -667,6 +778,16 @@ class FrontendApplication:
                       disabled=("disable_privilege_mod_item",),
                       change=update_inventory_item,
                   )
+                  vuetify.VAutocomplete(
+                      v_model=("item_location_id", None),
+                      items=("location_items",),
+                      label="Location",
+                      placeholder="Select the location the item is stored in",
+                      prepend_icon="mdi-warehouse",
+                      clearable=True,
+                      disabled=("disable_privilege_mod_item",),
+                      change=update_inventory_item
+                  )
                   VTextField(
                       v_model=("item_location", ""),
                       label="Storage Location",
@@ -683,8 +804,6 @@ class FrontendApplication:
           self.ctrl.fig_update = fig.update
           vuetify.VDataTable(**main_table_config,
                              v_if="logged_in",
-                             # Set default 20 items per page
-                             items_per_page=-1,
                              # Show/Hide select check boxes
                              show_select=True)
 
@@ -808,6 +927,15 @@ class FrontendApplication:
                   disabled=("disable_privilege_mod_item",)
               )
             with VRow():
+              vuetify.VAutocomplete(
+                  v_model=("item_location_id", None),
+                  items=("location_items",),
+                  label="Location",
+                  placeholder="Select the location the item is stored in",
+                  prepend_icon="mdi-warehouse",
+                  clearable=True,
+                  disabled=("disable_privilege_mod_item",)
+              )
               VTextField(
                   v_model=("item_location", ""),
                   label="Storage Location",
@@ -908,6 +1036,14 @@ class FrontendApplication:
                   prepend_icon="mdi-anvil"
               )
             with VRow():
+              vuetify.VAutocomplete(
+                  v_model=("item_location_id", None),
+                  items=("location_items",),
+                  label="Location",
+                  placeholder="Select the location the item is stored in",
+                  prepend_icon="mdi-warehouse",
+                  clearable=True
+              )
               VTextField(
                   v_model=("item_location", ""),
                   label="Storage Location",
@@ -1016,6 +1152,15 @@ class FrontendApplication:
                   prepend_icon="mdi-anvil",
                   disabled=True)
             with VRow():
+              vuetify.VAutocomplete(
+                  v_model=("item_location_id", None),
+                  items=("location_items",),
+                  label="Location",
+                  placeholder="Select the location the item is stored in",
+                  prepend_icon="mdi-warehouse",
+                  clearable=True,
+                  disabled=True
+              )
               VTextField(
                   v_model=("item_location", ""),
                   label="Storage Location",
@@ -1121,6 +1266,15 @@ class FrontendApplication:
                   disabled=True
               )
             with VRow():
+              vuetify.VAutocomplete(
+                  v_model=("item_location_id", None),
+                  items=("location_items",),
+                  label="Location",
+                  placeholder="Select the location the item is stored in",
+                  prepend_icon="mdi-warehouse",
+                  clearable=True,
+                  disabled=True
+              )
               VTextField(
                   v_model=("item_location", ""),
                   label="Storage Location",
@@ -1129,6 +1283,96 @@ class FrontendApplication:
                   disabled=True
               )
 
+    # --- BATCH SCAN ---
+    with RouterViewLayout(self.server, "/batch scan"):
+      with vuetify.VContainer(fluid=True):
+        with VRow():
+
+          # --- [SECTION -- BATCH_SCAN] COLUMN -> Batch Controls
+          with VCol(style="width: 30px; min-width: 30px; max-width: 30px;"):
+
+            with VRow(style="margin-bottom: 16px;"):
+              with vuetify2.VTooltip('{{ batch_scan_tooltip_text }}', bottom=True):
+                with vuetify2.Template(v_slot_activator="{ on, attrs }"):
+                  with VBtn('',
+                            outlined=True,
+                            click=self.switch_batch_scan,
+                            icon=True,
+                            v_bind='attrs',
+                            v_on='on'):
+                    VIcon("mdi-qrcode-scan", color='primary')
+            with VRow(style="margin-bottom: 16px;"):
+              with vuetify2.VTooltip('Apply to Scanned Items', bottom=True):
+                with vuetify2.Template(v_slot_activator="{ on, attrs }"):
+                  with VBtn('',
+                            outlined=True,
+                            click=self.apply_batch_scan_action,
+                            icon=True,
+                            v_bind='attrs',
+                            v_on='on'):
+                    VIcon("mdi-check-all", color='primary')
+            with VRow(style="margin-bottom: 16px;"):
+              with vuetify2.VTooltip('Clear Scanned Items', bottom=True):
+                with vuetify2.Template(v_slot_activator="{ on, attrs }"):
+                  with VBtn('',
+                            outlined=True,
+                            click=self.clear_batch_scan,
+                            icon=True,
+                            v_bind='attrs',
+                            v_on='on'):
+                    VIcon("mdi-delete-sweep", color='primary')
+
+          # --- [SECTION -- BATCH_SCAN] COLUMN -> Camera & Alerts
+          with VCol(style="width: 300px; min-width: 60px; max-width: 600px;"):
+            vuetify.VAlert("{{ item_alert_text_success }}",
+                           type="success", v_if="show_item_alert_success")
+            vuetify.VAlert("{{ item_alert_text_warning }}",
+                           type="warning", v_if="show_item_alert_warning")
+            vuetify.VAlert("{{ batch_scan_summary }}",
+                           type="info",
+                           v_if="batch_scan_summary",
+                           dense=True)
+
+            VCardText("Place all QR labels in Front of the Camera!",
+                      v_if="show_batch_scan_camera_feed")
+            html.Div(html_content_embed_camera_stream_large,
+                     v_if="show_batch_scan_camera_feed")
+
+          # --- [SECTION -- BATCH_SCAN] COLUMN -> Operation & Scanned Items
+          with VCol(style="width: 300px; min-width: 150px; max-width: 600px;"):
+            with VRow():
+              vuetify.VSelect(
+                  v_model=("batch_scan_action", 'check_out'),
+                  items=("batch_scan_actions",
+                         [{"text": "Check-out", "value": "check_out"},
+                          {"text": "Return", "value": "check_in"},
+                          {"text": "Audit", "value": "audit"}]),
+                  label="Operation",
+                  prepend_icon="mdi-format-list-checks"
+              )
+            with VRow(v_if="batch_scan_action == 'audit'"):
+              vuetify.VAutocomplete(
+                  v_model=("batch_scan_location_id", None),
+                  items=("location_items",),
+                  label="Location",
+                  placeholder="Select the location to audit",
+                  prepend_icon="mdi-warehouse",
+                  clearable=True
+              )
+            with VRow():
+              vuetify.VDataTable(
+                  headers=("batch_scan_headers",
+                           [{"text": "ID", "value": "id"},
+                            {"text": "Item", "value": "item_name"},
+                            {"text": "Status", "value": "status"}]),
+                  items=("batch_scan_rows",),
+                  classes="elevation-1",
+                  dense=True,
+                  disable_pagination=True,
+                  hide_default_footer=True,
+                  no_data_text="No items scanned"
+              )
+
     # --- Settings
     with RouterViewLayout(self.server, "/settings"):
       with vuetify.VContainer(fluid=True):
@@ -1181,6 +1425,32 @@ class FrontendApplication:
             hide_details=True,
             prepend_icon="mdi-magnify",
         )
+        # Filter the main table by tag
+        vuetify.VAutocomplete(
+            v_model=("tag_filter",),
+            items=("tag_filter_items",),
+            placeholder="Filter by Tag",
+            dense=False,
+            clearable=True,
+            v_if="logged_in",
+            hide_details=True,
+            prepend_icon="mdi-tag",
+            classes="ml-4",
+            style="max-width: 250px",
+        )
+        # Filter the main table by location, including all locations within
+        vuetify.VAutocomplete(
+            v_model=("location_filter",),
+            items=("location_items",),
+            placeholder="Filter by Location",
+            dense=False,
+            clearable=True,
+            v_if="logged_in",
+            hide_details=True,
+            prepend_icon="mdi-warehouse",
+            classes="ml-4",
+            style="max-width: 300px",
+        )
         VSpacer()
 
         # INDICATOR -> Current User
@@ -1205,7 +1475,8 @@ class FrontendApplication:
                       disabled=("enable_privilege_export",),
                       outlined=True,
                       icon=True,
-                      click="utils.download('inventory_selection.csv', inventory_filtered_csv_string, 'text/csv')",
+                      href=("`${inventory_export_route}?token=${export_token}&query=${encodeURIComponent(query)}&tag=${encodeURIComponent(tag_filter || '')}&location_id=${location_filter || ''}`",),
+                      target='_blank',
                       v_bind='attrs',
                       small=True,
                       v_on='on'):
@@ -1217,7 +1488,8 @@ class FrontendApplication:
                       disabled=("enable_privilege_export",),
                       outlined=True,
                       icon=True,
-                      click="utils.download('inventory.csv', inventory_csv_string, 'text/csv')",
+                      href=("`${inventory_export_route}?token=${export_token}`",),
+                      target='_blank',
                       v_bind='attrs',
                       small=True,
                       v_on='on'):
@@ -1244,11 +1516,11 @@ class FrontendApplication:
         with vuetify.VList(shaped=True, v_if="logged_in", v_model=("selectedRoute", 0)):
           # vuetify.VSubheader("Inventory Actions")
 
-          with VListItem(to="/", clicked=self.update_inventory_df):
+          with VListItem(to="/", clicked=self.refresh_inventory_view):
             with VListItemIcon():
               VIcon("mdi-home", color='primary')
             with VListItemContent():
-              VListItemTitle("Inventory", clicked=self.update_inventory_df)
+              VListItemTitle("Inventory", clicked=self.refresh_inventory_view)
 
           with VListItem(to="/find inventory item"):
             with VListItemIcon():
@@ -1258,7 +1530,7 @@ class FrontendApplication:
               VListItemTitle("Find Item with QR", v_if="logged_in")
 
           with VListItem(to="/add inventory item",
-                         clicked=self.update_inventory_df,
+                         clicked=self.refresh_inventory_view,
                          v_if="enable_privilege_add_item"):
             with VListItemIcon():
               VIcon("mdi-archive-plus", v_if="logged_in", color='primary')
@@ -1277,6 +1549,12 @@ class FrontendApplication:
             with VListItemContent():
               VListItemTitle("Return Item", v_if="logged_in")
 
+          with VListItem(to="/batch scan"):
+            with VListItemIcon():
+              VIcon("mdi-qrcode-plus", v_if="logged_in", color='primary')
+            with VListItemContent():
+              VListItemTitle("Batch Scan", v_if="logged_in")
+
           with VListItem(to="/settings",
                          v_if="enable_privilege_add_item"):
             with VListItemIcon():
@@ -1290,6 +1568,15 @@ class FrontendApplication:
 
     @ self.state.change("query")
     def on_query_change(query, **kwargs):
+      # A new search starts on the first page
+      self.state.table_options = {**self.state.table_options, "page": 1}
+      update_table_debounced(query, get_table_filters(),
+                             self.state.table_options)
+
+    @ self.state.change("tag_filter", "location_filter")
+    def on_table_filter_change(**kwargs):
+      # A new filter starts on the first page
+      self.state.table_options = {**self.state.table_options, "page": 1}
       update_table()
 
     @ self.state.change("item_alert_text_success")
@@ -1322,15 +1609,10 @@ class FrontendApplication:
           # Update state data ID
           self.state.item_id = current_id
 
-          # Populate state data with item information
+          # Populate state data with item information. This also keeps a
+          # complete and global copy of this item in self.inventory_item
           self.populate_item_from_id(current_id)
 
-          # Create a DatabaseClient instance and connect to the inventory database
-          db_client = DataBaseClient(host=database_host)
-          # Save a complete and global copy of this item
-          self.inventory_item.populate_from_df(
-              item_data_df=db_client.get_inventory_item_as_df(current_id))
-
         elif len(selected_df["id"].tolist()) == 1:
           TODO = True
           # TODO add callback to empty item state variables if no item
@@ -1456,19 +1738,159 @@ class FrontendApplication:
       self.state.find_item_qr_tooltip_text = "Close Camera"
     self.state.flush()
 
-  def update_inventory_df(self):
+  def switch_batch_scan(self):
+    """
+    If no batch scan runs -> start a batch scan and show the camera feed
+    If a batch scan runs -> stop it and hide the camera feed
+    The scanned items are kept until the batch scan is started again or
+    cleared.
+    """
+    if self.state.show_batch_scan_camera_feed:
+      self.camera_server.stop_batch_scan()
+      self.state.show_batch_scan_camera_feed = False
+      self.state.batch_scan_tooltip_text = "Start Batch Scan"
+    else:
+      self.camera_server.start_batch_scan()
+      self.state.batch_scan_rows = []
+      self.state.batch_scan_summary = ''
+      self.state.show_batch_scan_camera_feed = True
+      self.state.batch_scan_tooltip_text = "Stop Batch Scan"
+    self.state.flush()
+
+  def clear_batch_scan(self):
+    """
+    Forget the scanned items. A running batch scan continues with an empty
+    set of items.
+    """
+    if self.state.show_batch_scan_camera_feed:
+      self.camera_server.start_batch_scan()
+    self.state.batch_scan_rows = []
+    self.state.batch_scan_summary = ''
+    self.state.flush()
+
+  def add_batch_scan_id(self, id: int):
+    """
+    Callback function that is called in the event loop with every new item
+    ID of the running batch scan. Adds the item to the scanned items.
+    """
+    if any(row["id"] == id for row in self.state.batch_scan_rows):
+      return
+    inventoryItem = self.db_client.get_inventory_item(id)
+    if inventoryItem is None:
+      row = {"id": id, "item_name": '', "status": 'unknown'}
+    else:
+      row = {"id": id,
+             "item_name": inventoryItem.item_name,
+             "status": ('checked out' if inventoryItem.is_checked_out
+                        else 'available')}
+    with self.state:
+      self.state.batch_scan_rows = self.state.batch_scan_rows + [row]
+
+  def apply_batch_scan_action(self):
+    """
+    Apply the selected operation to all scanned items in one transaction:
+    * check_out - Check out all items to the logged in user
+    * check_in - Return all items
+    * audit - Compare the scanned items with the inventory, and with the
+              items of the selected location if any
+    """
+    item_ids = [row["id"] for row in self.state.batch_scan_rows]
+    if not item_ids:
+      self.display_item_warning('No items scanned!')
+      return
+
+    action = self.state.batch_scan_action
+    if action == 'audit':
+      location_id = self.state.batch_scan_location_id
+      audit = self.db_client.audit_inventory_items(item_ids, location_id)
+      summary = (f'{len(audit["found"])} items found, '
+                 f'{len(audit["checked_out"])} of them marked as checked out')
+      if audit["unknown"]:
+        summary += f', unknown IDs {audit["unknown"]}'
+      if location_id is not None:
+        summary += (f'. Misplaced {audit["misplaced"]}, '
+                    f'missing {audit["missing"]}')
+      self.state.batch_scan_summary = summary
+      self.display_item_success('Audit completed')
+    else:
+      is_checked_out = action == 'check_out'
+      if is_checked_out and not self.state.username:
+        self.display_item_warning('Items checked-out failed. No User set!')
+        warning('Updating checkout status failed. No user set.')
+        return
+      updated_ids = self.db_client.update_inventory_items_checkout_status(
+          item_ids, is_checked_out, self.state.username)
+      self.state.batch_scan_summary = (
+          f'{"Checked out" if is_checked_out else "Returned"} '
+          f'{len(updated_ids)} of {len(item_ids)} items. The other items '
+          f'were already {"checked out" if is_checked_out else "available"} '
+          'or are unknown.')
+      self.display_item_success('Items updated successfully!')
+
+      # Update the changed rows of the table view and the scanned items
+      self.apply_table_changes()
+      audit = self.db_client.audit_inventory_items(item_ids)
+      self.state.batch_scan_rows = [
+          {**row,
+           "status": ('unknown' if row["id"] in audit["unknown"] else
+                      'checked out' if row["id"] in audit["checked_out"] else
+                      'available')}
+          for row in self.state.batch_scan_rows]
+    self.state.flush()
+
+  def on_inventory_changes(self, changes: dict):
+    """
+    Callback function that is called in the event loop when the change
+    notification bus reports changes of the inventory, made by this or any
+    other session. The table view is only updated if the changes affect it.
     """
-    Update DataFrame that holds the compolete Inventory content
+    if changes["reload"]:
+      with self.state:
+        self.update_table()
+      return
+
+    page_ids = {row["id"] for row in self.state.rows}
+    # Changed items can move onto the page of a searched, filtered or
+    # sorted table
+    is_filtered = bool(self.state.query or
+                       self.state.tag_filter or
+                       self.state.location_filter or
+                       self.state.table_options.get('sortBy'))
+    if (is_filtered or changes["inserted_ids"] or changes["deleted_ids"] or
+            any(item_id in page_ids for item_id in changes["changed_ids"])):
+      with self.state:
+        self.apply_table_changes()
+
+  def refresh_inventory_view(self):
+    """
+    Update the inventory table with the changes since it was loaded
 
     """
     debug('Update Inventory Data')
-    # Create a DatabaseClient instance and connect to the inventory database
-    db_client = DataBaseClient(host=database_host)
-    self.inventory_df = db_client.get_inventory_as_df()
+    self.apply_table_changes()
 
     # Reset checkout alert visibility
     self.hide_all_alerts()
 
+  def update_tag_filter_items(self):
+    """
+    Update the tags offered by the tag filter of the main table from the tag
+    counts of the database
+    """
+    self.state.tag_filter_items = [
+        {"text": f'{tag} ({num_items})', "value": tag}
+        for (tag, num_items)
+        in self.db_client.get_tag_counts(limit=tag_filter_max_tags)]
+
+  def update_location_items(self):
+    """
+    Update the locations offered by the location selections from the
+    database
+    """
+    self.state.location_items = [
+        {"text": location["full_name"], "value": location["id"]}
+        for location in self.db_client.get_locations()]
+
   def populate_item_from_id(self, id: int, is_update_from_qr_scan: bool = False):
     """
     Callback function to be called when scanning a QR code from an existing
@@ -1487,23 +1909,21 @@ class FrontendApplication:
       self.turn_off_qr_camera_visibility()
 
     info(f'Load item from id {id}')
-    # Create a DatabaseClient instance and connect to the inventory database
-    db_client = DataBaseClient(host=database_host)
     # Get data for scanned item from database
-    item_data_df = db_client.get_inventory_item_as_df(id)
+    inventoryItem = self.db_client.get_inventory_item(id)
 
     # Only proceed if item is found in the database
-    if not item_data_df.empty:
+    if inventoryItem is not None:
       # [!] Make sure the global inventory_item is synchronized with the latest
       #     data grab
-      self.inventory_item = db_client.get_inventory_item_as_object(id)
+      self.inventory_item = inventoryItem
 
       self.state.item_id = id
 
       # Handle loading and encoding image from media data
       # Only update images that contain a valid path
-      if Path(str(item_data_df.iloc[0]['item_image'])).name != 'inventory':
-        img_path = Path(str(item_data_df.iloc[0]['item_image']))
+      if Path(str(inventoryItem.item_image)).name != 'inventory':
+        img_path = Path(str(inventoryItem.item_image))
         info(f'Image file path {img_path.absolute().as_posix()}')
 
         if img_path.exists():
@@ -1526,25 +1946,23 @@ class FrontendApplication:
               self.encode_image_from_path(image_not_found_path)}"
 
       # Update state
-      self.state.update({"item_name": f'{item_data_df.iloc[0]["item_name"]}'})
-      self.state.item_manufacturer = f'{item_data_df.iloc[0]['manufacturer']}'
+      self.state.update({"item_name": f'{inventoryItem.item_name}'})
+      self.state.item_manufacturer = f'{inventoryItem.manufacturer}'
       self.state.item_manufacturer_details = f'{
-          item_data_df.iloc[0]['manufacturer_contact']}'
-      self.state.item_location = f'{
-          item_data_df.iloc[0]['item_location']}'
-      is_checkout_temp = (
-          f'{item_data_df.iloc[0]['is_checked_out']}')
-      self.state.check_out_date = f'{item_data_df.iloc[0]['check_out_date']}'
-      self.state.check_out_poc = f'{item_data_df.iloc[0]['check_out_poc']}'
-      self.state.date_added = f'{item_data_df.iloc[0]['date_added']}'
-      self.state.item_description = f'{
-          item_data_df.iloc[0]['item_description']}'
-      self.state.item_tags = f'{item_data_df.iloc[0]['item_tags']}'
-
-      # Split tag list to create VChips
-      # TODO fix
-      self.state.item_tag_chips = [item.strip()
-                                   for item in self.state.item_tags.split(";") if item.strip()]
+          inventoryItem.manufacturer_contact}'
+      self.state.item_location = f'{inventoryItem.item_location}'
+      self.state.item_location_id = inventoryItem.get_item_dict()[
+          'location_id']
+      is_checkout_temp = f'{inventoryItem.is_checked_out}'
+      self.state.check_out_date = self._format_date(
+          inventoryItem.check_out_date)
+      self.state.check_out_poc = f'{inventoryItem.check_out_poc}'
+      self.state.date_added = self._format_date(inventoryItem.date_added)
+      self.state.item_description = f'{inventoryItem.item_description}'
+      self.state.item_tags = f'{inventoryItem.item_tags}'
+
+      # Tag list to create VChips
+      self.state.item_tag_chips = inventoryItem.get_tags()
 
       # Handle cases where for whichever reason the checkout status is set
       # to None
@@ -1607,6 +2025,7 @@ class FrontendApplication:
       inventoryItem.manufacturer_contact = str(
           self.state.item_manufacturer_details)
       inventoryItem.item_location = str(self.state.item_location)
+      inventoryItem.location_id = self.state.item_location_id
       inventoryItem.item_tags = str(self.state.item_tags)
       inventoryItem.set_img_path(Path(self.state.item_image_path))
 
@@ -1639,6 +2058,16 @@ class FrontendApplication:
 
     return print_success
 
+  def _format_date(self, value) -> str:
+    """
+    Format a date of an inventory item for display, empty if not set
+    """
+    if value is None:
+      return ''
+    if isinstance(value, datetime):
+      return value.strftime("%m/%d/%Y, %H:%M:%S")
+    return str(value)
+
   def _getdatetime(self) -> str:
     """
     Get current datetime as string fromat: %d/%m/%Y %H:%M:%S
@@ -1674,13 +2103,11 @@ class FrontendApplication:
 
       # Update the path in the database
       if self.state.item_id is not None:
-        # Create a DatabaseClient instance and connect to the inventory
-        # database
         info(
             f'[+] Set {self.state.item_id} item image path to {self.state.item_image_path}')
-        db_client = DataBaseClient(host=database_host)
-        db_client.update_inventory_item_image_path(self.state.item_id,
-                                                   self.state.item_image_path)
+        self.db_client.update_inventory_item_image_path(
+            self.state.item_id,
+            self.state.item_image_path)
       else:
         warning(f'Attempt to save image while display_img was None!')
 
@@ -1808,9 +2235,7 @@ class FrontendApplication:
      / If both of the above set logged_in to True and assign privileges
 
     """
-    # Create a DatabaseClient instance and connect to the inventory database
-    db_client = DataBaseClient(host=database_host)
-    valid_user, inventoryUser = db_client.get_inventory_user_as_object(
+    valid_user, inventoryUser = self.db_client.get_inventory_user_as_object(
         username)
 
     if not valid_user:
@@ -1845,6 +2270,9 @@ class FrontendApplication:
         self.state.enable_privilege_settings = True
         self.state.enable_privilege_export = True
 
+      # Issue export token before the flag gets inverted below
+      self._set_export_access(self.state.enable_privilege_export)
+
       # Opposite flags needed for automatic state links
       self.state.disable_privilege_add_item = not self.state.enable_privilege_add_item
       self.state.disable_privilege_delete_item = not self.state.enable_privilege_delete_item
@@ -1868,8 +2296,91 @@ class FrontendApplication:
     self.state.disable_privilege_mod_item = not self.state.enable_privilege_mod_item
     self.state.disable_privilege_settings = not self.state.enable_privilege_settings
     self.state.enable_privilege_export = not self.state.enable_privilege_export
+    self._set_export_access(False)
     self.state.flush()
 
+  # -----------------------------------------------------------------------------
+  #                 [EXPORT]
+  # -----------------------------------------------------------------------------
+  def _set_export_access(self, enabled: bool):
+    """
+    Issue a new export token if enabled is True, revoke the current one
+    otherwise. Each log-in gets a new token, so links of a previous session
+    stop working.
+    """
+    self.export_token = secrets.token_urlsafe(32) if enabled else None
+    self.state.export_token = self.export_token or ''
+
+  def bind_export_route(self, wslink_server):
+    """
+    Called once the web server of the trame application is available. Adds
+    the csv export endpoint to it.
+    """
+    wslink_server.app.router.add_get(inventory_export_route,
+                                     self.handle_export_request)
+
+  async def handle_export_request(self, request):
+    """
+    Stream the inventory in csv format. The optional request parameters
+    query, tag and location_id restrict the export to the items matching
+    this search query, having this tag and being stored in this location.
+    """
+    token = request.query.get('token', '')
+    if (self.export_token is None or
+            not secrets.compare_digest(token, self.export_token)):
+      warning('[!] Rejected inventory export request without valid token')
+      raise web.HTTPForbidden()
+
+    query = request.query.get('query', '')
+    tag = request.query.get('tag', '')
+    try:
+      location_id = int(request.query['location_id'])
+    except (KeyError, ValueError):
+      location_id = None
+    file_name = ('inventory_selection.csv'
+                 if (query or tag or location_id is not None)
+                 else 'inventory.csv')
+
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/csv; charset=utf-8',
+        'Content-Disposition': f'attachment; filename="{file_name}"'})
+    await response.prepare(request)
+
+    # The database is read in a worker thread, one batch at a time, so the
+    # event loop is not blocked and only one batch is held in memory
+    csv_chunks = self.db_client.iter_inventory_csv(query=query,
+                                                   tag=tag,
+                                                   location_id=location_id)
+    pending_chunk = None
+    try:
+      while True:
+        # Shielded, since cancelling the await does not stop next() in its
+        # worker thread. The generator can't be closed while it is executing.
+        pending_chunk = asyncio.ensure_future(
+            asyncio.to_thread(next, csv_chunks, None))
+        csv_chunk = await asyncio.shield(pending_chunk)
+        if csv_chunk is None:
+          break
+        await response.write(csv_chunk.encode('utf-8'))
+    finally:
+      # Returns the database connection to the pool if the download was
+      # aborted, even if the handler gets cancelled again meanwhile
+      await asyncio.shield(self._close_csv_chunks(csv_chunks, pending_chunk))
+
+    await response.write_eof()
+    return response
+
+  @staticmethod
+  async def _close_csv_chunks(csv_chunks, pending_chunk):
+    """
+    Close the csv generator of an export once the pending next() call
+    pending_chunk returned. The generator is closed in a worker thread as
+    well, since closing the cursor might have to skip the remaining rows.
+    """
+    if pending_chunk is not None:
+      await asyncio.wait([pending_chunk])
+    await asyncio.to_thread(csv_chunks.close)
+
   async def run(self):
     """
     Main function to start the inventory frontend server
@@ -1929,6 +2440,13 @@ class FrontendApplication:
         server and/or desktop browser
 
     """
+    # --- Subscribe to inventory changes of other sessions ---
+    loop = asyncio.get_running_loop()
+    self.change_subscription_id = get_change_notification_bus(
+        database_host).subscribe(
+        lambda changes: loop.call_soon_threadsafe(self.on_inventory_changes,
+                                                  changes))
+
     # --- Start server ---
     if enable_debug_run:
       task = self.server.start(thread=True,
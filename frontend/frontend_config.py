@@ -17,7 +17,35 @@ main_table_header_options = {"item_name": {"sortable": False}}
 main_table_drop_cols = ['item_description',
                         'manufacturer_contact',
                         'date_added',
-                        'item_image']
+                        'item_image',
+                        'location_id']
+
+# Column titles shown in the main table header. Columns not listed here are
+# shown with their database column name
+main_table_column_titles = {'item_name': 'Item',
+                            'manufacturer': 'Manufacturer',
+                            'is_checked_out': 'Checked-Out',
+                            'check_out_date': 'Checkout Date',
+                            'check_out_poc': 'Checked-Out By',
+                            'item_tags': 'Tags',
+                            'item_location': 'Location'}
+
+# The main table is paged by the database. Default number of items per page
+# and the page sizes the user can choose from
+main_table_items_per_page = 25
+main_table_items_per_page_options = [10, 25, 50, 100]
+
+# Time [s] the search query has to stay unchanged before the table is
+# updated. Coalesces the keystrokes of a typed search into one update.
+search_debounce_delay_s = 0.3
+
+# Maximum number of tags offered by the tag filter of the main table, the
+# most used tags first
+tag_filter_max_tags = 200
+
+# Route of the download endpoint the inventory csv export is streamed from.
+# It is served by the frontend server itself.
+inventory_export_route = '/export/inventory.csv'
 
 # Directory where media files (e.g. item images) corresponding to database
 # items will be stored
@@ -0,0 +1,148 @@
+"""
+
+Shared setup of the unit tests
+
+The tests cover the parts of the backend that run without a database
+server, camera or printer. Database access is replaced by fakes per test.
+
+  python -m pytest tests
+
+"""
+import importlib
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+# Get the repository directory and add it to the sys.path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+
+
+class FakeCursor():
+  """
+  Cursor that records the executed statements and returns preset rows
+  """
+
+  def __init__(self, connection):
+    self.connection = connection
+    self.description = None
+    self.lastrowid = None
+    self.rowcount = 0
+    self._rows = []
+
+  def execute(self, sql, values=()):
+    self.connection.statements.append((sql, list(values)))
+    (columns, rows) = self.connection.handler(sql, list(values))
+    self.description = ([(column,) for column in columns]
+                        if columns is not None else None)
+    self._rows = list(rows)
+
+  def executemany(self, sql, values):
+    for row_values in values:
+      self.execute(sql, row_values)
+
+  def fetchall(self):
+    (rows, self._rows) = (self._rows, [])
+    return rows
+
+  def fetchmany(self, size):
+    (rows, self._rows) = (self._rows[:size], self._rows[size:])
+    return rows
+
+  def fetchone(self):
+    return self._rows.pop(0) if self._rows else None
+
+  def close(self):
+    self.connection.num_closed_cursors += 1
+
+
+class FakeConnection():
+  """
+  Connection whose cursors answer every statement through handler(sql,
+  values) -> (columns, rows)
+  """
+
+  def __init__(self, handler):
+    self.handler = handler
+    self.statements = []
+    self.num_closed_cursors = 0
+    self.num_commits = 0
+    self.num_rollbacks = 0
+
+  def cursor(self, **kwargs):
+    return FakeCursor(self)
+
+  def begin(self):
+    pass
+
+  def commit(self):
+    self.num_commits += 1
+
+  def rollback(self):
+    self.num_rollbacks += 1
+
+
+class FakePooledConnection():
+
+  def __init__(self, connection):
+    self.connection = connection
+    self.prepared_cursors = {}
+
+
+class FakeConnectionPool():
+  """
+  Stand-in for DataBaseConnectionPool with a single connection
+  """
+
+  def __init__(self, handler):
+    self.fake_connection = FakeConnection(handler)
+    self.num_checked_out = 0
+
+  @contextmanager
+  def connection(self):
+    with self.pooled_connection() as pooled:
+      yield pooled.connection
+
+  @contextmanager
+  def pooled_connection(self):
+    self.num_checked_out += 1
+    try:
+      yield FakePooledConnection(self.fake_connection)
+    finally:
+      self.num_checked_out -= 1
+
+  def get_prepared_cursor(self, pooled, sql: str):
+    return pooled.connection.cursor(prepared=True)
+
+
+@pytest.fixture
+def fake_connection():
+  """
+  Return a function that creates a FakeConnection. handler(sql, values) ->
+  (columns, rows) answers the statements, by default with an empty result.
+  """
+  def create_connection(handler=None):
+    return FakeConnection(handler or (lambda sql, values: (None, [])))
+
+  return create_connection
+
+
+@pytest.fixture
+def fake_db_client(monkeypatch):
+  """
+  Return a function that creates a DataBaseClient on a FakeConnectionPool.
+  handler(sql, values) -> (columns, rows) answers the statements, by default
+  with an empty result.
+  """
+  # backend exports the DataBaseClient class under the name of its module
+  data_base_client_module = importlib.import_module('backend.DataBaseClient')
+
+  def create_client(handler=None):
+    pool = FakeConnectionPool(handler or (lambda sql, values: (None, [])))
+    monkeypatch.setattr(data_base_client_module, 'get_connection_pool',
+                        lambda host, port: pool)
+    return data_base_client_module.DataBaseClient(host='localhost')
+
+  return create_client
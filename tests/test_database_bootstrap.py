@@ -0,0 +1,112 @@
+"""
+
+Tests of the schema migrations (backend/database_bootstrap.py)
+
+"""
+import pytest
+
+from backend.database_bootstrap import (SCHEMA_MIGRATIONS,
+                                        SCHEMA_VERSION,
+                                        _apply_migrations,
+                                        _migration_003_typed_dates_and_indexes)
+
+
+def _get_schema_handler(column_types: dict, schema_version: int = None):
+  """
+  Answer the catalog queries of the migrations from column_types, a
+  dictionary column name -> data type of the inventory table
+  """
+  def handler(sql, values):
+    if 'information_schema.COLUMNS' in sql:
+      column_type = column_types.get(values[1])
+      return (['DATA_TYPE'], [(column_type,)] if column_type else [])
+    if sql.startswith('SELECT MAX(version)'):
+      return (['version'], [(schema_version,)])
+    return (None, [])
+  return handler
+
+
+def _get_alter_statements(connection) -> list:
+  return [sql for (sql, _) in connection.statements
+          if sql.startswith(('ALTER', 'UPDATE'))]
+
+
+def test_migrations_are_numbered_in_order():
+  versions = [version for (version, _, _) in SCHEMA_MIGRATIONS]
+  assert versions == list(range(1, len(SCHEMA_MIGRATIONS) + 1))
+  assert SCHEMA_VERSION == versions[-1]
+
+
+def test_pending_migrations_are_applied_and_recorded(fake_connection,
+                                                     monkeypatch):
+  applied = []
+  migrations = [(version, f'Migration {version}',
+                 lambda cursor, version=version: applied.append(version))
+                for version in range(1, 5)]
+  monkeypatch.setattr('backend.database_bootstrap.SCHEMA_MIGRATIONS',
+                      migrations)
+  monkeypatch.setattr('backend.database_bootstrap.SCHEMA_VERSION', 4)
+  connection = fake_connection(_get_schema_handler({}, schema_version=2))
+
+  schema_version = _apply_migrations(connection, connection.cursor())
+
+  assert schema_version == 4
+  assert applied == [3, 4]
+  recorded = [values for (sql, values) in connection.statements
+              if sql.startswith('INSERT INTO schema_version')]
+  assert recorded == [[3, 'Migration 3'], [4, 'Migration 4']]
+  # Each migration is committed along with its version record
+  assert connection.num_commits == 2
+
+
+def test_newer_schema_is_not_migrated(fake_connection):
+  connection = fake_connection(
+      _get_schema_handler({}, schema_version=SCHEMA_VERSION + 1))
+
+  schema_version = _apply_migrations(connection, connection.cursor())
+
+  assert schema_version == SCHEMA_VERSION + 1
+  assert connection.num_commits == 0
+
+
+def test_date_migration_converts_text_columns(fake_connection):
+  connection = fake_connection(_get_schema_handler(
+      {"check_out_date": 'varchar', "date_added": 'varchar'}))
+
+  _migration_003_typed_dates_and_indexes(connection.cursor())
+
+  statements = _get_alter_statements(connection)
+  for column in ['check_out_date', 'date_added']:
+    assert any(f'ADD COLUMN IF NOT EXISTS {column}_typed' in sql
+               for sql in statements)
+    assert any(sql.startswith(f'UPDATE inventory SET {column}_typed')
+               for sql in statements)
+    assert any(f'DROP COLUMN IF EXISTS {column}' in sql for sql in statements)
+    assert any(f'CHANGE COLUMN {column}_typed {column} DATETIME' in sql
+               for sql in statements)
+  assert 'ADD INDEX IF NOT EXISTS idx_inventory_date_added' in statements[-1]
+
+
+@pytest.mark.parametrize('column_types, expected_steps', [
+    # Interrupted after dropping date_added, only the rename is left
+    ({"check_out_date": 'datetime', "date_added_typed": 'datetime'},
+     ['CHANGE COLUMN date_added_typed']),
+    # Interrupted after adding the typed column, date_added is converted
+    ({"check_out_date": 'datetime', "date_added": 'varchar',
+      "date_added_typed": 'datetime'},
+     ['ADD COLUMN IF NOT EXISTS date_added_typed', 'UPDATE',
+      'DROP COLUMN IF EXISTS date_added', 'CHANGE COLUMN date_added_typed']),
+    # Both converted, only the indexes are (re-)added
+    ({"check_out_date": 'datetime', "date_added": 'datetime'}, []),
+])
+def test_date_migration_resumes_after_failure(fake_connection, column_types,
+                                             expected_steps):
+  connection = fake_connection(_get_schema_handler(column_types))
+
+  _migration_003_typed_dates_and_indexes(connection.cursor())
+
+  statements = _get_alter_statements(connection)
+  assert len(statements) == len(expected_steps) + 1
+  for (sql, step) in zip(statements, expected_steps):
+    assert step in sql
+  assert 'check_out_date_typed' not in ' '.join(statements)
@@ -0,0 +1,154 @@
+"""
+
+Tests of the streaming bulk export service (backend/services/
+export_db_to_csv.py)
+
+"""
+import csv
+import json
+from datetime import datetime
+
+import pytest
+
+from backend.services import export_db_to_csv
+from backend.services.export_db_to_csv import (CsvExportWriter,
+                                               JsonLinesExportWriter,
+                                               ParquetExportWriter,
+                                               export_table)
+
+_columns = ['id', 'item_name', 'is_checked_out', 'date_added']
+_batches = [[(1, 'Drill', True, datetime(2024, 5, 17, 14, 3)),
+             (2, 'Saw, hand', False, None)],
+            [(3, 'Hammer "XL"', False, datetime(2024, 5, 18, 9, 0))]]
+
+
+def _write(writer_class, output_path):
+  writer = writer_class(output_path, _columns)
+  for rows in _batches:
+    writer.write_batch(rows)
+  writer.close()
+
+# -------------------------------------------------------------------------
+#                             [WRITERS]
+# -------------------------------------------------------------------------
+
+
+def test_csv_writer(tmp_path):
+  output_path = tmp_path / 'inventory.csv'
+  _write(CsvExportWriter, output_path)
+
+  with open(output_path, newline='', encoding='utf-8') as csv_file:
+    rows = list(csv.reader(csv_file))
+  assert rows[0] == _columns
+  assert rows[1] == ['1', 'Drill', 'True', '2024-05-17 14:03:00']
+  assert rows[2] == ['2', 'Saw, hand', 'False', '']
+  assert rows[3][1] == 'Hammer "XL"'
+
+
+def test_jsonl_writer(tmp_path):
+  output_path = tmp_path / 'inventory.jsonl'
+  _write(JsonLinesExportWriter, output_path)
+
+  with open(output_path, encoding='utf-8') as jsonl_file:
+    rows = [json.loads(line) for line in jsonl_file]
+  assert len(rows) == 3
+  assert rows[0] == {"id": 1, "item_name": 'Drill', "is_checked_out": True,
+                     "date_added": '2024-05-17 14:03:00'}
+  assert rows[1]["date_added"] is None
+
+
+def test_parquet_writer(tmp_path):
+  pyarrow_parquet = pytest.importorskip('pyarrow.parquet')
+  output_path = tmp_path / 'inventory.parquet'
+  _write(ParquetExportWriter, output_path)
+
+  table = pyarrow_parquet.read_table(output_path)
+  assert table.column_names == _columns
+  assert table.num_rows == 3
+  assert table.column('item_name').to_pylist() == ['Drill', 'Saw, hand',
+                                                    'Hammer "XL"']
+  assert table.column('date_added').to_pylist()[0] == datetime(2024, 5, 17,
+                                                               14, 3)
+
+
+def test_parquet_writer_without_rows(tmp_path):
+  pyarrow_parquet = pytest.importorskip('pyarrow.parquet')
+  output_path = tmp_path / 'inventory.parquet'
+  ParquetExportWriter(output_path, _columns).close()
+
+  table = pyarrow_parquet.read_table(output_path)
+  assert table.column_names == _columns
+  assert table.num_rows == 0
+
+# -------------------------------------------------------------------------
+#                             [EXPORT]
+# -------------------------------------------------------------------------
+
+
+def test_export_rejects_unknown_table_and_columns(tmp_path):
+  with pytest.raises(ValueError):
+    export_table(tmp_path / 'out.csv', table_name='schema_version')
+  with pytest.raises(ValueError):
+    export_table(tmp_path / 'out.csv', columns=['id', 'user_password'])
+  with pytest.raises(ValueError):
+    export_table(tmp_path / 'out.csv', export_format='xml')
+
+
+def test_export_never_includes_password_hashes():
+  user_columns = export_db_to_csv.EXPORT_COLUMNS[
+      export_db_to_csv.INVENTORY_USER_TABLE_NAME]
+  assert 'user_password' not in user_columns
+
+
+def test_incremental_export_only_for_tables_with_updated_at(tmp_path):
+  with pytest.raises(ValueError):
+    export_table(tmp_path / 'out.csv',
+                 table_name=export_db_to_csv.INVENTORY_USER_TABLE_NAME,
+                 incremental=True,
+                 state_path=tmp_path / 'state.json')
+
+
+def test_incremental_export_keeps_updated_at_watermark(tmp_path,
+                                                       fake_db_client):
+  updated_at = datetime(2024, 5, 17, 14, 3)
+  rows = [('Drill', updated_at, 4), ('Saw', updated_at, 9)]
+
+  def handler(sql, values):
+    return ((['item_name', 'updated_at', 'id'], rows)
+            if sql.startswith('SELECT') else (None, []))
+  client = fake_db_client(handler)
+  state_path = tmp_path / 'state.json'
+
+  # First run exports all rows and records the last (updated_at, id)
+  stats = export_table(tmp_path / 'out.csv', columns=['item_name'],
+                       incremental=True, state_path=state_path)
+  assert stats["rows"] == 2
+  with open(tmp_path / 'out.csv', encoding='utf-8') as csv_file:
+    assert csv_file.read() == 'item_name\nDrill\nSaw\n'
+  state = json.loads(state_path.read_text())
+  assert state['inventory']['last_updated_at'] == updated_at.isoformat()
+  assert state['inventory']['last_id'] == 9
+
+  # The next run continues after the watermark
+  rows = []
+  export_table(tmp_path / 'out.csv', columns=['item_name'],
+               incremental=True, state_path=state_path)
+  (sql, values) = client.pool.fake_connection.statements[-1]
+  assert '(updated_at > ? OR (updated_at = ? AND id > ?))' in sql
+  assert sql.endswith('ORDER BY updated_at ASC, id ASC')
+  assert values[:3] == [updated_at, updated_at, 9]
+  # Without new rows the watermark stays
+  assert json.loads(state_path.read_text())['inventory']['last_id'] == 9
+
+
+def test_incremental_export_with_id_only_state_exports_all(tmp_path,
+                                                           fake_db_client):
+  client = fake_db_client(lambda sql, values: (['id'], []))
+  state_path = tmp_path / 'state.json'
+  state_path.write_text(json.dumps({"inventory": {"last_id": 12}}))
+
+  export_table(tmp_path / 'out.csv', columns=['id'], incremental=True,
+               state_path=state_path)
+
+  (sql, _) = client.pool.fake_connection.statements[-1]
+  assert 'updated_at > ?' not in sql
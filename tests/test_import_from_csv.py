@@ -0,0 +1,169 @@
+"""
+
+Tests of the bulk import service (backend/services/import_from_csv.py)
+
+"""
+from datetime import datetime
+
+import pytest
+
+from backend.services import import_from_csv
+from backend.services.import_from_csv import (_parse_row,
+                                              _validate_header,
+                                              import_items)
+
+
+def _write_csv(tmp_path, lines: list):
+  csv_path = tmp_path / 'items.csv'
+  csv_path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+  return csv_path
+
+
+def _get_insert_handler(first_id: int, autoinc_lock_mode: int = 1,
+                        id_increment: int = 1):
+  """
+  Answer the statements of DataBaseClient.add_inventory_items(), assigning
+  IDs from first_id on
+  """
+  next_id = [first_id]
+  last_insert_id = [None]
+
+  def handler(sql, values):
+    if '@@auto_increment_increment' in sql:
+      return None, [(id_increment, autoinc_lock_mode)]
+    if sql.startswith('SELECT LAST_INSERT_ID()'):
+      return None, [(last_insert_id[0],)]
+    if sql.startswith('INSERT INTO inventory '):
+      num_rows = sql.count('), (') + 1
+      last_insert_id[0] = next_id[0]
+      next_id[0] += num_rows * id_increment
+    return None, []
+  return handler
+
+# -------------------------------------------------------------------------
+#                             [VALIDATION]
+# -------------------------------------------------------------------------
+
+
+def test_header_requires_item_name():
+  with pytest.raises(ValueError):
+    _validate_header(None)
+  with pytest.raises(ValueError):
+    _validate_header(['id', 'manufacturer'])
+  with pytest.raises(ValueError):
+    _validate_header(['item_name', 'colour'])
+  _validate_header(['id', 'item_name', 'location_id'])
+
+
+def test_parse_row_converts_values():
+  (inventory_item, id) = _parse_row(
+      {"id": '7',
+       "item_name": ' Drill ',
+       "is_checked_out": 'yes',
+       "check_out_date": '05/17/2024, 14:03:00',
+       "date_added": '2024-05-01 08:00:00',
+       "item_tags": 'tools; power ;tools',
+       "location_id": '3'},
+      use_id=True)
+
+  assert id == 7
+  item_dict = inventory_item.get_item_dict()
+  assert item_dict["item_name"] == 'Drill'
+  assert item_dict["is_checked_out"] is True
+  assert item_dict["check_out_date"] == datetime(2024, 5, 17, 14, 3)
+  assert item_dict["date_added"] == datetime(2024, 5, 1, 8, 0)
+  assert item_dict["item_tags"] == 'tools; power'
+  assert item_dict["location_id"] == 3
+
+
+def test_parse_row_ignores_id_without_upsert():
+  (_, id) = _parse_row({"id": '7', "item_name": 'Drill'}, use_id=False)
+  assert id is None
+  (_, id) = _parse_row({"id": '', "item_name": 'Drill'}, use_id=True)
+  assert id is None
+
+
+@pytest.mark.parametrize('row', [
+    {"item_name": ''},
+    {"item_name": 'Drill', "id": 'seven'},
+    {"item_name": 'Drill', "id": '0'},
+    {"item_name": 'Drill', "is_checked_out": 'maybe'},
+    {"item_name": 'Drill', "date_added": 'yesterday'},
+    {"item_name": 'Drill', "location_id": 'shelf'},
+    {"item_name": 'Drill', None: ['extra field']},
+])
+def test_parse_row_rejects_invalid_rows(row):
+  with pytest.raises(ValueError):
+    _parse_row(row, use_id=True)
+
+# -------------------------------------------------------------------------
+#                             [IMPORT]
+# -------------------------------------------------------------------------
+
+
+def test_dry_run_validates_without_database(tmp_path, monkeypatch):
+  # Any database access fails
+  monkeypatch.setattr(import_from_csv, 'DataBaseClient', None)
+  csv_path = _write_csv(tmp_path, ['item_name,is_checked_out',
+                                   'Drill,1',
+                                   ',0',
+                                   'Saw,maybe',
+                                   'Hammer,0'])
+
+  stats = import_items(csv_path, dry_run=True)
+
+  assert stats["rows_read"] == 4
+  assert stats["rows_invalid"] == 2
+  assert stats["inserted"] == 2
+  assert stats["id_ranges"] == []
+
+
+def test_import_writes_batches_and_reports_id_ranges(tmp_path,
+                                                     fake_db_client):
+  client = fake_db_client(_get_insert_handler(first_id=10))
+  csv_path = _write_csv(tmp_path, ['item_name,item_tags'] +
+                        [f'Item {index},tag{index}' for index in range(5)])
+
+  stats = import_items(csv_path, batch_size=2)
+
+  assert stats["inserted"] == 5
+  assert stats["id_ranges"] == [(10, 14)]
+  statements = client.pool.fake_connection.statements
+  inserts = [sql for (sql, _) in statements
+             if sql.startswith('INSERT INTO inventory ')]
+  # Batches of 2, 2 and 1 rows, one multi-row INSERT each
+  assert [sql.count('), (') + 1 for sql in inserts] == [2, 2, 1]
+  assert client.pool.fake_connection.num_commits == 3
+  # The tags are written for the assigned IDs
+  tag_values = [values for (sql, values) in statements
+                if sql.startswith('INSERT INTO item_tag')]
+  assert [10, 'tag0'] in tag_values and [14, 'tag4'] in tag_values
+
+
+def test_import_reads_ids_one_by_one_if_not_assigned_as_block(
+        tmp_path, fake_db_client):
+  client = fake_db_client(_get_insert_handler(first_id=10,
+                                              autoinc_lock_mode=2,
+                                              id_increment=3))
+  csv_path = _write_csv(tmp_path, ['item_name', 'A', 'B', 'C'])
+
+  stats = import_items(csv_path)
+
+  assert stats["id_ranges"] == [(10, 10), (13, 13), (16, 16)]
+  inserts = [sql for (sql, _) in client.pool.fake_connection.statements
+             if sql.startswith('INSERT INTO inventory ')]
+  assert len(inserts) == 3 and all('), (' not in sql for sql in inserts)
+
+
+def test_upsert_writes_rows_with_id_by_id(tmp_path, fake_db_client):
+  client = fake_db_client(_get_insert_handler(first_id=50))
+  csv_path = _write_csv(tmp_path, ['id,item_name', '3,Drill', ',Saw'])
+
+  stats = import_items(csv_path, upsert=True)
+
+  assert stats["upserted"] == 1
+  assert stats["inserted"] == 1
+  assert stats["id_ranges"] == [(50, 50)]
+  upserts = [values for (sql, values) in client.pool.fake_connection.statements
+             if 'ON DUPLICATE KEY UPDATE' in sql]
+  assert len(upserts) == 1 and upserts[0][:2] == [3, 'Drill']
@@ -0,0 +1,81 @@
+"""
+
+Tests of the on-demand csv export of the inventory (see
+DataBaseClient.iter_inventory_csv())
+
+"""
+import csv
+from io import StringIO
+
+from backend.InventoryItem import InventoryItem
+
+_columns = ['id'] + list(InventoryItem.COLUMNS)
+
+
+def _get_rows(num_rows: int) -> list:
+  return [tuple([id] + [f'{column} {id}' for column in InventoryItem.COLUMNS])
+          for id in range(1, num_rows + 1)]
+
+
+def _answer_with_rows(rows: list):
+  def handler(sql, values):
+    return (_columns, rows) if sql.startswith('SELECT') else (None, [])
+  return handler
+
+
+def test_csv_export_streams_header_and_batches(fake_db_client):
+  rows = _get_rows(5)
+  client = fake_db_client(_answer_with_rows(rows))
+
+  chunks = list(client.iter_inventory_csv(batch_size=2))
+
+  # Header and first batch, then one chunk per batch
+  assert len(chunks) == 3
+  assert chunks[0].splitlines()[0] == ','.join(_columns)
+  exported_rows = list(csv.reader(StringIO(''.join(chunks))))
+  assert exported_rows[0] == _columns
+  assert [row[0] for row in exported_rows[1:]] == ['1', '2', '3', '4', '5']
+
+
+def test_csv_export_selects_importable_columns(fake_db_client):
+  client = fake_db_client(_answer_with_rows([]))
+
+  list(client.iter_inventory_csv())
+
+  (sql, _) = client.pool.fake_connection.statements[0]
+  assert sql.startswith(f"SELECT {', '.join(_columns)} FROM ")
+  assert 'updated_at' not in sql
+  assert sql.endswith('ORDER BY id ASC')
+
+
+def test_csv_export_of_empty_selection_has_header(fake_db_client):
+  client = fake_db_client(_answer_with_rows([]))
+
+  chunks = list(client.iter_inventory_csv(query='nothing'))
+
+  assert ''.join(chunks) == ','.join(_columns) + '\n'
+
+
+def test_csv_export_filters_by_query_tag_and_location(fake_db_client):
+  client = fake_db_client(_answer_with_rows([]))
+
+  list(client.iter_inventory_csv(query='drill bit', tag='tools',
+                                 location_id=3))
+
+  (sql, values) = client.pool.fake_connection.statements[0]
+  assert 'MATCH (' in sql and 'AGAINST (? IN BOOLEAN MODE)' in sql
+  assert 'WHERE tag = ?' in sql
+  assert 'location_id IN (' in sql
+  assert values == ['+drill* +bit*', 'tools', 3]
+
+
+def test_aborted_csv_export_returns_connection(fake_db_client):
+  client = fake_db_client(_answer_with_rows(_get_rows(10)))
+
+  csv_chunks = client.iter_inventory_csv(batch_size=2)
+  next(csv_chunks)
+  assert client.pool.num_checked_out == 1
+
+  csv_chunks.close()
+  assert client.pool.num_checked_out == 0
+  assert client.pool.fake_connection.num_closed_cursors == 1
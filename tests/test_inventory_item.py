@@ -0,0 +1,149 @@
+"""
+
+Tests of the InventoryItem record and its helper functions
+
+"""
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from backend.database_config import ITEM_TAG_MAX_LENGTH
+from backend.InventoryItem import (InventoryItem,
+                                   format_item_tags,
+                                   parse_item_datetime,
+                                   parse_item_tags)
+
+# -------------------------------------------------------------------------
+#                             [DATES]
+# -------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize('value, expected', [
+    (datetime(2024, 5, 17, 14, 3, 0, 500), datetime(2024, 5, 17, 14, 3)),
+    ('2024-05-17 14:03:00', datetime(2024, 5, 17, 14, 3)),
+    ('2024-05-17T14:03:00.250', datetime(2024, 5, 17, 14, 3)),
+    # Text formats of the dates before they became DATETIME columns
+    ('05/17/2024, 14:03:09', datetime(2024, 5, 17, 14, 3, 9)),
+    ('05/17/2024, 14:03', datetime(2024, 5, 17, 14, 3)),
+    (None, None),
+    ('', None),
+    (' None ', None),
+    (float('nan'), None),
+    (pd.NaT, None),
+])
+def test_parse_item_datetime(value, expected):
+  assert parse_item_datetime(value) == expected
+
+
+def test_parse_item_datetime_rejects_unknown_formats():
+  with pytest.raises(ValueError):
+    parse_item_datetime('17.05.2024')
+
+
+def test_item_dates_are_written_as_datetime():
+  inventory_item = InventoryItem('Drill')
+  inventory_item.check_out_date = '05/17/2024, 14:03:09'
+  item_dict = inventory_item.get_item_dict()
+  assert item_dict["check_out_date"] == datetime(2024, 5, 17, 14, 3, 9)
+  assert item_dict["date_added"].microsecond == 0
+
+# -------------------------------------------------------------------------
+#                             [TAGS]
+# -------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('tools; power;drill', ['tools', 'power', 'drill']),
+    (' tools ;; ;None; ', ['tools']),
+    # Tags that only differ in case are kept once, the first spelling wins
+    ('Tools; tools; TOOLS; power', ['Tools', 'power']),
+    (None, []),
+    (float('nan'), []),
+    ('', []),
+])
+def test_parse_item_tags(value, expected):
+  assert parse_item_tags(value) == expected
+
+
+def test_parse_item_tags_cuts_long_tags():
+  tags = parse_item_tags('x' * (ITEM_TAG_MAX_LENGTH + 10) + '; short')
+  assert tags == ['x' * ITEM_TAG_MAX_LENGTH, 'short']
+
+
+def test_format_item_tags_round_trip():
+  tags = ['tools', 'power drill']
+  assert format_item_tags(tags) == 'tools; power drill'
+  assert parse_item_tags(format_item_tags(tags)) == tags
+
+
+def test_item_tags_are_normalized():
+  inventory_item = InventoryItem('Drill', item_tags='tools;;Tools; power ')
+  assert inventory_item.get_tags() == ['tools', 'power']
+  assert inventory_item.get_item_dict()["item_tags"] == 'tools; power'
+
+# -------------------------------------------------------------------------
+#                             [ROWS]
+# -------------------------------------------------------------------------
+
+
+def test_from_row_maps_columns_by_name():
+  columns = ['id', 'item_name', 'is_checked_out', 'date_added', 'location_id']
+  row = (4, 'Drill', 1, datetime(2024, 5, 17, 14, 3), 2)
+
+  inventory_item = InventoryItem.from_row(columns, row)
+
+  assert inventory_item.item_name == 'Drill'
+  assert inventory_item.is_checked_out == 1
+  assert inventory_item.date_added == datetime(2024, 5, 17, 14, 3)
+  assert inventory_item.location_id == 2
+  # Columns missing in the row are None
+  assert inventory_item.manufacturer is None
+  assert inventory_item.item_image == Path('')
+
+
+def test_from_row_reuses_layout_per_column_order():
+  columns = ('item_name', 'manufacturer')
+  first_item = InventoryItem.from_row(columns, ('Drill', 'ACME'))
+  second_item = InventoryItem.from_row(columns, ('Saw', None))
+
+  assert columns in InventoryItem._row_layouts
+  assert (first_item.item_name, first_item.manufacturer) == ('Drill', 'ACME')
+  assert (second_item.item_name, second_item.manufacturer) == ('Saw', None)
+
+
+def test_item_has_no_instance_dict():
+  inventory_item = InventoryItem('Drill')
+  assert not hasattr(inventory_item, '__dict__')
+
+
+def test_item_dict_follows_changes():
+  inventory_item = InventoryItem('Drill', item_tags='tools')
+  item_dict = inventory_item.get_item_dict()
+  assert list(item_dict.keys()) == list(InventoryItem.COLUMNS)
+  assert inventory_item.get_item_dict() is item_dict
+
+  inventory_item.item_name = 'Hammer drill'
+  assert inventory_item.get_item_dict()["item_name"] == 'Hammer drill'
+  assert inventory_item.get_item_values()[0] == 'Hammer drill'
+
+
+def test_populate_from_df_without_optional_columns():
+  columns = [column for column in InventoryItem.COLUMNS
+             if column != 'location_id']
+  df = pd.DataFrame([['Drill' if column == 'item_name' else None
+                      for column in columns]], columns=columns)
+  inventory_item = InventoryItem('')
+  inventory_item.location_id = 5
+
+  inventory_item.populate_from_df(df)
+
+  assert inventory_item.item_name == 'Drill'
+  assert inventory_item.location_id is None
+
+
+def test_populate_from_empty_df_keeps_item():
+  inventory_item = InventoryItem('Drill')
+  inventory_item.populate_from_df(pd.DataFrame(columns=['item_name']))
+  assert inventory_item.item_name == 'Drill'
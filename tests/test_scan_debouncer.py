@@ -0,0 +1,76 @@
+"""
+
+Tests of the QR scan de-duplication (backend/ScanDebouncer.py)
+
+"""
+import importlib
+import types
+
+import pytest
+
+from backend.ScanDebouncer import ScanDebouncer
+
+
+@pytest.fixture
+def clock(monkeypatch):
+  """
+  Replace the clock of the debouncer with one that only advances when set
+  """
+  clock = types.SimpleNamespace(time_s=1000.0)
+  clock.monotonic = lambda: clock.time_s
+  scan_debouncer_module = importlib.import_module('backend.ScanDebouncer')
+  monkeypatch.setattr(scan_debouncer_module, 'time', clock)
+  return clock
+
+
+def test_repeated_scan_is_held_off(clock):
+  debouncer = ScanDebouncer(holdoff_s=2.0)
+
+  assert debouncer.accept(7)
+  clock.time_s += 1.9
+  assert not debouncer.accept(7)
+  clock.time_s += 0.1
+  assert debouncer.accept(7)
+
+  assert debouncer.get_stats() == {"scans": 3, "reported": 2,
+                                   "suppressed": 1, "holdoff_s": 2.0}
+
+
+def test_hold_off_starts_at_the_reported_scan(clock):
+  debouncer = ScanDebouncer(holdoff_s=2.0)
+
+  assert debouncer.accept(7)
+  # Suppressed scans do not extend the window
+  for _ in range(3):
+    clock.time_s += 0.6
+    assert not debouncer.accept(7)
+  clock.time_s += 0.2
+  assert debouncer.accept(7)
+
+
+def test_different_ids_are_not_held_off(clock):
+  debouncer = ScanDebouncer(holdoff_s=2.0)
+
+  assert debouncer.accept(7)
+  assert debouncer.accept(8)
+  assert not debouncer.accept(7)
+  assert not debouncer.accept(8)
+
+
+def test_reset_reports_next_scan(clock):
+  debouncer = ScanDebouncer(holdoff_s=2.0)
+
+  assert debouncer.accept(7)
+  debouncer.reset()
+  assert debouncer.accept(7)
+
+
+def test_expired_ids_are_forgotten(clock):
+  debouncer = ScanDebouncer(holdoff_s=2.0)
+  for item_id in range(100):
+    debouncer.accept(item_id)
+
+  clock.time_s += 2.0
+  debouncer.accept(1000)
+
+  assert list(debouncer._last_reported.keys()) == [1000]
@@ -0,0 +1,54 @@
+"""
+
+Tests of the SQL statement templates (backend/sql_templates.py)
+
+"""
+from backend.InventoryItem import InventoryItem
+from backend.InventoryUser import InventoryUser, UserPrivileges
+from backend.sql_templates import build_sql_templates
+
+
+def test_templates_of_a_table():
+  templates = build_sql_templates('tool', ('name', 'size'), key_column='id')
+
+  assert templates["insert"] == ('INSERT INTO tool ( name, size ) '
+                                 'VALUES ( ?, ? )')
+  assert templates["insert_row"] == '( ?, ? )'
+  assert templates["update"] == 'UPDATE tool SET name = ?, size = ? WHERE id = ?'
+  assert templates["upsert"] == ('INSERT INTO tool ( id, name, size ) '
+                                 'VALUES ( ?, ?, ? ) '
+                                 'ON DUPLICATE KEY UPDATE '
+                                 'name = VALUES(name), size = VALUES(size)')
+
+
+def test_item_templates_are_built_once():
+  templates = InventoryItem.get_sql_templates()
+  assert InventoryItem.get_sql_templates() is templates
+  assert templates["insert"].count('?') == len(InventoryItem.COLUMNS)
+
+
+def test_item_statements_match_their_values():
+  inventory_item = InventoryItem('Drill', location_id=3)
+
+  (sql, values) = inventory_item.get_sql_query_add_item()
+  assert sql.count('?') == len(values)
+  assert values[0] == 'Drill'
+
+  (sql, values) = inventory_item.get_sql_query_update_item(12)
+  assert sql.count('?') == len(values)
+  assert values[-1] == 12
+
+
+def test_user_statements_match_their_values():
+  user = InventoryUser('alice', 'secret', UserPrivileges.MAINTAINER)
+
+  (sql, values) = user.get_sql_query_add_user()
+  assert sql.count('?') == len(values)
+  assert values[0] == 'alice'
+  # Only the hash of the password is stored
+  assert values[1] != 'secret'
+  assert values[2] == UserPrivileges.MAINTAINER.value
+
+  (sql, values) = user.get_sql_query_update_user('alice')
+  assert sql.endswith('WHERE user_name = ?')
+  assert sql.count('?') == len(values)
@@ -14,6 +14,7 @@ parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.append(parent_dir)
 
 from backend.DataBaseClient import DataBaseClient
+from backend.database_bootstrap import bootstrap_database
 from backend.InventoryUser import InventoryUser, UserPrivileges
 
 # --- Config imports
@@ -70,6 +71,9 @@ def main():
                                 user_password=pw1,
                                 user_privileges=UserPrivileges(privileges))
 
+  # Make sure the user table exists, e.g. when creating the first user of a
+  # fresh database
+  bootstrap_database(host=database_host)
   client = DataBaseClient(host=database_host)
 
   # Create new user